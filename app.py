@@ -1,12 +1,18 @@
+import atexit
 import os
+import tempfile
+import time
 from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
 from flask import Flask, jsonify, redirect, render_template, request, session
 from apscheduler.schedulers.background import BackgroundScheduler
-from sqlalchemy.orm import joinedload
 from dotenv import load_dotenv
+from sqlalchemy.exc import SQLAlchemyError
 from controllers.chefs import add_chef, delete_chef, login_act, update_chef
+from controllers.events import get_events
 from controllers.foods import add_food, delete_food
+from controllers.history import get_history
+from controllers.weights import update_weights
 from controllers.today_foods import (
     add_today_food,
     append_food,
@@ -15,8 +21,21 @@ from controllers.today_foods import (
     get_today_foods,
     seed_today_foods,
     stats,
+    stream_today_foods,
 )
 from models import Foods, TodayFoods, db, Chefs
+from services.aio_ingest import AsyncIngestServer
+from services.board import apply_readings_db, board, decay_in_db
+from services.catalog import catalog
+from services.compression import StaticAssets, compress_response
+from services.events import remain_events
+from services.migrations import MigrationError, pending as pending_migrations, upgrade as upgrade_schema
+from services.rollup import rebuild as rebuild_totals
+from services.history import compact as compact_history, history
+from services.ingest import ingest_queue, parse_ts, parse_weight
+from services.leader import FileLock, LeaderElection, MySQLLock
+from services.search import food_index
+from services.telemetry import TelemetryListener
 from utils import load_status, login_required, save_status
 
 load_dotenv()  # ✅ 自动加载 .env 文件中的环境变量
@@ -31,71 +50,269 @@ app.permanent_session_lifetime = timedelta(hours=6)  # 登录有效期6小时
 app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DB_URI")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
+# 看板数据写回数据库的间隔（秒）
+app.config["BOARD_FLUSH_SECONDS"] = int(os.getenv("BOARD_FLUSH_SECONDS", 5))
+# 衰减方式：memory = 内存看板批量计算；sql = 数据库端一条 UPDATE
+app.config["DECAY_MODE"] = os.getenv("DECAY_MODE", "memory")
+# 称重数据合并写入的窗口（秒）；0 表示每条请求同步处理
+app.config["INGEST_WINDOW_SECONDS"] = float(os.getenv("INGEST_WINDOW_SECONDS", 1))
+# UDP 遥测接收端口；不设置则不启动
+app.config["TELEMETRY_UDP_PORT"] = int(os.getenv("TELEMETRY_UDP_PORT", 0))
+app.config["TELEMETRY_UDP_HOST"] = os.getenv("TELEMETRY_UDP_HOST", "0.0.0.0")
+# 异步接收服务（aiohttp，HTTP + WebSocket）端口；不设置则不启动。秤较多、保持长连接时使用
+app.config["INGEST_ASYNC_PORT"] = int(os.getenv("INGEST_ASYNC_PORT", 0))
+app.config["INGEST_ASYNC_HOST"] = os.getenv("INGEST_ASYNC_HOST", "0.0.0.0")
+# 同步处理（INGEST_WINDOW_SECONDS=0）时写数据库的线程数
+app.config["INGEST_ASYNC_WORKERS"] = int(os.getenv("INGEST_ASYNC_WORKERS", 4))
+# 重量履历：原始数据保留小时数（之后聚合为 1 分钟），1 分钟数据保留天数（之后聚合为 15 分钟）
+app.config["HISTORY_RAW_HOURS"] = float(os.getenv("HISTORY_RAW_HOURS", 48))
+app.config["HISTORY_MINUTE_DAYS"] = float(os.getenv("HISTORY_MINUTE_DAYS", 14))
+# 多进程部署（gunicorn 多 worker 等）的 leader 选举：空 = 单进程；file = 同一台服务器；mysql = GET_LOCK
+app.config["LEADER_LOCK"] = os.getenv("LEADER_LOCK", "")
+app.config["LEADER_LOCK_FILE"] = os.getenv(
+    "LEADER_LOCK_FILE", os.path.join(tempfile.gettempdir(), "hotel_kds_leader.lock")
+)
+app.config["LEADER_CHECK_SECONDS"] = int(os.getenv("LEADER_CHECK_SECONDS", 5))
+# 多进程部署时各进程重新读取菜品缓存的间隔（秒）：其他 worker 修改的菜单最多这么久后生效
+app.config["CATALOG_SYNC_SECONDS"] = int(os.getenv("CATALOG_SYNC_SECONDS", 10))
+# 响应压缩（gzip / br）的最小字节数；0 表示不压缩
+app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+if app.config["LEADER_LOCK"] and app.config["DECAY_MODE"] != "sql":
+    # 各进程的内存看板互不相通：衰减只能由 leader 在数据库端执行，其他进程按秒同步
+    print("多进程部署：DECAY_MODE 改为 sql")
+    app.config["DECAY_MODE"] = "sql"
 
 # --- 初始化数据库 ---
 db.init_app(app)
 
+# 数据库端衰减时，称重・补充也直接用原子 UPDATE 写入，避免写回时覆盖衰减结果
+board.write_through = app.config["DECAY_MODE"] == "sql"
+
+# --- 静态文件：内容哈希（?v=）+ 长缓存 + 启动时预压缩 ---
+static_assets = StaticAssets(app, min_size=app.config["COMPRESS_MIN_SIZE"] or 1024)
+
 
-# 初始化时读取状态
-is_decay_enabled = load_status()
+@app.after_request
+def compress(response):
+    # 平板走厨房 Wi-Fi：JSON / HTML 超过阈值就压缩
+    if app.config["COMPRESS_MIN_SIZE"]:
+        compress_response(response, app.config["COMPRESS_MIN_SIZE"])
+    return response
+
+
+# --- 数据库迁移：AUTO_MIGRATE=1 时启动即执行；也可用 `flask --app app db-upgrade` ---
+if os.getenv("AUTO_MIGRATE") == "1":
+    with app.app_context():
+        try:
+            upgrade_schema()
+        except MigrationError as e:
+            # 需要人工处理数据（例如重复行）：不应用该迁移，照常启动
+            print(f"数据库迁移中止：{e}")
+else:
+    # 未迁移时也能运行（日集计等单独写入，失败不影响重量），但要提醒
+    with app.app_context():
+        try:
+            missing = pending_migrations()
+        except SQLAlchemyError as e:
+            missing = []
+            print(f"无法检查数据库迁移：{e}")
+        if missing:
+            print(f"有 {len(missing)} 个未应用的迁移：{', '.join(missing)}（执行 flask --app app db-upgrade）")
+
+
+@app.cli.command("rollup-backfill")
+def rollup_backfill_command():
+    """根据 today_foods 的历史数据重新生成 daily_food_totals"""
+    count = rebuild_totals(estimate_refills=True)
+    print(f"已集计 {count} 条（日期 × 菜品）")
+
+
+@app.cli.command("db-upgrade")
+def db_upgrade_command():
+    """执行未应用的数据库迁移（migrations/vNNN_*.py）"""
+    try:
+        applied = upgrade_schema()
+    except MigrationError as e:
+        print(f"数据库迁移中止：{e}")
+        raise SystemExit(1)
+    print(f"已应用 {len(applied)} 个迁移" if applied else "数据库已是最新")
+
+
+# --- 预热菜品缓存（表还没建好时跳过，之后按需读取）---
+with app.app_context():
+    try:
+        catalog.warm()
+        food_index.build()  # 名称・分类的搜索索引
+    except SQLAlchemyError as e:
+        print(f"菜品缓存预热失败：{e}")
+
+
+# --- leader 选举：部署内只有一个进程执行衰减、履历聚合 ---
+def create_leader_lock():
+    kind = app.config["LEADER_LOCK"]
+    if not kind:
+        return None
+    if kind == "file":
+        return FileLock(app.config["LEADER_LOCK_FILE"])
+    if kind == "mysql":
+        with app.app_context():
+            return MySQLLock(db.engine)
+    raise ValueError(f"未知的 LEADER_LOCK：{kind}")
+
+
+leader = LeaderElection(create_leader_lock())
+
+
+def check_leader():
+    if leader.check():
+        role = "leader" if leader.is_leader else "follower"
+        print(f"[pid {os.getpid()}] 切换为 {role}")
+    # remain 事件的 seq 由 leader 编号、follower 从表中同步，所有 worker 共用一个序列
+    with app.app_context():
+        try:
+            remain_events.set_role(leader.is_leader)
+        except SQLAlchemyError as e:
+            print(f"事件序列同步失败：{e}")
 
 
 # -----------------------
-# 衰减逻辑
+# 衰减逻辑（只改内存中的看板，按 flush 间隔写回数据库）
 # -----------------------
 def decay_today_foods():
-    global is_decay_enabled
-    if not is_decay_enabled:
-        # 如果暂停标志为 False，直接跳过执行
-        return
-
     with app.app_context():
-        today = date.today()
         now = datetime.now(ZoneInfo("Asia/Tokyo"))
-        today_foods = (
-            TodayFoods.query.filter_by(record_date=today)
-            .filter_by(status=1)
-            .options(joinedload(TodayFoods.food))  # ✅ 一次性加载 Foods
-            .all()
-        )
-        changed = False
-        for tf in today_foods:
-            f = tf.food
-            if not f:
-                continue
-            decay = f.decay_rate or 0
-            if decay <= 0:
-                continue
-
-            # 减少重量
-            tf.current_weight = max(tf.current_weight - decay, 0)
-
-            # 状态更新
-            if tf.current_weight <= 0:
-                tf.remain = 3  # 卖完
-            elif tf.current_weight <= f.critical_threshold:
-                tf.remain = 2  # 危险
-            elif tf.current_weight <= f.warning_threshold:
-                tf.remain = 1  # 警告
-            else:
-                tf.remain = 0  # 正常
-
-            tf.updated_at = now
-            changed = True
-
-        if changed:
-            db.session.commit()
+        enabled = load_status()
+        # 其他进程切换的开关也在这里检测到，推送给本进程的 SSE 客户端
+        board.publish_status(enabled)
+        if app.config["DECAY_MODE"] == "sql":
+            # 先写回看板上的改动；衰减只由 leader 在数据库端执行，所有进程再从数据库同步看板
+            board.flush(record_decay=False)
+            if leader.is_leader and enabled and decay_in_db(date.today(), now):
+                print(f"[{now:%H:%M:%S}] 更新菜品衰减信息")
+            # 衰减只在数据库端发生，履历点由 leader 在同步时标记、写回时记录
+            board.refresh(track_decay=leader.is_leader)
+            if leader.lock is not None:
+                # 事件由 leader 每秒写入，follower 每秒同步并推送给本进程的 SSE 客户端
+                if leader.is_leader:
+                    remain_events.flush()
+                else:
+                    board.publish_events(remain_events.sync())
+            return
+
+        if not enabled:
+            # 如果暂停标志为 False，直接跳过执行
+            return
+
+        board.ensure_loaded(date.today())
+        if board.decay(now):
             print(f"[{now:%H:%M:%S}] 更新菜品衰减信息")
 
 
+def flush_ingest():
+    with app.app_context():
+        ingest_queue.flush()
+
+
+def flush_board():
+    with app.app_context():
+        count = board.flush()
+        if count:
+            print(f"[{datetime.now(ZoneInfo('Asia/Tokyo')):%H:%M:%S}] 写回 {count} 条菜品数据")
+        history.flush()
+        # 多进程时各进程都会检测到同一变化，事件表只由 leader 写入
+        remain_events.flush(persist=leader.is_leader)
+
+
+def sync_catalog():
+    with app.app_context():
+        count = catalog.sync()
+        if count:
+            print(f"[pid {os.getpid()}] 同步菜品缓存：{count} 件有变化")
+
+
+def compact_history_job():
+    if not leader.is_leader:
+        return
+    with app.app_context():
+        raw, minutes = compact_history(
+            app.config["HISTORY_RAW_HOURS"] * 3600,
+            app.config["HISTORY_MINUTE_DAYS"] * 86400,
+        )
+        if raw or minutes:
+            print(f"重量履历聚合：原始 {raw} 条，1 分钟 {minutes} 条")
+
+
 # -----------------------
 # APScheduler 启动
-# ⏰ 启动定时任务：每 5 秒执行一次
+# ⏰ 衰减每 1 秒执行一次，写回数据库按 BOARD_FLUSH_SECONDS 执行
 # -----------------------
 scheduler = BackgroundScheduler(timezone="Asia/Tokyo")
+if leader.lock is not None:
+    check_leader()
+    scheduler.add_job(
+        check_leader,
+        "interval",
+        seconds=app.config["LEADER_CHECK_SECONDS"],
+        id="leader_task",
+    )
+    # 菜品缓存・搜索索引的失效只发生在处理修改请求的进程，其他进程定期同步
+    scheduler.add_job(
+        sync_catalog,
+        "interval",
+        seconds=app.config["CATALOG_SYNC_SECONDS"],
+        id="catalog_task",
+    )
 scheduler.add_job(decay_today_foods, "interval", seconds=1, id="decay_task")
+scheduler.add_job(
+    flush_board,
+    "interval",
+    seconds=app.config["BOARD_FLUSH_SECONDS"],
+    id="flush_task",
+)
+if app.config["INGEST_WINDOW_SECONDS"] > 0 or app.config["TELEMETRY_UDP_PORT"]:
+    # 遥测数据总是经过队列；同步模式下按 1 秒窗口处理
+    scheduler.add_job(
+        flush_ingest,
+        "interval",
+        seconds=app.config["INGEST_WINDOW_SECONDS"] or 1,
+        id="ingest_task",
+    )
+scheduler.add_job(compact_history_job, "interval", hours=1, id="history_task")
 scheduler.start()
 
+# UDP 遥测（二进制帧），与 /api/update_weight 共用接收队列
+telemetry = None
+if app.config["TELEMETRY_UDP_PORT"]:
+    try:
+        telemetry = TelemetryListener(
+            app.config["TELEMETRY_UDP_HOST"], app.config["TELEMETRY_UDP_PORT"]
+        ).start()
+    except OSError as e:
+        # 多 worker 时只有先启动的进程能绑定端口
+        print(f"遥测端口未启动：{e}")
+
+# 异步接收服务（HTTP + WebSocket），与 /api/update_weight 共用合并队列・看板处理
+async_ingest = None
+if app.config["INGEST_ASYNC_PORT"]:
+    try:
+        async_ingest = AsyncIngestServer(
+            app,
+            app.config["INGEST_ASYNC_HOST"],
+            app.config["INGEST_ASYNC_PORT"],
+            window=app.config["INGEST_WINDOW_SECONDS"],
+            workers=app.config["INGEST_ASYNC_WORKERS"],
+        ).start()
+    except (OSError, RuntimeError) as e:
+        # 多 worker 时只有先启动的进程能绑定端口；aiohttp 未安装时也不启动
+        print(f"异步接收服务未启动：{e}")
+
+# 进程退出时把未写回的数据落盘（先停止接收、处理队列里的读数），最后释放 leader 锁
+atexit.register(leader.release)
+atexit.register(flush_board)
+atexit.register(flush_ingest)
+if async_ingest:
+    atexit.register(async_ingest.stop)
+
 
 @app.route("/")
 @login_required
@@ -184,7 +401,11 @@ def foods():
     # 构建查询
     query = Foods.active()
     if keyword:
-        query = query.filter(Foods.name.like(f"%{keyword}%"))
+        if food_index.ready:
+            # 先用内存索引求出 id，再按主键查询
+            query = query.filter(Foods.id.in_(sorted(food_index.search(keyword))))
+        else:
+            query = query.filter(Foods.name.like(f"%{keyword}%"))
 
     # 分页查询
     pagination = query.order_by(Foods.id.desc()).paginate(
@@ -249,6 +470,7 @@ def put_food(id):
     food.status = data.get("status", food.status)
 
     db.session.commit()
+    catalog.invalidate(food.id)
     return jsonify({"code": 200, "msg": "食品を更新しました"}), 200
 
 
@@ -276,6 +498,12 @@ def today_foods():
     return get_today_foods()
 
 
+@app.route("/today_foods/stream", methods=["GET"])
+@login_required
+def today_foods_stream():
+    return stream_today_foods()
+
+
 @app.route("/days", methods=["GET", "POST"])
 @login_required
 def days():
@@ -326,23 +554,12 @@ def totals():
 
 @app.route("/toggle_decay", methods=["POST"])
 def toggle_decay():
-    """前端点击按钮时调用，暂停或恢复衰减任务"""
-
-    print("当前任务：", scheduler.get_jobs())
-    global is_decay_enabled
-
-    job = scheduler.get_job("decay_task")
-    if job.next_run_time:  # 正在运行中 → 暂停
-        scheduler.pause_job("decay_task")
-        is_decay_enabled = False  # 🧩 同步关闭任务执行
-        status = "paused"
-    else:
-        scheduler.resume_job("decay_task")
-        is_decay_enabled = True  # 🧩 同步开启任务执行
-        status = "running"
-
-    save_status(is_decay_enabled)  # ✅ 每次更新时写入文件
-    print(f"当前衰减状态: {status}, 启动标志: {is_decay_enabled}")
+    """前端点击按钮时调用，暂停或恢复衰减（任务本身不停，每次执行时检查开关）"""
+    enabled = not load_status()
+    save_status(enabled)  # ✅ 原子写入；其他进程通过版本检查获知
+    board.publish_status(enabled)  # 正在 SSE 连接的平板立即切换显示
+    status = "running" if enabled else "paused"
+    print(f"当前衰减状态: {status}")
     return jsonify({"code": 200, "msg": "success", "status": status})
 
 @app.route("/test_data", methods=["GET"])
@@ -357,36 +574,67 @@ def update_weight():
     if not data:
         return jsonify({"msg": "无数据"}), 400
     
-    food_id = data.get('food_id')
-    weight = data.get('weight')
-    
-    with app.app_context():
-        # 查找当天的这条菜品记录
-        tf = TodayFoods.query.filter_by(food_id=food_id, record_date=date.today()).first()
-        if not tf:
+    # 两种模式都先校验（NaN / inf 也是格式错误）
+    try:
+        food_id = int(data.get('food_id'))
+        weight = parse_weight(data.get('weight'))
+    except (TypeError, ValueError):
+        return jsonify({"msg": "数据格式错误"}), 400
+
+    # 放入合并写入队列，立即返回；实际写入在窗口结束时批量进行
+    if app.config["INGEST_WINDOW_SECONDS"] > 0:
+        try:
+            accepted = ingest_queue.put(food_id, weight, parse_ts(data.get('ts')))
+        except (TypeError, ValueError):
+            return jsonify({"msg": "数据格式错误"}), 400
+        if not accepted:
+            return jsonify({"msg": "队列已满"}), 503
+        return jsonify({"msg": "已受理"}), 202
+
+    board.ensure_loaded(date.today())
+    # 当天上架中的菜品直接更新看板
+    if board.set_weight(food_id, weight) is None:
+        # 下架中的记录：直接写数据库
+        [(status, _)] = apply_readings_db([(food_id, weight, time.time())], date.today())
+        if status != "ok":
             return jsonify({"msg": "未找到对应的今日菜品"}), 404
-        
-        f = tf.food
-        # 更新重量
-        tf.current_weight = float(weight)
-        
-        # 自动判定状态 (remain)
-        if tf.current_weight <= 0:
-            tf.remain = 3  # 卖完
-        elif tf.current_weight <= f.critical_threshold:
-            tf.remain = 2  # 至急
-        elif tf.current_weight <= f.warning_threshold:
-            tf.remain = 1  # 警告
-        else:
-            tf.remain = 0  # 正常
-            
-        tf.updated_at = datetime.now()
-        db.session.commit()
-        
+
     print(f"收到 API 更新：菜品ID {food_id}, 当前重量 {weight}g")
     return jsonify({"msg": "更新成功"}), 200
 
+# 多台秤的批量上传：一次请求包含多条读数
+@app.route('/api/update_weights', methods=['POST'])
+def update_weights_batch():
+    return update_weights()
+
+# 重量履历（降采样后的曲线）
+@app.route("/api/history", methods=["GET"])
+@login_required
+def weight_history():
+    return get_history()
+
+
+# remain 变化事件（?after=<seq> 游标）
+@app.route("/api/events", methods=["GET"])
+@login_required
+def remain_event_feed():
+    return get_events()
+
+# 接收队列的深度和计数
+@app.route('/api/ingest_stats', methods=['GET'])
+def ingest_stats():
+    data = ingest_queue.stats()
+    if telemetry:
+        data["telemetry"] = telemetry.stats()
+    if async_ingest:
+        data["async"] = async_ingest.stats()
+    return jsonify({"code": 200, "msg": "success", "data": data})
+
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()  # ✅ 建库 + 确保上下文绑定
+        try:
+            upgrade_schema()  # ✅ 已有数据库补上索引等
+        except MigrationError as e:
+            print(f"数据库迁移中止：{e}")
     app.run(host="0.0.0.0", debug=True, port=9000, use_reloader=False)
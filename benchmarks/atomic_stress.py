@@ -0,0 +1,193 @@
+"""
+同一行への同時書き込みストレステスト：補充が失われないことを確認する
+
+1 件の today_foods 行に対して同時に
+  補充スレッド × R : 各 K 回補充（refill_in_db：1 本の UPDATE で加算）
+  衰減スレッド     : decay_in_db を繰り返す
+  秤スレッド       : set_weight_in_db で重量を上書きし続ける
+を走らせ、total_weight が 初期値 + R × K × 補充量 と一致するかを確認する。
+--legacy を付けると従来の ORM の読み出し → 加算 → commit で同じことを行い、失われた補充数を表示する。
+
+用法：python benchmarks/atomic_stress.py [--refillers 8] [--refills 50] [--legacy] [--db URI]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from models import Foods, TodayFoods, db  # noqa: E402
+from services.board import calc_remain, decay_in_db, refill_in_db, set_weight_in_db  # noqa: E402
+
+START_WEIGHT = 1000
+REFILL_WEIGHT = 100
+
+
+def create_app(uri):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def seed():
+    db.create_all()
+    food = Foods(name="ストレス", category="bench", weight=REFILL_WEIGHT, decay_rate=3,
+                 warning_threshold=300, critical_threshold=100, status=1)
+    db.session.add(food)
+    db.session.flush()
+    tf = TodayFoods(food_id=food.id, total_weight=START_WEIGHT, current_weight=START_WEIGHT,
+                    record_date=date.today(), status=1, remain=0)
+    db.session.add(tf)
+    db.session.commit()
+    return food.id, tf.id
+
+
+def now():
+    return datetime.now(ZoneInfo("Asia/Tokyo"))
+
+
+def retry(func):
+    """SQLite のロック待ちタイムアウトは再試行"""
+    while True:
+        try:
+            return func()
+        except OperationalError:
+            db.session.rollback()
+            time.sleep(0.001)
+
+
+# ---------- 新方式：DB 側で 1 本の UPDATE ----------
+def atomic_refill(today_id):
+    refill_in_db(today_id, now())
+    db.session.commit()
+
+
+def atomic_decay(today_id):
+    decay_in_db(date.today(), now())
+
+
+def atomic_scale(food_id, weight):
+    set_weight_in_db(food_id, date.today(), weight, now())
+    db.session.commit()
+
+
+# ---------- 従来方式：ORM で読み出し → 変更 → commit ----------
+def legacy_refill(today_id):
+    tf = TodayFoods.query.filter_by(id=today_id).populate_existing().first()
+    tf.total_weight += REFILL_WEIGHT
+    tf.current_weight += REFILL_WEIGHT
+    db.session.commit()
+
+
+def legacy_decay(today_id):
+    tf = TodayFoods.query.filter_by(id=today_id).populate_existing().first()
+    tf.current_weight = max(tf.current_weight - 3, 0)
+    tf.remain = calc_remain(tf.current_weight, 300, 100)
+    db.session.commit()
+
+
+def legacy_scale(food_id, weight):
+    tf = TodayFoods.query.filter_by(food_id=food_id, record_date=date.today()).populate_existing().first()
+    tf.current_weight = weight
+    tf.remain = calc_remain(weight, 300, 100)
+    db.session.commit()
+
+
+def run(app, args, food_id, today_id):
+    refill, decay, scale = (
+        (legacy_refill, legacy_decay, legacy_scale)
+        if args.legacy
+        else (atomic_refill, atomic_decay, atomic_scale)
+    )
+    stop = threading.Event()
+    errors = []
+
+    def in_context(target):
+        def wrapper():
+            with app.app_context():
+                try:
+                    target()
+                except Exception as e:  # noqa: BLE001  結果表示用
+                    errors.append(repr(e))
+                finally:
+                    db.session.remove()
+
+        return wrapper
+
+    def refiller():
+        for _ in range(args.refills):
+            retry(lambda: refill(today_id))
+
+    def decayer():
+        while not stop.is_set():
+            retry(lambda: decay(today_id))
+
+    def scaler():
+        rng = random.Random()
+        while not stop.is_set():
+            weight = rng.randint(0, 800)
+            retry(lambda: scale(food_id, weight))
+
+    background = [threading.Thread(target=in_context(f)) for f in (decayer, scaler)]
+    workers = [threading.Thread(target=in_context(refiller)) for _ in range(args.refillers)]
+    start = time.perf_counter()
+    for t in background + workers:
+        t.start()
+    for t in workers:
+        t.join()
+    stop.set()
+    for t in background:
+        t.join()
+    return time.perf_counter() - start, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--refillers", type=int, default=8)
+    parser.add_argument("--refills", type=int, default=50)
+    parser.add_argument("--legacy", action="store_true", help="従来の ORM 読み出し → 加算")
+    parser.add_argument("--db", help="SQLAlchemy URI（默认临时 SQLite）；当天的全部行都会被衰减，请用测试专用库")
+    args = parser.parse_args()
+
+    tmp = None
+    if not args.db:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        args.db = f"sqlite:///{tmp.name}"
+    app = create_app(args.db)
+    with app.app_context():
+        food_id, today_id = seed()
+
+    elapsed, errors = run(app, args, food_id, today_id)
+
+    with app.app_context():
+        tf = db.session.get(TodayFoods, today_id)
+        expected = START_WEIGHT + args.refillers * args.refills * REFILL_WEIGHT
+        lost = (expected - tf.total_weight) // REFILL_WEIGHT
+        remain_ok = tf.remain == calc_remain(tf.current_weight, 300, 100)
+        print(f"mode={'legacy' if args.legacy else 'atomic'} "
+              f"refills={args.refillers}x{args.refills} elapsed={elapsed:.2f}s")
+        print(f"total_weight={tf.total_weight} expected={expected} lost_refills={lost}")
+        print(f"current_weight={tf.current_weight} remain={tf.remain} remain_consistent={remain_ok}")
+        for e in errors[:5]:
+            print(f"error: {e}")
+        ok = lost == 0 and remain_ok and not errors
+
+    if tmp:
+        os.unlink(tmp.name)
+    print("OK" if ok else "NG")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+/*
+ * KDS ボード差分ロジック（static/board.js の diffBoard）のチェック。ブラウザ不要。
+ *
+ * 用法：node benchmarks/board_diff_check.js
+ */
+const assert = require("assert");
+const path = require("path");
+const { diffBoard, cardView } = require(path.join(__dirname, "..", "static", "board.js"));
+
+function row(id, weight, remain, name, extra) {
+    return Object.assign(
+        { id: id, current_weight: weight, remain: remain, food_info: { name: name || `料理${id}` } },
+        extra || {}
+    );
+}
+
+const cases = [];
+function check(name, fn) {
+    cases.push([name, fn]);
+}
+
+check("初回はすべて追加", () => {
+    const d = diffBoard(new Map(), [], [row(1, 90, 0), row(2, 20, 1)]);
+    assert.deepStrictEqual(d.changed, [1, 2]);
+    assert.deepStrictEqual(d.removed, []);
+    assert.ok(d.reordered);
+    assert.ok(!d.empty);
+});
+
+check("同じ内容なら何もしない", () => {
+    const rows = [row(1, 90, 0), row(2, 20, 1)];
+    const first = diffBoard(new Map(), [], rows);
+    const d = diffBoard(first.keys, first.order, rows.map(r => Object.assign({}, r)));
+    assert.ok(d.empty);
+    assert.deepStrictEqual(d.changed, []);
+});
+
+check("重量・remain・名前が変わったカードだけ", () => {
+    const first = diffBoard(new Map(), [], [row(1, 90, 0), row(2, 20, 1), row(3, 50, 0)]);
+    const d = diffBoard(first.keys, first.order, [row(1, 89, 0), row(2, 20, 2), row(3, 50, 0, "新名称")]);
+    assert.deepStrictEqual(d.changed, [1, 2, 3]);
+    const d2 = diffBoard(first.keys, first.order, [row(1, 90, 0), row(2, 20, 1), row(3, 50.2, 0)]);
+    assert.ok(d2.empty, "表示上同じ重量（四捨五入）は変更なし");
+});
+
+check("表示に使わない項目の変化は無視", () => {
+    const first = diffBoard(new Map(), [], [row(1, 90, 0, null, { updated_at: "a", total_weight: 100 })]);
+    const d = diffBoard(first.keys, first.order, [row(1, 90, 0, null, { updated_at: "b", total_weight: 200 })]);
+    assert.ok(d.empty);
+});
+
+check("ETA の表示が変わったら更新", () => {
+    const first = diffBoard(new Map(), [], [row(1, 90, 0, null, { time_to_warning: 600 })]);
+    const same = diffBoard(first.keys, first.order, [row(1, 90, 0, null, { time_to_warning: 610 })]);
+    assert.ok(same.empty, "10分のまま");
+    const d = diffBoard(first.keys, first.order, [row(1, 90, 0, null, { time_to_warning: 1200 })]);
+    assert.deepStrictEqual(d.changed, [1]);
+});
+
+check("削除と並べ替え", () => {
+    const first = diffBoard(new Map(), [], [row(1, 90, 0), row(2, 20, 1), row(3, 50, 0)]);
+    const d = diffBoard(first.keys, first.order, [row(3, 50, 0), row(1, 90, 0)]);
+    assert.deepStrictEqual(d.removed, [2]);
+    assert.deepStrictEqual(d.changed, []);
+    assert.deepStrictEqual(d.order, [3, 1]);
+    assert.ok(d.reordered);
+});
+
+check("remain ごとの表示", () => {
+    assert.strictEqual(cardView(row(1, 0, 3)).cardClass, "empty-bg");
+    assert.strictEqual(cardView(row(1, 5, 2)).statusText, "至急補充");
+    assert.strictEqual(cardView(row(1, 25, 1)).progressClass, "progress-warning");
+    assert.strictEqual(cardView({ id: 1, current_weight: 10, remain: 0 }).name, "");
+});
+
+let failed = 0;
+cases.forEach(([name, fn]) => {
+    try {
+        fn();
+        console.log(`[OK] ${name}`);
+    } catch (e) {
+        failed += 1;
+        console.log(`[NG] ${name}\n    ${e.message}`);
+    }
+});
+console.log(failed ? `\n${failed} 件失敗` : "\nすべて成功");
+process.exit(failed ? 1 : 0);
@@ -0,0 +1,195 @@
+"""
+衰减 1 次（1 tick）所需时间的对比：
+  legacy  : 原来的逐个 ORM 对象修改 + commit（每行一条 UPDATE）
+  memory  : 内存看板批量计算（只算 decay()，不含写回）
+  numpy   : 同上，用 NumPy 数组计算（已安装 numpy 时）
+  flush   : 内存看板写回一次（executemany）；实际按 BOARD_FLUSH_SECONDS 执行，这里每 --flush-every 个 tick 一次
+  mem+fl  : memory + flush / flush-every，即内存模式平均每秒的成本
+  sql     : 数据库端一条 UPDATE
+
+用法：python benchmarks/decay_bench.py [--rows 50 500 5000] [--flush-every 5] [--db sqlite:///...]
+默认使用临时 SQLite 文件，不需要 MySQL。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from models import Foods, TodayFoods, db  # noqa: E402
+from services import board as board_module  # noqa: E402
+from services.board import LiveBoard, decay_in_db  # noqa: E402
+
+
+def create_app(uri):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def seed(rows):
+    db.drop_all()
+    db.create_all()
+    today = date.today()
+    foods = [
+        Foods(
+            name=f"bench-{i}",
+            category="bench",
+            weight=100_000,
+            decay_rate=1 + i % 5,
+            warning_threshold=30,
+            critical_threshold=10,
+            status=1,
+        )
+        for i in range(rows)
+    ]
+    db.session.add_all(foods)
+    db.session.flush()
+    db.session.add_all(
+        TodayFoods(
+            food_id=f.id,
+            total_weight=100_000,
+            current_weight=100_000,
+            record_date=today,
+            status=1,
+            remain=0,
+        )
+        for f in foods
+    )
+    db.session.commit()
+
+
+def legacy_tick():
+    """原 decay_today_foods 的处理（逐行）"""
+    now = datetime.now(ZoneInfo("Asia/Tokyo"))
+    today_foods = (
+        TodayFoods.query.filter_by(record_date=date.today())
+        .filter_by(status=1)
+        .options(joinedload(TodayFoods.food))
+        .all()
+    )
+    for tf in today_foods:
+        f = tf.food
+        decay = f.decay_rate or 0
+        if decay <= 0:
+            continue
+        tf.current_weight = max(tf.current_weight - decay, 0)
+        if tf.current_weight <= 0:
+            tf.remain = 3
+        elif tf.current_weight <= f.critical_threshold:
+            tf.remain = 2
+        elif tf.current_weight <= f.warning_threshold:
+            tf.remain = 1
+        else:
+            tf.remain = 0
+        tf.updated_at = now
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def make_memory_tick(numpy, live=None):
+    """只计 decay()；写回由 measure_flush 按自己的间隔单独计时"""
+    if live is None:
+        live = LiveBoard()
+        live.ensure_loaded(date.today())
+    saved = board_module.np
+
+    def tick():
+        board_module.np = saved if numpy else None
+        try:
+            live.decay()
+        finally:
+            board_module.np = saved
+
+    return tick
+
+
+def sql_tick():
+    decay_in_db(date.today(), datetime.now(ZoneInfo("Asia/Tokyo")))
+
+
+def measure(tick, repeat):
+    tick()  # 预热
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tick()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def measure_flush(every, repeat):
+    """衰减 every 次后写回一次（与运行时相同），返回一次写回的耗时"""
+    live = LiveBoard()
+    live.ensure_loaded(date.today())
+    tick = make_memory_tick(numpy=False, live=live)
+    times = []
+    for _ in range(repeat + 1):  # 第一次为预热
+        for _ in range(every):
+            tick()
+        start = time.perf_counter()
+        live.flush()
+        times.append(time.perf_counter() - start)
+    times = sorted(times[1:])
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--flush-every", type=int, default=5, help="写回间隔（tick 数，对应 BOARD_FLUSH_SECONDS）")
+    parser.add_argument("--db", help="SQLAlchemy URI（默认临时 SQLite）")
+    args = parser.parse_args()
+
+    tmp = None
+    uri = args.db
+    if not uri:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        uri = f"sqlite:///{tmp.name}"
+
+    app = create_app(uri)
+    modes = [
+        ("legacy", lambda: legacy_tick),
+        ("memory", lambda: make_memory_tick(numpy=False)),
+        ("sql", lambda: sql_tick),
+    ]
+    if board_module.np is not None:
+        modes.insert(2, ("numpy", lambda: make_memory_tick(numpy=True)))
+        # 对比时总是走数组分支
+        board_module.NUMPY_MIN_ROWS = 0
+
+    print(f"DB: {uri}")
+    if board_module.np is None:
+        print("未安装 numpy：跳过 numpy 列（pip install numpy 后再测）")
+    names = [name for name, _ in modes] + ["flush", "mem+fl"]
+    print(f"{'rows':>6} " + " ".join(f"{name:>10}" for name in names)
+          + f"   (ms/tick, median；flush 为每次写回，每 {args.flush_every} tick 一次)")
+    with app.app_context():
+        for rows in args.rows:
+            results = []
+            for _, factory in modes:
+                seed(rows)
+                results.append(measure(factory(), args.repeat))
+            seed(rows)
+            flush_ms = measure_flush(args.flush_every, args.repeat)
+            memory_ms = results[1]
+            results += [flush_ms, memory_ms + flush_ms / args.flush_every]
+            print(f"{rows:>6} " + " ".join(f"{r:>10.2f}" for r in results))
+
+    if tmp:
+        os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+インデックス確認：today_foods のホットクエリが migrations/v001 のインデックスを使うか EXPLAIN で検査する。
+
+1. SQLite にインデックスなしの旧スキーマを作成（static/hotel_kds.sql 相当）
+2. 1 年分のデータを seed_rows で投入（重複行も 1 組：掲載中 + 論理削除済みを追加）
+3. マイグレーションを適用（既定では重複で中止、MIGRATE_MERGE_DUPLICATES=1 で統合されることを確認）
+4. controllers/today_foods.py・services/rollup.py・services/history.py と同じクエリを EXPLAIN QUERY PLAN し、全件スキャンがないことを確認
+
+用法：python benchmarks/explain_check.py [--days 365]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import func, select, text  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from controllers.today_foods import seed_rows  # noqa: E402
+from models import (  # noqa: E402
+    DailyFoodTotals,
+    Foods,
+    RemainEvents,
+    TodayFoods,
+    WeightBuckets,
+    WeightReadings,
+    db,
+)
+from services.board import calc_remain  # noqa: E402
+from services.migrations import MigrationError, upgrade  # noqa: E402
+from services.rollup import rebuild  # noqa: E402
+
+NEW_INDEXES = {
+    "ix_today_foods_date_status",
+    "ix_today_foods_date_food_weight",
+    "uq_today_foods_food_date",
+}
+
+
+def hot_queries(today):
+    """チェック対象：(名前, クエリ, 使ってほしいインデックス[, テーブル（省略時 today_foods）])"""
+    start_date = today - timedelta(days=30)
+    day_start = datetime.combine(today, time.min).timestamp()
+    # get_days と同じ：Foods は joinedload、キーワードは food_index で求めた food_id の IN
+    days = TodayFoods.active().options(joinedload(TodayFoods.food))
+    food_ids = [7]  # キーワードに当たる菜品は普通 1〜数件
+    return [
+        (
+            "ボード読み込み / get_today_foods",
+            TodayFoods.query.filter_by(record_date=today).filter_by(status=1),
+            NEW_INDEXES,
+        ),
+        (
+            "foods 画面の本日 ID 一覧",
+            TodayFoods.query.filter_by(status=1, record_date=today),
+            NEW_INDEXES,
+        ),
+        (
+            "update_weight / add_today_food",
+            TodayFoods.query.filter_by(food_id=1, record_date=today),
+            {"uq_today_foods_food_date"},
+        ),
+        (
+            "get_days（日付指定）",
+            days.filter(TodayFoods.record_date == today)
+            .order_by(TodayFoods.id.desc())
+            .limit(10),
+            NEW_INDEXES,
+        ),
+        (
+            "get_days（日付指定 + カーソル ?after=）",
+            days.filter(TodayFoods.record_date == today, TodayFoods.id < 1000)
+            .order_by(TodayFoods.id.desc())
+            .limit(11),
+            NEW_INDEXES,
+        ),
+        (
+            "get_days（カーソル ?after=）",
+            days.filter(TodayFoods.id < 1000).order_by(TodayFoods.id.desc()).limit(11),
+            {"INTEGER PRIMARY KEY"},
+        ),
+        (
+            "get_days（カーソル ?before=）",
+            days.filter(TodayFoods.id > 1000).order_by(TodayFoods.id.asc()).limit(11),
+            {"INTEGER PRIMARY KEY"},
+        ),
+        (
+            "get_days（キーワード：索引の food_id IN）",
+            days.filter(TodayFoods.food_id.in_(food_ids))
+            .order_by(TodayFoods.id.desc())
+            .limit(10),
+            {"uq_today_foods_food_date"},
+        ),
+        (
+            "get_days（キーワード + カーソル ?after=）",
+            days.filter(TodayFoods.food_id.in_(food_ids), TodayFoods.id < 1000)
+            .order_by(TodayFoods.id.desc())
+            .limit(11),
+            # どちらも範囲検索：件数の見積もりで主キー範囲を選ぶこともある
+            {"uq_today_foods_food_date", "INTEGER PRIMARY KEY"},
+        ),
+        (
+            "get_days の総件数（キーワード、キャッシュ切れ時）",
+            select(func.count()).select_from(
+                TodayFoods.active().filter(TodayFoods.food_id.in_(food_ids)).subquery()
+            ),
+            {"uq_today_foods_food_date"},
+        ),
+        (
+            "stats / totals_since（直近 30 日、daily_food_totals）",
+            DailyFoodTotals.query.filter(DailyFoodTotals.record_date >= start_date).order_by(
+                DailyFoodTotals.record_date.asc()
+            ),
+            {"uq_daily_food_totals_date_food"},
+            "daily_food_totals",
+        ),
+        (
+            "重量履歴（生データ）/ api/history",
+            select(WeightReadings.ts, WeightReadings.weight).where(
+                WeightReadings.today_food_id.in_([1, 2]),
+                WeightReadings.ts >= day_start,
+                WeightReadings.ts < day_start + 86400,
+            ),
+            {"ix_weight_readings_today_ts"},
+            "weight_readings",
+        ),
+        (
+            "重量履歴（集約）/ api/history",
+            select(WeightBuckets.bucket_start, WeightBuckets.avg_weight).where(
+                WeightBuckets.today_food_id.in_([1, 2]),
+                WeightBuckets.resolution.in_((60, 900)),
+                WeightBuckets.bucket_start >= day_start,
+                WeightBuckets.bucket_start < day_start + 86400,
+            ),
+            {"uq_weight_buckets_today_res_start"},
+            "weight_buckets",
+        ),
+        (
+            "remain 変化イベント / api/events（メモリにない古いカーソル）",
+            select(RemainEvents)
+            .where(RemainEvents.seq > 0)
+            .order_by(RemainEvents.seq)
+            .limit(201),
+            {"ix_remain_events_seq"},
+            "remain_events",
+        ),
+    ]
+
+
+def explain(query):
+    compiled = getattr(query, "statement", query).compile(
+        dialect=db.engine.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = [
+        str(v) if isinstance(v, date) else v
+        for v in (compiled.params[k] for k in compiled.positiontup)
+    ]
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", tuple(params))
+        return [r[-1] for r in rows]
+
+
+def check_plan(plan, expected, table="today_foods"):
+    steps = [p for p in plan if table in p]
+    uses_index = any(name in p for p in steps for name in expected)
+    full_scan = any(p.startswith(f"SCAN {table}") and "INDEX" not in p for p in steps)
+    return uses_index and not full_scan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp.name}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+
+    today = date.today()
+    ok = True
+    with app.app_context():
+        # 1. 旧スキーマ（インデックスなし）
+        db.create_all()
+        for name in NEW_INDEXES:
+            db.session.execute(text(f"DROP INDEX {name}"))
+        for i in range(1, 41):
+            db.session.add(
+                Foods(name=f"food-{i}", category="cat", weight=100, decay_rate=1,
+                      warning_threshold=30, critical_threshold=10, status=1)
+            )
+        db.session.commit()
+
+        # 2. 1 年分 + 重複 1 組（掲載中 1 行 + 論理削除済み 1 行）
+        count = seed_rows(today - timedelta(days=args.days - 1), today)
+        dup = TodayFoods.query.filter_by(record_date=today).first()
+        dup_food_id = dup.food_id
+        expected_total = dup.total_weight + 100
+        expected_current = dup.current_weight + 5
+        db.session.add_all([
+            TodayFoods(food_id=dup_food_id, total_weight=100, current_weight=5,
+                       record_date=today, status=1, remain=0),
+            TodayFoods(food_id=dup_food_id, total_weight=999, current_weight=999,
+                       record_date=today, status=0, remain=0, deleted_at=datetime.now()),
+        ])
+        db.session.commit()
+        print(f"seed: {count + 2} 行（{args.days} 日分）")
+
+        # 3. マイグレーション：重複があると既定では中止（ロールバック）
+        try:
+            upgrade()
+            refused = False
+        except MigrationError as e:
+            print(e)
+            refused = True
+        dups = TodayFoods.query.filter_by(food_id=dup_food_id, record_date=today).count()
+        print(f"[{'OK' if refused and dups == 3 else 'NG'}] 重複があると中止（行数: {dups}）")
+        ok &= refused and dups == 3
+
+        os.environ["MIGRATE_MERGE_DUPLICATES"] = "1"
+        upgrade()
+        rebuild()  # daily_food_totals を seed から集計（/totals はこちらを読む）
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+        db.session.expire_all()
+        merged = TodayFoods.query.filter_by(food_id=dup_food_id, record_date=today).all()
+        passed = (
+            len(merged) == 1
+            and merged[0].deleted_at is None
+            and (merged[0].total_weight, merged[0].current_weight)
+            == (expected_total, expected_current)
+            and merged[0].remain == calc_remain(expected_current, 30, 10)
+        )
+        print(f"[{'OK' if passed else 'NG'}] 重複統合（論理削除済みは合算しない、remain 再計算）")
+        ok &= passed
+
+        # 4. EXPLAIN
+        for name, query, expected, *rest in hot_queries(today):
+            table = rest[0] if rest else "today_foods"
+            plan = explain(query)
+            passed = check_plan(plan, expected, table)
+            ok &= passed
+            print(f"\n[{'OK' if passed else 'NG'}] {name}")
+            for step in plan:
+                print(f"    {step}")
+
+    os.unlink(tmp.name)
+    print("\n全クエリがインデックスを使用しています" if ok else "\nインデックス未使用のクエリがあります")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+pi_gateway.py の動作確認用スタブサーバー（Flask / DB 不要）
+
+- POST /api/update_weights を受け付け、受信した読数を記録
+- --down で指定した時間帯（起動からの秒数）は 503 を返し、ネットワーク断を再現
+- 終了時（Ctrl+C）に、食品ごとの ts が単調増加か（補発の順序）と受信件数を表示
+
+用法：
+  python benchmarks/gateway_stub.py --port 5055 --down 10:25
+  python pi_gateway.py --config pi_gateway.example.json --fake --server http://127.0.0.1:5055
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+received = []  # (受信時刻, reading)
+
+
+def make_handler(started, down):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            elapsed = time.monotonic() - started
+            if any(a <= elapsed < b for a, b in down):
+                return self.reply(503, {"code": 503, "msg": "down"})
+            readings = json.loads(body).get("readings", [])
+            received.extend((elapsed, r) for r in readings)
+            self.reply(200, {"code": 200, "msg": f"更新成功 {len(readings)}/{len(readings)}"})
+
+        def reply(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def summary():
+    by_food = defaultdict(list)
+    for _, r in received:
+        by_food[r["food_id"]].append(r["ts"])
+    ordered = all(ts == sorted(ts) for ts in by_food.values())
+    print(f"\n受信 {len(received)} 件 / 食品 {len(by_food)} 種 / 食品ごとの順序: {'OK' if ordered else 'NG'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--down", nargs="*", default=[], help="停止する時間帯 start:end（秒）")
+    args = parser.parse_args()
+
+    down = [tuple(float(x) for x in d.split(":")) for d in args.down]
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", args.port), make_handler(time.monotonic(), down)
+    )
+    print(f"stub: http://127.0.0.1:{args.port} down={down}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        summary()
+
+
+if __name__ == "__main__":
+    main()
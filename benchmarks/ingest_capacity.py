@@ -0,0 +1,283 @@
+"""
+秤の同時接続数に対する受信側の処理能力（オフラインで実行可能、aiohttp が必要）
+
+子プロセスで一時 SQLite のアプリを起動し、次の 3 つに同じ負荷をかける：
+  flask-http : 従来の /api/update_weight（Flask 開発サーバー、threaded＝1 リクエスト 1 スレッド、
+               応答は Connection: close なので毎回 TCP 接続し直す）
+  async-http : services/aio_ingest.py の /api/update_weight（1 スレッドのイベントループ）
+  async-ws   : 同じく /ws（WebSocket、1 メッセージ 1 ack）
+各秤は（可能なら）1 本の接続を保持したまま --interval 秒ごとに読み取り値を送る。
+--interval 0 は応答が来たらすぐ次を送る（飽和時の処理能力）。
+接続数ごとに ok/エラー・req/s・レイテンシ p50/p95/p99・サーバープロセスのスレッド数（最大）を表示する。
+
+用法：python benchmarks/ingest_capacity.py [--connections 50,200,500] [--duration 10]
+      [--interval 1.0] [--window 1]（0 = 受信時に同期反映）
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TARGETS = ("flask-http", "async-http", "async-ws")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+
+# ---------- サーバー側（子プロセス） ----------
+def serve(args):
+    """アプリと非同期受信サーバーを起動し、ポートを 1 行出力して stdin が閉じるまで待つ"""
+    import logging
+    import threading
+    from datetime import date
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    os.environ["DB_URI"] = f"sqlite:///{tmp.name}"
+    os.environ.setdefault("SECRET_KEY", "ingest-capacity")
+    os.environ["INGEST_WINDOW_SECONDS"] = str(args.window)
+    os.chdir(tempfile.mkdtemp())
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # /api/update_weight の print を捨てる
+
+    from werkzeug.serving import make_server
+
+    import app as app_module
+    from controllers.today_foods import seed_rows
+    from models import Foods, db
+    from services.aio_ingest import AsyncIngestServer
+    from services.catalog import catalog
+    from services.migrations import upgrade
+
+    app = app_module.app
+    with app.app_context():
+        db.create_all()
+        upgrade()
+        db.session.add_all(
+            Foods(name=f"料理-{i}", category="bench", weight=2000, decay_rate=3,
+                  warning_threshold=600, critical_threshold=200, status=1)
+            for i in range(1, args.dishes + 1)
+        )
+        db.session.commit()
+        food_ids = [f.id for f in Foods.query.all()]
+        seed_rows(date.today(), date.today(), food_ids, (len(food_ids), len(food_ids)))
+        db.session.commit()
+        catalog.warm()
+
+    # app.run() と同じ開発サーバー（threaded）
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    aio = AsyncIngestServer(app, "127.0.0.1", 0, window=args.window).start()
+
+    stdout.write(json.dumps({"flask": server.server_port, "async": aio.port, "food_ids": food_ids}) + "\n")
+    stdout.flush()
+    sys.stdin.read()  # 親プロセスが終わるまで
+
+    server.shutdown()
+    aio.stop()
+    # 残りを書き戻してから一時 DB を消す（終了時の atexit では何も残らないように）
+    app_module.scheduler.shutdown(wait=True)
+    app_module.flush_ingest()
+    app_module.flush_board()
+    os.unlink(tmp.name)
+
+
+# ---------- 負荷側 ----------
+def thread_count(pid):
+    """サーバープロセスのスレッド数（Linux の /proc；取れなければ None）"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+class Result:
+    def __init__(self):
+        self.latency = []
+        self.status = Counter()
+
+    def add(self, ms, status):
+        self.latency.append(ms)
+        self.status[status] += 1
+
+
+async def http_scale(session, url, food_id, args, deadline, result):
+    import aiohttp
+
+    weight = 2000.0
+    await asyncio.sleep(random.uniform(0, args.interval))  # 接続開始をばらす
+    while time.perf_counter() < deadline:
+        weight = max(weight - 7.5, 0) or 2000.0
+        start = time.perf_counter()
+        try:
+            async with session.post(url, json={"food_id": food_id, "weight": weight}) as res:
+                await res.read()
+                status = res.status
+                retry_after = float(res.headers.get("Retry-After", 0))
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            status, retry_after = 0, 0
+        result.add((time.perf_counter() - start) * 1000, status)
+        # 503 は秤側と同じく Retry-After 秒待ってから次を送る
+        await asyncio.sleep(max(args.interval, retry_after))
+
+
+async def ws_scale(session, url, food_id, args, deadline, result):
+    import aiohttp
+
+    weight = 2000.0
+    await asyncio.sleep(random.uniform(0, args.interval))
+    try:
+        ws = await session.ws_connect(url)
+    except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+        result.add(0.0, 0)
+        return
+    async with ws:
+        n = 0
+        while time.perf_counter() < deadline:
+            weight = max(weight - 7.5, 0) or 2000.0
+            n += 1
+            start = time.perf_counter()
+            try:
+                await ws.send_str(json.dumps({"id": n, "food_id": food_id, "weight": weight}))
+                ack = await ws.receive_json(timeout=10)
+                status = ack["code"]
+            except (asyncio.TimeoutError, TypeError, ValueError, aiohttp.ClientError):
+                status = 0
+            result.add((time.perf_counter() - start) * 1000, status)
+            if status == 0:
+                return
+            await asyncio.sleep(args.interval)
+
+
+async def run_level(target, connections, ports, food_ids, pid, args):
+    import aiohttp
+
+    result = Result()
+    peak_threads = 0
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        port = ports["flask"] if target == "flask-http" else ports["async"]
+        deadline = time.perf_counter() + args.duration
+        if target == "async-ws":
+            worker, url = ws_scale, f"http://127.0.0.1:{port}/ws"
+        else:
+            worker, url = http_scale, f"http://127.0.0.1:{port}/api/update_weight"
+        tasks = [
+            asyncio.ensure_future(
+                worker(session, url, food_ids[i % len(food_ids)], args, deadline, result)
+            )
+            for i in range(connections)
+        ]
+        started = time.perf_counter()
+        while not all(t.done() for t in tasks):
+            peak_threads = max(peak_threads, thread_count(pid) or 0)
+            await asyncio.sleep(0.2)
+        elapsed = time.perf_counter() - started
+    await asyncio.sleep(1)  # 切断後のスレッド終了を待つ
+    return result, elapsed, peak_threads
+
+
+def report_row(target, connections, result, elapsed, peak_threads):
+    ok = result.status[200] + result.status[202]
+    errors = sum(result.status.values()) - ok
+    values = result.latency
+    print(
+        f"{target:<12}{connections:>6}{ok:>8}{errors:>7}{ok / elapsed:>8.1f}"
+        f"{percentile(values, 50):>9.1f}{percentile(values, 95):>9.1f}{percentile(values, 99):>9.1f}"
+        f"{peak_threads or '-':>9}"
+    )
+    return {
+        "target": target,
+        "connections": connections,
+        "ok": ok,
+        "errors": errors,
+        "status": dict(result.status),
+        "rps": round(ok / elapsed, 1),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "threads": peak_threads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", default="50,200,500", help="同時接続数（カンマ区切り）")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=1.0, help="秤 1 台の送信間隔（秒）")
+    parser.add_argument("--window", type=float, default=1, help="INGEST_WINDOW_SECONDS（0 = 同期反映）")
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument("--dishes", type=int, default=60)
+    parser.add_argument("--json", help="結果を JSON で保存するパス")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        raise SystemExit("aiohttp が必要です：pip install aiohttp")
+
+    child = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve",
+         "--window", str(args.window), "--dishes", str(args.dishes)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        line = child.stdout.readline()
+        if not line:
+            raise SystemExit("サーバーの起動に失敗しました")
+        ports = json.loads(line)
+        food_ids = ports.pop("food_ids")
+        levels = [int(n) for n in args.connections.split(",")]
+        targets = [t for t in args.targets.split(",") if t in TARGETS]
+        print(
+            f"window={args.window}s interval={args.interval}s duration={args.duration}s "
+            f"dishes={args.dishes}\n"
+        )
+        print(f"{'target':<12}{'conns':>6}{'ok':>8}{'err':>7}{'req/s':>8}"
+              f"{'p50':>9}{'p95':>9}{'p99':>9}{'threads':>9}  (ms)")
+        rows = []
+        for connections in levels:
+            for target in targets:
+                result, elapsed, peak = asyncio.run(
+                    run_level(target, connections, ports, food_ids, child.pid, args)
+                )
+                rows.append(report_row(target, connections, result, elapsed, peak))
+        print("\nerr = 接続失敗・タイムアウト・503 など（2xx 以外）；threads = サーバープロセスの最大スレッド数")
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+    finally:
+        with contextlib.suppress(OSError):
+            child.stdin.close()
+        try:
+            child.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            child.kill()
+
+
+if __name__ == "__main__":
+    main()
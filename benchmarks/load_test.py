@@ -0,0 +1,286 @@
+"""
+KDS バックエンドの負荷テスト（オフラインで実行可能）
+
+- 一時 SQLite（または --db で指定した DB）に対して app.py を起動
+- seed_rows で本日分の料理を N 件投入
+- M 台の秤が /api/update_weight に POST、K 台のタブレットが /today_foods をポーリング
+- その間も衰減スケジューラは通常どおり動作
+
+レポート：エンドポイント別 p50/p95/p99 レイテンシ・req/s・エラー数、
+衰減 tick / 書き戻しの所要時間、DB クエリ数（種類別）
+
+用法：python benchmarks/load_test.py --dishes 60 --scales 30 --tablets 12 --duration 20
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+
+class Recorder:
+    """スレッドから計測値を集める"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(list)  # name -> [ms]
+        self.errors = Counter()
+        self.status = defaultdict(Counter)
+
+    def add(self, name, ms, status):
+        with self._lock:
+            self.latency[name].append(ms)
+            self.status[name][status] += 1
+            if status >= 400 or status == 0:
+                self.errors[name] += 1
+
+
+def timed(func, samples):
+    """スケジューラのジョブ関数をラップして所要時間を記録"""
+
+    def wrapper():
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return wrapper
+
+
+class Client:
+    """keep-alive の HTTP クライアント（1 スレッド 1 接続）"""
+
+    def __init__(self, port, cookie=None):
+        self.port = port
+        self.cookie = cookie
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            res = self.conn.getresponse()
+            data = res.read()
+            return res.status, res.headers, data
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+            return 0, {}, b""
+
+
+def login(port, username, password):
+    client = Client(port)
+    status, headers, _ = client.request(
+        "POST", "/login", {"username": username, "password": password}
+    )
+    if status != 200:
+        raise SystemExit(f"ログイン失敗: {status}")
+    return headers["Set-Cookie"].split(";", 1)[0]
+
+
+def scale_worker(port, food_id, interval, stop, rec):
+    client = Client(port)
+    weight = 2000.0
+    while not stop.is_set():
+        weight = max(weight - 7.5, 0) or 2000.0
+        start = time.perf_counter()
+        status, _, _ = client.request(
+            "POST", "/api/update_weight", {"food_id": food_id, "weight": weight}
+        )
+        rec.add("POST /api/update_weight", (time.perf_counter() - start) * 1000, status)
+        stop.wait(interval)
+
+
+def tablet_worker(port, cookie, interval, use_etag, stop, rec):
+    client = Client(port, cookie)
+    etag = None
+    while not stop.is_set():
+        headers = {"X-Requested-With": "XMLHttpRequest"}
+        if use_etag and etag:
+            headers["If-None-Match"] = etag
+        start = time.perf_counter()
+        status, res_headers, _ = client.request("GET", "/today_foods", headers=headers)
+        rec.add("GET /today_foods", (time.perf_counter() - start) * 1000, status)
+        if status == 200:
+            etag = res_headers.get("ETag")
+        stop.wait(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dishes", type=int, default=60)
+    parser.add_argument("--scales", type=int, default=30)
+    parser.add_argument("--tablets", type=int, default=12)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--scale-interval", type=float, default=1.0)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--etag", action="store_true", help="タブレットが If-None-Match を送る")
+    parser.add_argument("--db", help="SQLAlchemy URI（默认临时 SQLite）")
+    parser.add_argument("--json", help="結果を JSON で保存するパス")
+    args = parser.parse_args()
+
+    tmp = None
+    if not args.db:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        args.db = f"sqlite:///{tmp.name}"
+    # app.py は import 時に設定を読むので先に環境変数を設定
+    os.environ["DB_URI"] = args.db
+    os.environ.setdefault("SECRET_KEY", "load-test")
+    os.chdir(tempfile.mkdtemp())  # task_status.json などを作業ディレクトリに閉じ込める
+    print(
+        f"DB={args.db} dishes={args.dishes} scales={args.scales} "
+        f"tablets={args.tablets} duration={args.duration}s"
+    )
+    # アプリ側の print / アクセスログは計測中は捨てる
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    devnull = open(os.devnull, "w")
+    with contextlib.redirect_stdout(devnull):
+        elapsed, rec, tick_ms, flush_ms, queries = run(args)
+    devnull.close()
+
+    report(args, elapsed, rec, tick_ms, flush_ms, queries)
+    if tmp:
+        os.unlink(tmp.name)
+
+
+def run(args):
+    """アプリを起動して負荷をかける；(経過秒, Recorder, tick, flush, クエリ数) を返す"""
+    from sqlalchemy import event
+    from werkzeug.serving import make_server
+
+    import app as app_module
+    from controllers.today_foods import seed_rows
+    from models import Chefs, Foods, db
+    from services.catalog import catalog
+    from services.migrations import upgrade
+
+    app = app_module.app
+    queries = Counter()
+    with app.app_context():
+        db.create_all()
+        upgrade()
+        db.session.add_all(
+            Foods(name=f"料理-{i}", category="bench", weight=2000, decay_rate=3,
+                  warning_threshold=600, critical_threshold=200, status=1)
+            for i in range(1, args.dishes + 1)
+        )
+        chef = Chefs(username="bench", nickname="bench", advice="", status=1)
+        chef.set_password("bench")
+        db.session.add(chef)
+        db.session.commit()
+        food_ids = [f.id for f in Foods.query.all()]
+        seed_rows(date.today(), date.today(), food_ids, (len(food_ids), len(food_ids)))
+        db.session.commit()
+        catalog.warm()
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_query(conn, cursor, statement, parameters, context, executemany):
+            queries[statement.lstrip().split(" ", 1)[0].upper()] += 1
+
+    # 衰減・書き戻しジョブの所要時間
+    tick_ms, flush_ms = [], []
+    app_module.scheduler.modify_job("decay_task", func=timed(app_module.decay_today_foods, tick_ms))
+    app_module.scheduler.modify_job("flush_task", func=timed(app_module.flush_board, flush_ms))
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cookie = login(port, "bench", "bench")
+
+    rec = Recorder()
+    stop = threading.Event()
+    queries.clear()
+    workers = [
+        threading.Thread(
+            target=scale_worker,
+            args=(port, food_ids[i % len(food_ids)], args.scale_interval, stop, rec),
+        )
+        for i in range(args.scales)
+    ] + [
+        threading.Thread(
+            target=tablet_worker,
+            args=(port, cookie, args.poll_interval, args.etag, stop, rec),
+        )
+        for _ in range(args.tablets)
+    ]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    time.sleep(args.duration)
+    stop.set()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    # ジョブ停止後に残りを書き戻す（終了時の atexit では何も残らないように）
+    app_module.scheduler.shutdown(wait=True)
+    app_module.flush_ingest()
+    app_module.flush_board()
+    return elapsed, rec, tick_ms, flush_ms, queries
+
+
+def report(args, elapsed, rec, tick_ms, flush_ms, queries):
+    result = {"elapsed_s": round(elapsed, 2), "endpoints": {}, "jobs": {}, "queries": dict(queries)}
+    print(f"\n{'endpoint':<28}{'count':>7}{'req/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'err':>6}  (ms)")
+    for name, values in sorted(rec.latency.items()):
+        row = {
+            "count": len(values),
+            "rps": round(len(values) / elapsed, 1),
+            "p50": round(percentile(values, 50), 2),
+            "p95": round(percentile(values, 95), 2),
+            "p99": round(percentile(values, 99), 2),
+            "errors": rec.errors[name],
+            "status": dict(rec.status[name]),
+        }
+        result["endpoints"][name] = row
+        print(
+            f"{name:<28}{row['count']:>7}{row['rps']:>8}{row['p50']:>8}"
+            f"{row['p95']:>8}{row['p99']:>8}{row['errors']:>6}"
+        )
+
+    print()
+    for name, samples in (("decay tick", tick_ms), ("board flush", flush_ms)):
+        if not samples:
+            continue
+        row = {
+            "count": len(samples),
+            "mean": round(statistics.mean(samples), 2),
+            "p95": round(percentile(samples, 95), 2),
+            "max": round(max(samples), 2),
+        }
+        result["jobs"][name] = row
+        print(f"{name:<14} n={row['count']:<5} mean={row['mean']}ms p95={row['p95']}ms max={row['max']}ms")
+
+    total_queries = sum(queries.values())
+    print(f"\nDB queries: {total_queries} ({total_queries / elapsed:.1f}/s) {dict(queries)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
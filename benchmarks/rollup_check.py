@@ -0,0 +1,119 @@
+"""
+日集计（daily_food_totals）的检查：DECAY_MODE=sql 的看板写回后集计行与 today_foods 一致
+（services/board.py 的 attach / refresh / flush 和 services/rollup.py；默认使用临时 SQLite）
+
+1. 新上架（attach）的菜品写回后有集计行，消耗量为 0
+2. 数据库端衰减（decay_in_db）→ leader 同步（refresh(track_decay=True)）→ 写回后消耗量等于衰减量
+3. follower 同步（track_decay=False）不写集计
+
+用法：python benchmarks/rollup_check.py [--ticks 3] [--db URI]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from models import DailyFoodTotals, Foods, TodayFoods, db  # noqa: E402
+from services.board import LiveBoard, decay_in_db  # noqa: E402
+
+START_WEIGHT = 1000
+DECAY_RATE = 5
+
+
+def create_app(uri):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def check(name, passed):
+    print(f"[{'OK' if passed else 'NG'}] {name}")
+    return passed
+
+
+def totals(food_id):
+    db.session.expire_all()
+    return DailyFoodTotals.query.filter_by(record_date=date.today(), food_id=food_id).first()
+
+
+def tick(live, track_decay):
+    """app.py 的 decay_today_foods（DECAY_MODE=sql）的一秒"""
+    live.flush(record_decay=False)
+    if track_decay:
+        decay_in_db(date.today(), datetime.now(ZoneInfo("Asia/Tokyo")))
+    live.refresh(track_decay=track_decay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=3)
+    parser.add_argument("--db", help="SQLAlchemy URI（默认临时 SQLite）")
+    args = parser.parse_args()
+
+    tmp = None
+    uri = args.db
+    if not uri:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        uri = f"sqlite:///{tmp.name}"
+
+    ok = True
+    app = create_app(uri)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        live = LiveBoard()
+        live.write_through = True
+        live.ensure_loaded(date.today())
+
+        # 1. 上架（controllers/today_foods.py 的 append_food 同样是先提交再 attach）
+        food = Foods(name="集计检查", category="bench", weight=START_WEIGHT, decay_rate=DECAY_RATE,
+                     warning_threshold=300, critical_threshold=100, status=1)
+        db.session.add(food)
+        db.session.flush()
+        tf = TodayFoods(food_id=food.id, total_weight=START_WEIGHT, current_weight=START_WEIGHT,
+                        record_date=date.today(), status=1, remain=0)
+        db.session.add(tf)
+        db.session.commit()
+        live.attach(tf)
+        live.flush()
+        row = totals(food.id)
+        ok &= check(
+            "上架后有集计行",
+            row is not None and row.total_weight == START_WEIGHT and row.consumed_weight == 0,
+        )
+
+        # 2. leader：数据库端衰减后同步，写回时记入消耗量
+        for _ in range(args.ticks):
+            tick(live, track_decay=True)
+        live.flush()
+        row = totals(food.id)
+        expected = DECAY_RATE * args.ticks
+        consumed = row.consumed_weight if row else None
+        ok &= check(f"衰减 {args.ticks} 次后的消耗量 {consumed}（预期 {expected}）", consumed == expected)
+
+        # 3. follower：另一个进程的看板只同步显示，不写集计
+        follower = LiveBoard()
+        follower.write_through = True
+        follower.ensure_loaded(date.today())
+        decay_in_db(date.today(), datetime.now(ZoneInfo("Asia/Tokyo")))
+        tick(follower, track_decay=False)
+        follower.flush()
+        row = totals(food.id)
+        ok &= check("follower 不写集计", row is not None and row.consumed_weight == expected)
+
+    if tmp:
+        os.unlink(tmp.name)
+    print("\n全部通过" if ok else "\n有未通过的检查")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+菜品搜索：LIKE '%kw%' 与内存 n-gram 索引（services/search.py）的对比
+
+1. 临时 SQLite 中生成数千道菜（中文・日文名称）和 today_foods 履历
+2. 对几个关键词分别执行
+     like  : 原来的 Foods.name.like('%kw%')（/foods）和 join + like（get_days）
+     index : food_index.search(kw) 求出 id 后用 IN 查询
+3. 确认两者结果一致，并输出每次搜索（件数 + 第 1 页，与画面相同）的中位时间
+
+用法：python benchmarks/search_bench.py [--foods 5000] [--days 60]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from controllers.today_foods import seed_rows  # noqa: E402
+from models import Foods, TodayFoods, db  # noqa: E402
+from services.catalog import catalog  # noqa: E402
+from services.search import food_index  # noqa: E402
+
+PARTS = [
+    "麻婆", "豆腐", "回锅", "肉", "宫保", "鸡丁", "红烧", "牛肉", "清蒸", "鱼",
+    "唐揚げ", "照り焼き", "チキン", "味噌", "ラーメン", "カレー", "天ぷら", "寿司",
+    "焼き", "サラダ", "スープ", "炒饭", "饺子", "春巻", "Omelette", "Pasta",
+]
+CATEGORIES = ["中華", "和食", "洋食", "デザート", "ドリンク", "サラダ"]
+KEYWORDS = ["豆腐", "牛肉", "カレー", "照り焼き", "pasta", "鱼", "和食", "存在しない"]
+
+
+def create_app(uri):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def seed(count, days):
+    random.seed(1)
+    db.create_all()
+    db.session.add_all(
+        Foods(
+            name="".join(random.sample(PARTS, random.randint(2, 3))) + f"{i}",
+            category=random.choice(CATEGORIES),
+            weight=1000,
+            decay_rate=1,
+            warning_threshold=300,
+            critical_threshold=100,
+            status=1,
+        )
+        for i in range(count)
+    )
+    db.session.commit()
+    ids = [f.id for f in Foods.query.all()]
+    seed_rows(date.today() - timedelta(days=days - 1), date.today(), ids, (40, 60))
+    db.session.commit()
+
+
+def like_foods(kw):
+    like = f"%{kw}%"
+    return Foods.active().filter(db.or_(Foods.name.like(like), Foods.category.like(like)))
+
+
+def index_foods(kw):
+    return Foods.active().filter(Foods.id.in_(sorted(food_index.search(kw))))
+
+
+def like_days(kw):
+    like = f"%{kw}%"
+    return TodayFoods.active().join(TodayFoods.food).filter(
+        db.or_(Foods.name.like(like), Foods.category.like(like))
+    )
+
+
+def index_days(kw):
+    ids = sorted(food_index.search(kw, include_deleted=True))
+    return TodayFoods.active().filter(TodayFoods.food_id.in_(ids))
+
+
+def page(model, build, kw):
+    """与画面相同：件数 + 第 1 页（10 条）"""
+    query = build(kw)
+    return query.count(), query.order_by(model.id.desc()).limit(10).all()
+
+
+def measure(model, build, kw, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page(model, build, kw)
+        times.append(time.perf_counter() - start)
+        db.session.expunge_all()
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--foods", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    app = create_app(f"sqlite:///{tmp.name}")
+    ok = True
+    with app.app_context():
+        seed(args.foods, args.days)
+        start = time.perf_counter()
+        catalog.warm()
+        food_index.build()
+        print(f"foods={args.foods} today_foods={TodayFoods.query.count()} "
+              f"索引构建 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        print(f"\n{'keyword':<12}{'hits':>6}{'foods like':>12}{'index':>10}"
+              f"{'days like':>12}{'index':>10}   (ms, median)")
+        for kw in KEYWORDS:
+            t1 = measure(Foods, like_foods, kw, args.repeat)
+            t2 = measure(Foods, index_foods, kw, args.repeat)
+            t3 = measure(TodayFoods, like_days, kw, args.repeat)
+            t4 = measure(TodayFoods, index_days, kw, args.repeat)
+            # 结果（全部 id）是否与 LIKE 一致
+            r1 = {f.id for f in like_foods(kw)}
+            same = r1 == {f.id for f in index_foods(kw)} and (
+                {t.id for t in like_days(kw)} == {t.id for t in index_days(kw)}
+            )
+            ok &= same
+            print(f"{kw:<12}{len(r1):>6}{t1:>12.2f}{t2:>10.2f}{t3:>12.2f}{t4:>10.2f}"
+                  f"{'' if same else '   结果不一致'}")
+
+    os.unlink(tmp.name)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
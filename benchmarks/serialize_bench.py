@@ -0,0 +1,145 @@
+"""
+看板 JSON 序列化：原来的 to_dict 路径与 services/serializer.py 的对比
+
+1. 临时 SQLite 中生成 N 道菜的当天数据，加载到 LiveBoard
+2. 分别计时（一次 /today_foods 全量响应：列表 + stats + JSON 编码）
+     orm      : TodayFoods.query + joinedload → to_dict()，stats 扫描 3 次，json.dumps
+     entry    : 看板上逐行 BoardEntry.to_dict()，stats 扫描 3 次，json.dumps
+     tuples   : 列元组 → RowSerializer（stats 同一循环），json 编码
+     orjson   : 同上，orjson 编码（未安装则跳过）
+3. 确认 entry 与 tuples 的结果完全一致，输出中位时间
+
+用法：python benchmarks/serialize_bench.py [--rows 200] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from models import Foods, TodayFoods, db  # noqa: E402
+from services import serializer  # noqa: E402
+from services.board import BoardEntry, board  # noqa: E402
+from services.catalog import catalog  # noqa: E402
+
+
+def create_app(uri):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def seed(count):
+    db.create_all()
+    foods = [
+        Foods(name=f"料理{i}", category="和食", weight=1000, decay_rate=1 + i % 5,
+              warning_threshold=300, critical_threshold=100, status=1)
+        for i in range(count)
+    ]
+    db.session.add_all(foods)
+    db.session.flush()
+    db.session.add_all(
+        TodayFoods(food_id=f.id, total_weight=1000, current_weight=(i * 37) % 1000,
+                   record_date=date.today(), status=1, remain=i % 4)
+        for i, f in enumerate(foods)
+    )
+    db.session.commit()
+
+
+def stats_3pass(data):
+    remains = [d["remain"] for d in data]
+    return {
+        "total": len(remains),
+        "warning": remains.count(1),
+        "critical": remains.count(2),
+        "empty": remains.count(3),
+    }
+
+
+def orm_path():
+    rows = (
+        TodayFoods.query.filter_by(record_date=date.today(), status=1)
+        .options(joinedload(TodayFoods.food))
+        .all()
+    )
+    data = [r.to_dict() for r in rows]
+    result = json.dumps({"data": data, "stats": stats_3pass(data)}, ensure_ascii=False)
+    db.session.expunge_all()
+    return result
+
+
+def entry_rows():
+    with board._lock:
+        data = [e.to_dict() for e in sorted(board.entries.values(), key=BoardEntry.urgency)]
+    return data, stats_3pass(data)
+
+
+def entry_path():
+    data, stats = entry_rows()
+    return json.dumps({"data": data, "stats": stats}, ensure_ascii=False)
+
+
+def tuple_path():
+    data, stats = board.snapshot_with_stats()
+    return serializer.dumps({"data": data, "stats": stats})
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    app = create_app(f"sqlite:///{tmp.name}")
+    with app.app_context():
+        seed(args.rows)
+        catalog.warm()
+        board.ensure_loaded(date.today())
+
+        # 结果一致性：逐行 to_dict 与列元组批量转换
+        same = entry_rows() == board.snapshot_with_stats()
+        print(f"rows={len(board.entries)} 结果一致: {same}")
+
+        orjson = serializer.orjson
+        cases = [("orm", orm_path), ("entry", entry_path)]
+        serializer.orjson = None
+        cases.append(("tuples", tuple_path))
+        base = {}
+        for name, func in cases:
+            base[name] = measure(func, args.repeat)
+        serializer.orjson = orjson
+        if orjson is not None:
+            base["orjson"] = measure(tuple_path, args.repeat)
+
+        print(f"\n{'path':<10}{'ms':>10}{'x orm':>10}")
+        for name, ms in base.items():
+            print(f"{name:<10}{ms:>10.3f}{base['orm'] / ms:>10.1f}")
+        if orjson is None:
+            print("orjson 未安装，已跳过")
+
+    os.unlink(tmp.name)
+    sys.exit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
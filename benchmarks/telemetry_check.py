@@ -0,0 +1,74 @@
+"""
+UDP 遥测去重的检查（services/telemetry.py 的 TelemetryListener.accept / handle；不需要数据库）
+
+1. 重复帧、乱序的旧帧被丢弃
+2. 秤重启（seq 从 1 重新开始、ts 正常前进）后的帧立即被接受
+3. 重启后时钟还没同步（ts 比重启前旧）时，静默 SEQ_RESTART_IDLE 秒后被接受
+4. NaN / inf 的重量不放入队列
+
+用法：python benchmarks/telemetry_check.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.telemetry import SEQ_RESTART_IDLE, TelemetryListener  # noqa: E402
+from telemetry_client import encode  # noqa: E402
+
+
+class FakeQueue:
+    def __init__(self):
+        self.readings = []
+
+    def put(self, food_id, weight, ts):
+        self.readings.append((food_id, weight, ts))
+        return True
+
+
+def check(name, passed):
+    print(f"[{'OK' if passed else 'NG'}] {name}")
+    return passed
+
+
+def main():
+    ok = True
+    t0 = 1_700_000_000.0
+
+    listener = TelemetryListener(queue=FakeQueue())
+    for seq in range(1, 501):
+        listener.accept(7, seq, t0 + seq, now=seq)
+    ok &= check("重复帧", not listener.accept(7, 500, t0 + 500, now=501))
+    ok &= check("乱序的旧帧", not listener.accept(7, 498, t0 + 498, now=501))
+
+    # 重启：seq 从 1 开始，ts 比重启前新；之后的帧全部接受
+    accepted = sum(
+        listener.accept(7, seq, t0 + 600 + seq, now=600 + seq) for seq in range(1, 121)
+    )
+    ok &= check(f"重启后（ts 正常）接受 {accepted}/120 帧", accepted == 120)
+
+    # 重启后时钟回到过去：只靠静默时间判断
+    listener = TelemetryListener(queue=FakeQueue())
+    listener.accept(7, 500, t0, now=0)
+    ok &= check("时钟未同步・刚发过帧 → 丢弃", not listener.accept(7, 1, t0 - 3600, now=5))
+    resumed = listener.accept(7, 1, t0 - 3600, now=SEQ_RESTART_IDLE + 1)
+    accepted = resumed + sum(
+        listener.accept(7, seq, t0 - 3600 + seq, now=SEQ_RESTART_IDLE + seq)
+        for seq in range(2, 121)
+    )
+    ok &= check(f"重启后（时钟未同步）静默后接受 {accepted}/120 帧", accepted == 120)
+
+    # 非有限的重量不进入队列
+    queue = FakeQueue()
+    listener = TelemetryListener(queue=queue)
+    data = encode(7, 1, t0, float("nan")) + encode(7, 2, t0 + 1, float("inf"))
+    data += encode(7, 3, t0 + 2, 512.0)
+    listener.handle(data)
+    ok &= check("NaN / inf 丢弃", queue.readings == [(7, 512.0, t0 + 2)] and listener.malformed == 2)
+
+    print("\n全部通过" if ok else "\n有未通过的检查")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
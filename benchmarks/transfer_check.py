@@ -0,0 +1,120 @@
+"""
+タブレット 1 台分の転送量チェック（オフラインで実行可能）
+
+一時 SQLite で app.py を読み込み、test client で次を計測する：
+  初回表示   : /（index.html）+ ページが参照する静的ファイル
+  再訪問     : 同上。?v= 付きは immutable なのでブラウザキャッシュから（リクエストなし）、
+               v なしは If-None-Match で再検証
+  ポーリング : /today_foods 1 回分（全件）と変化なし（304）
+それぞれ Accept-Encoding なし / gzip / br（brotli 導入時）で比較する。
+
+用法：python benchmarks/transfer_check.py [--dishes 60]
+"""
+import argparse
+import gzip
+import os
+import re
+import sys
+import tempfile
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ASSET_RE = re.compile(r"""(?:href|src)=["'](/static/[^"']+)["']|Audio\("(/static/[^"]+)"\)""")
+
+
+def setup(dishes):
+    import app as app_module
+    from controllers.today_foods import seed_rows
+    from models import Chefs, Foods, db
+    from services.catalog import catalog
+    from services.migrations import upgrade
+
+    app = app_module.app
+    app_module.scheduler.shutdown(wait=False)  # 計測中に看板が変わらないよう止める
+    with app.app_context():
+        db.create_all()
+        upgrade()
+        db.session.add_all(
+            Foods(name=f"料理-{i}", category="和食", weight=2000, decay_rate=3,
+                  warning_threshold=600, critical_threshold=200, status=1)
+            for i in range(1, dishes + 1)
+        )
+        chef = Chefs(username="bench", nickname="bench", advice="", status=1)
+        chef.set_password("bench")
+        db.session.add(chef)
+        db.session.commit()
+        food_ids = [f.id for f in Foods.query.all()]
+        seed_rows(date.today(), date.today(), food_ids, (len(food_ids), len(food_ids)))
+        db.session.commit()
+        catalog.warm()
+
+    client = app.test_client()
+    client.post("/login", json={"username": "bench", "password": "bench"})
+    return client
+
+
+def get(client, path, encoding, etag=None):
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get(path, headers=headers)
+
+
+def page_load(client, encoding, cache):
+    """(リクエスト数, バイト数)；cache = {url: etag} は前回の結果（再訪問用）"""
+    page = get(client, "/", encoding)
+    requests, size = 1, len(page.get_data())
+    html = page.get_data()
+    if page.headers.get("Content-Encoding") == "gzip":
+        html = gzip.decompress(html)
+    elif page.headers.get("Content-Encoding") == "br":
+        from services.compression import brotli
+
+        html = brotli.decompress(html)
+    for match in ASSET_RE.finditer(html.decode()):
+        url = match.group(1) or match.group(2)
+        if url in cache and "v=" in url:
+            continue  # immutable：ブラウザキャッシュから
+        resp = get(client, url, encoding, cache.get(url))
+        requests += 1
+        size += len(resp.get_data())
+        if resp.status_code == 200:
+            cache[url] = resp.headers.get("ETag")
+    return requests, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dishes", type=int, default=60)
+    args = parser.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    os.environ["DB_URI"] = f"sqlite:///{tmp.name}"
+    os.environ.setdefault("SECRET_KEY", "transfer-check")
+    os.chdir(tempfile.mkdtemp())
+    client = setup(args.dishes)
+
+    from services.compression import brotli
+
+    encodings = ["", "gzip"] + (["br"] if brotli is not None else [])
+    print(f"dishes={args.dishes}\n")
+    print(f"{'encoding':<10}{'初回':>16}{'再訪問':>16}{'poll':>10}{'poll 304':>10}")
+    for encoding in encodings:
+        cache = {}
+        first = page_load(client, encoding, cache)
+        again = page_load(client, encoding, cache)
+        poll = get(client, "/today_foods", encoding)
+        not_modified = get(client, "/today_foods", encoding, poll.headers["ETag"])
+        print(
+            f"{encoding or 'identity':<10}"
+            f"{first[1]:>10,}B/{first[0]:<3}{again[1]:>11,}B/{again[0]:<3}"
+            f"{len(poll.get_data()):>9,}B{not_modified.status_code:>10}"
+        )
+    print("\n（バイト数/リクエスト数）")
+    os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
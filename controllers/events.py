@@ -0,0 +1,30 @@
+from flask import jsonify, request
+
+from services.events import remain_events
+
+# 1 回に返すイベントの上限
+EVENTS_LIMIT = 200
+
+
+def get_events():
+    """
+    remain の変化イベントを取得する（カーソル方式）。
+    ?after=<seq> : seq より後のイベント（古い順）
+    after なし   : イベントは返さず、現在の seq だけ返す（初回のカーソル取得用）
+    """
+    after = request.args.get("after", type=int)
+    if after is None:
+        return jsonify({"code": 200, "msg": "success", "seq": remain_events.seq, "data": []})
+
+    events = remain_events.since(after, limit=EVENTS_LIMIT + 1)
+    has_more = len(events) > EVENTS_LIMIT
+    events = events[:EVENTS_LIMIT]
+    return jsonify(
+        {
+            "code": 200,
+            "msg": "success",
+            "seq": events[-1]["seq"] if events else max(after, remain_events.seq),
+            "has_more": has_more,
+            "data": events,
+        }
+    )
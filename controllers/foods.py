@@ -4,6 +4,8 @@ from flask import jsonify, request
 from sqlalchemy.exc import SQLAlchemyError
 
 from models import Foods, TodayFoods, db
+from services.board import board
+from services.catalog import catalog
 
 
 def add_food():
@@ -48,6 +50,7 @@ def add_food():
         )
         db.session.add(food)
         db.session.commit()
+        catalog.invalidate(food.id)
         return jsonify({"code": 200, "msg": "追加に成功しました", "data": food.to_dict()}), 200
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -72,8 +75,10 @@ def delete_food():
     ).first()
 
     if today_food:
+        board.detach(today_food)
         today_food.status = 2
 
     db.session.commit()
+    catalog.invalidate(food.id)
 
     return jsonify({"code": 200, "msg": "削除に成功しました"}), 200
@@ -0,0 +1,57 @@
+from datetime import date, datetime, time
+from flask import jsonify, request
+
+from models import TodayFoods, db
+from services.catalog import catalog
+from services.history import MINUTE, curve
+
+
+def get_history():
+    """
+    重量の推移（ダウンサンプリング済み）を取得する。
+    ?today_id=1            : 1 件分
+    ?date=2025-01-01       : その日の全食品（food_id で絞り込み可）
+    ?step=60               : 集約単位（秒、60 以上）
+    """
+    try:
+        step = max(int(request.args.get("step", MINUTE)), MINUTE)
+    except ValueError:
+        return jsonify({"code": 400, "msg": "step が不正です"}), 400
+
+    query = db.session.query(TodayFoods.id, TodayFoods.food_id, TodayFoods.record_date)
+    today_id = request.args.get("today_id")
+    if today_id:
+        query = query.filter(TodayFoods.id == today_id)
+    else:
+        try:
+            target = datetime.strptime(
+                request.args.get("date") or date.today().isoformat(), "%Y-%m-%d"
+            ).date()
+        except ValueError:
+            return jsonify({"code": 400, "msg": "日付形式が不正です（YYYY-MM-DD）"}), 400
+        query = query.filter(TodayFoods.record_date == target)
+        if request.args.get("food_id"):
+            query = query.filter(TodayFoods.food_id == request.args.get("food_id"))
+    rows = query.all()
+    if not rows:
+        return jsonify({"code": 404, "msg": "データが存在しません"}), 404
+
+    # 対象日の 0:00〜24:00 の範囲だけ読む（record_date と同じくサーバーのローカル時刻）
+    days = {d for _, _, d in rows}
+    start = datetime.combine(min(days), time.min).timestamp()
+    end = datetime.combine(max(days), time.max).timestamp()
+    points = curve([r.id for r in rows], start, end, step)
+
+    data = []
+    for today_id, food_id, record_date in rows:
+        food = catalog.get(food_id)
+        data.append(
+            {
+                "today_id": today_id,
+                "food_id": food_id,
+                "name": food["name"] if food else None,
+                "record_date": record_date.strftime("%Y-%m-%d"),
+                "points": points.get(today_id, []),
+            }
+        )
+    return jsonify({"code": 200, "msg": "success", "step": step, "data": data})
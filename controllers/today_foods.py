@@ -1,50 +1,113 @@
 from datetime import date, datetime, timedelta
 import random
-from flask import jsonify, request
-from sqlalchemy import func
+import time
+from zoneinfo import ZoneInfo
+from flask import Response, jsonify, request, stream_with_context
+from flask_sqlalchemy.pagination import QueryPagination
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import joinedload
 from models import Foods, TodayFoods, db
+from services.board import board, refill_in_db
+from services.catalog import catalog
+from services.events import remain_events
+from services.history import history
+from services.search import food_index
+from services.serializer import dumps
+from services.rollup import save_totals, totals_since
 from utils import load_status
 
 
 def get_today_foods():
-    today = date.today()
-    foods = (
-        TodayFoods.query.filter_by(record_date=today)
-        .filter_by(status=1)
-        .options(joinedload(TodayFoods.food))  # ✅ Foods を一括ロード
-        .order_by(TodayFoods.id.desc())
-        .all()
-    )
-
-    data = [f.to_dict() for f in foods]
-
-    # 🔢 件数集計
-    total = len(data)
-    warning = sum(1 for f in data if f["remain"] == 1)
-    critical = sum(1 for f in data if f["remain"] == 2)
-    empty = sum(1 for f in data if f["remain"] == 3)
+    # ✅ DB ではなくメモリ上のライブボードから取得
+    board.ensure_loaded(date.today())
 
     # ✅ 定期タスク状態（True = 実行中, False = 停止中）
     decay_status = "running" if load_status() else "paused"
 
-    return (
-        jsonify(
+    # 🏷️ 変化がなければ 304（decay_status もレスポンスに含まれるため ETag に入れる）
+    # バージョンはプロセスごとなので、別の worker の ETag と一致しないようプロセス識別子も入れる
+    version = board.version
+    etag = f"{board.instance}-{version}-{decay_status}"
+    if request.if_none_match.contains_weak(etag):  # 圧縮時は弱 ETag になる
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    payload = {
+        "code": 200,
+        "msg": "取得に成功しました",
+        "version": version,
+        "instance": board.instance,  # ?since= と一緒に送り返す（別プロセスなら全件）
+        "decay_status": decay_status,  # 👈 追加項目
+        "event_seq": remain_events.seq,  # 🔔 これより新しいイベントは /api/events で取得
+    }
+
+    # ?since=<version> なら差分（変化した行 + 下架された ID）だけを返す
+    since = request.args.get("since", type=int)
+    if since is None:
+        # 🔢 件数集計は一覧の変換と同じループで行う
+        payload["data"], payload["stats"] = board.snapshot_with_stats()
+    else:
+        data, removed, full = board.changes_since(since, request.args.get("instance"))
+        payload["data"] = data
+        payload["stats"] = board.stats()
+        if not full:
+            payload["since"] = since
+            payload["removed"] = removed
+
+    response = Response(dumps(payload), mimetype="application/json")
+    response.set_etag(etag)
+    return response, 200
+
+
+# SSE のキープアライブ間隔（秒）
+STREAM_KEEPALIVE = 15
+
+
+def stream_today_foods():
+    """
+    SSE：接続時に全件スナップショット、その後は変化した行だけをプッシュ
+    """
+    board.ensure_loaded(date.today())
+    # 長時間の接続で DB コネクションを握り続けないよう先に返却
+    db.session.close()
+    sub = board.subscribe()
+
+    def snapshot():
+        data, stats = board.snapshot_with_stats()
+        return dumps(
             {
-                "code": 200,
-                "msg": "取得に成功しました",
+                "type": "snapshot",
+                "version": board.version,
+                "instance": board.instance,
                 "data": data,
-                "stats": {
-                    "total": total,
-                    "warning": warning,
-                    "critical": critical,
-                    "empty": empty,
-                },
-                "decay_status": decay_status,  # 👈 追加項目
+                "stats": stats,
+                "decay_status": "running" if load_status() else "paused",
+                "event_seq": remain_events.seq,
             }
-        ),
-        200,
+        )
+
+    @stream_with_context
+    def events():
+        try:
+            yield f"data: {snapshot()}\n\n"
+            while True:
+                message = sub.get(timeout=STREAM_KEEPALIVE)
+                if sub.overflow:
+                    # 追いつけない場合は積み残しを捨てて全件を送り直す
+                    sub.reset()
+                    message = snapshot()
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+        finally:
+            board.unsubscribe(sub)
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -70,6 +133,7 @@ def add_today_food():
             # ✅ 既に存在する場合：status を 1 に更新
             today_food.status = 1
             db.session.commit()
+            board.attach(today_food)
             msg = "既存の食品を再有効化しました"
         else:
             # ✅ 存在しない場合：新規追加
@@ -83,6 +147,7 @@ def add_today_food():
             )
             db.session.add(today_food)
             db.session.commit()
+            board.attach(today_food)
             msg = "食品を追加しました"
 
         return (
@@ -114,6 +179,8 @@ def del_today_food():
         return jsonify({"code": 400, "msg": "本日の食品データが存在しません"}), 400
 
     try:
+        # ボード上の最新重量を書き戻してから下架
+        board.detach(today_food)
         today_food.status = 2
         db.session.commit()
         return (
@@ -133,25 +200,43 @@ def append_food():
     if not today_id:
         return jsonify({"code": 400, "msg": "本日の食品IDが存在しません"}), 400
 
-    today_food = TodayFoods.query.filter_by(id=today_id).first()
-
-    if not today_food or not today_food.food:
-        return jsonify({"code": 400, "msg": "本日の食品データが存在しません"}), 400
-
-    try:
-        # Foods テーブルから初期重量を取得
-        add_weight = today_food.food.weight or 0
-
+    # ✅ 本日ボード上の食品はメモリ上で補充（DB へは定期的に書き戻し）
+    board.ensure_loaded(date.today())
+    entry = board.get(today_id)
+    if entry and entry.food:
+        add_weight = entry.food.get("weight") or 0
         if add_weight <= 0:
             return jsonify(
                 {"code": 400, "msg": "初期重量が設定されていないため、追加できません"}
             ), 400
+        board.refill(today_id, add_weight)
+        return (
+            jsonify({"code": 200, "msg": "上架に成功しました", "data": entry.to_dict()}),
+            200,
+        )
 
-        # 本日の食品重量を更新
-        today_food.total_weight += add_weight
-        today_food.current_weight += add_weight
+    try:
+        # ✅ 読み出してから加算せず、DB 側で 1 本の UPDATE（同時の補充・秤の更新で消えない）
+        now = datetime.now(ZoneInfo("Asia/Tokyo"))
+        if not refill_in_db(today_id, now):
+            db.session.rollback()
+            today_food = TodayFoods.query.filter_by(id=today_id).first()
+            if not today_food or not today_food.food:
+                return jsonify({"code": 400, "msg": "本日の食品データが存在しません"}), 400
+            return jsonify(
+                {"code": 400, "msg": "初期重量が設定されていないため、追加できません"}
+            ), 400
 
+        # 更新後の値を読み直して集計・履歴・レスポンスに使う
+        today_food = TodayFoods.query.filter_by(id=today_id).populate_existing().first()
+        history.record(today_food.id, time.time(), today_food.current_weight, "refill")
         db.session.commit()
+
+        # 日集計は補充のコミット後に別トランザクションで（失敗しても補充は残る）
+        save_totals(
+            today_food.record_date,
+            [(today_food.food_id, today_food.total_weight, today_food.current_weight, 1)],
+        )
         return (
             jsonify({"code": 200, "msg": "上架に成功しました", "data": today_food.to_dict()}),
             200,
@@ -162,38 +247,154 @@ def append_food():
 
 
 def stats():
-    """直近30日間の食品重量統計を取得"""
+    """直近30日間の食品重量統計を取得（daily_food_totals の集計済みデータを使用）"""
     today = date.today()
     start_date = today - timedelta(days=30)
 
-    results = (
-        db.session.query(
-            TodayFoods.record_date,
-            Foods.name,
-            func.sum(TodayFoods.total_weight).label("total_weight"),
-        )
-        .join(Foods, TodayFoods.food_id == Foods.id)
-        .filter(TodayFoods.record_date >= start_date)
-        .group_by(TodayFoods.record_date, Foods.name)
-        .order_by(TodayFoods.record_date.asc())  # SQL层按日期升序
-        .all()
-    )
-
     data = {}
-    for r in results:
+    food_names = set()
+    for r in totals_since(start_date):
+        food = catalog.get(r.food_id)
+        if not food:
+            continue
         # ⚡ 用完整年份-month-day 生成键，保证排序正确
         date_str = r.record_date.strftime("%Y-%m-%d")
-        if date_str not in data:
-            data[date_str] = {}
-        data[date_str][r.name] = r.total_weight
-
-    # 食品名称排序
-    food_names = sorted({r.name for r in results})
-
-    # ⚡ Python层按照完整日期排序
-    data = dict(sorted(data.items(), key=lambda x: x[0]))
-
-    return data, food_names
+        day = data.setdefault(date_str, {})
+        # 同名の食品は合算（従来の GROUP BY name と同じ）
+        day[food["name"]] = day.get(food["name"], 0) + r.total_weight
+        food_names.add(food["name"])
+
+    # ⚡ 日付順（SQL 側で昇順）、食品名称排序
+    return data, sorted(food_names)
+
+
+# /days の総件数キャッシュ：(keyword, date) -> (件数, 取得時刻)。ページャー表示用の概数
+DAYS_COUNT_TTL = 60
+_days_count_cache = {}
+
+
+class KeysetPagination(QueryPagination):
+    """
+    paginate() と同じ属性を持つページ送り。
+    after / before（id カーソル）があれば id の範囲検索で取得し、OFFSET を使わない。
+    どちらもなければ従来どおりページ番号（OFFSET）で取得する。
+    総件数は DAYS_COUNT_TTL 秒キャッシュする。
+    """
+
+    def _query_items(self):
+        query = self._query_args["query"]
+        after = self._query_args.get("after")
+        before = self._query_args.get("before")
+        self._more = None
+        if after is None and before is None:
+            return query.order_by(TodayFoods.id.desc()).limit(self.per_page).offset(
+                self._query_offset
+            ).all()
+
+        if after is not None:
+            rows = (
+                query.filter(TodayFoods.id < after)
+                .order_by(TodayFoods.id.desc())
+                .limit(self.per_page + 1)
+                .all()
+            )
+        else:
+            rows = (
+                query.filter(TodayFoods.id > before)
+                .order_by(TodayFoods.id.asc())
+                .limit(self.per_page + 1)
+                .all()
+            )
+        # 1 件多く取って次（前）があるか判定
+        self._more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        return rows if after is not None else rows[::-1]
+
+    def _query_count(self):
+        key = self._query_args["count_key"]
+        now = time.monotonic()
+        cached = _days_count_cache.get(key)
+        if cached and now - cached[1] < DAYS_COUNT_TTL:
+            return cached[0]
+        total = self._query_args["query"].order_by(None).count()
+        if len(_days_count_cache) >= 256:
+            _days_count_cache.clear()
+        _days_count_cache[key] = (total, now)
+        return total
+
+    @property
+    def has_next(self):
+        if self._query_args.get("after") is not None:
+            return self._more
+        return super().has_next
+
+    @property
+    def has_prev(self):
+        if self._query_args.get("before") is not None:
+            return self._more or self.page > 1
+        return super().has_prev
+
+    @property
+    def next_cursor(self):
+        return self.items[-1].id if self.items else None
+
+    @property
+    def prev_cursor(self):
+        return self.items[0].id if self.items else None
+
+    def page_cursors(self, count=2):
+        """
+        ページ番号リンク用のカーソル：{ページ番号: {"after": id} または {"before": id}}。
+        現在ページの前後 count ページは id の範囲検索で開けるようにする（深いページでも OFFSET なし）。
+        前後それぞれ id だけを取る 1 クエリで求める。1 ページ目はカーソルなし（OFFSET 0）。
+        最終ページは id の小さい側から（端数 + 1）件目の id を after にする（OFFSET は per_page 未満）。
+        """
+        cursors = {}
+        if not self.items:
+            return cursors
+        ids = self._query_args["query"].with_entities(TodayFoods.id)
+
+        # page + k は (page + k - 1) ページ目の最後の id より後：later[per_page * (k - 1)]
+        later = [self.items[-1].id]
+        later += [
+            r.id
+            for r in ids.filter(TodayFoods.id < later[0])
+            .order_by(TodayFoods.id.desc())
+            .limit(self.per_page * (count - 1) + 1)
+        ]
+        for k in range(1, count + 1):
+            i = self.per_page * (k - 1)
+            if i + 1 < len(later):  # そのページに 1 件以上ある
+                cursors[self.page + k] = {"after": later[i]}
+
+        # page - k は (page - k + 1) ページ目の最初の id より前：earlier[per_page * (k - 1)]
+        back = min(count, self.page - 2)
+        if back > 0:
+            earlier = [self.items[0].id]
+            earlier += [
+                r.id
+                for r in ids.filter(TodayFoods.id > earlier[0])
+                .order_by(TodayFoods.id.asc())
+                .limit(self.per_page * (back - 1))
+            ]
+            for k in range(1, back + 1):
+                i = self.per_page * (k - 1)
+                if i < len(earlier):
+                    cursors[self.page - k] = {"before": earlier[i]}
+
+        if self.pages > self.page and self.pages not in cursors:
+            rest = self.total - (self.pages - 1) * self.per_page
+            row = ids.order_by(TodayFoods.id.asc()).offset(rest).limit(1).first()
+            if row:
+                cursors[self.pages] = {"after": row.id}
+        return cursors
+
+
+def _int_arg(name):
+    try:
+        return int(request.values.get(name, ""))
+    except ValueError:
+        return None
 
 
 def get_days():
@@ -213,29 +414,83 @@ def get_days():
         else request.args.get("date", "").strip()
     )
 
-    query = TodayFoods.active().join(TodayFoods.food)
+    query = TodayFoods.active()
 
     if date_str:
         try:
             target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
             query = query.filter(TodayFoods.record_date == target_date)
         except ValueError:
-            pass  # 無効な日付形式は無視
+            date_str = ""  # 無効な日付形式は無視
 
     # 検索条件の構築
     if keyword:
-        query = query.filter(Foods.name.like(f"%{keyword}%"))
-
-    # ページネーション
-    pagination = (
-        query.order_by(TodayFoods.id.desc())
-        .options(joinedload(TodayFoods.food))  # ✅ Foods を一括ロード
-        .paginate(page=page, per_page=per_page, error_out=False)
+        if food_index.ready:
+            # メモリ上の索引で food_id を求め、(food_id, record_date) インデックスで検索
+            ids = food_index.search(keyword, include_deleted=True)
+            query = query.filter(TodayFoods.food_id.in_(sorted(ids)))
+        else:
+            query = query.join(TodayFoods.food).filter(Foods.name.like(f"%{keyword}%"))
+
+    # ページネーション：after / before があれば id カーソル、なければページ番号
+    pagination = KeysetPagination(
+        query=query.options(joinedload(TodayFoods.food)),  # ✅ Foods を一括ロード
+        page=page,
+        per_page=per_page,
+        error_out=False,
+        after=_int_arg("after"),
+        before=_int_arg("before"),
+        count_key=(keyword, date_str),
     )
 
     foods = pagination.items
     return foods, pagination, request, keyword, date_str
 
+def seed_rows(start_date, end_date, food_ids=range(1, 41), per_day=(10, 15)):
+    """
+    start_date〜end_date の各日にランダムな TodayFoods を追加する（commit は呼び出し側）。
+    (food_id, record_date) は一意なので、1 日の中で食品は重複させない。
+    """
+    food_ids = list(food_ids)
+    inserted_count = 0
+    current_date = start_date
+    now = datetime.now()
+
+    while current_date <= end_date:
+        num_records = min(random.randint(*per_day), len(food_ids))
+        for food_id in random.sample(food_ids, num_records):
+            total_weight = random.randint(500, 1000)
+            current_weight = random.randint(0, total_weight)
+
+            # 自动设置库存状态 remain
+            if current_weight <= 0:
+                remain = 3  # 卖完
+            elif current_weight < total_weight * 0.2:
+                remain = 2  # 危险
+            elif current_weight < total_weight * 0.4:
+                remain = 1  # 警告
+            else:
+                remain = 0  # 正常
+
+            today_food = TodayFoods(
+                food_id=food_id,
+                total_weight=total_weight,
+                current_weight=current_weight,
+                record_date=current_date,
+                status=1,
+                remain=remain,
+                created_at=now,
+                updated_at=now,
+            )
+
+            db.session.add(today_food)
+            inserted_count += 1
+
+        current_date += timedelta(days=1)
+
+    return inserted_count
+
+
 def seed_today_foods():
     start_str = request.args.get("start")
     end_str = request.args.get("end")
@@ -252,44 +507,8 @@ def seed_today_foods():
     if start_date > end_date:
         return jsonify({"error": "开始日期不能大于结束日期"}), 400
 
-    inserted_count = 0
-    current_date = start_date
-    now = datetime.now()
-
     try:
-        while current_date <= end_date:
-            num_records = random.randint(10, 15)
-            for _ in range(num_records):
-                food_id = random.randint(1, 40)
-                total_weight = random.randint(500, 1000)
-                current_weight = random.randint(0, total_weight)
-
-                # 自动设置库存状态 remain
-                if current_weight <= 0:
-                    remain = 3  # 卖完
-                elif current_weight < total_weight * 0.2:
-                    remain = 2  # 危险
-                elif current_weight < total_weight * 0.4:
-                    remain = 1  # 警告
-                else:
-                    remain = 0  # 正常
-
-                today_food = TodayFoods(
-                    food_id=food_id,
-                    total_weight=total_weight,
-                    current_weight=current_weight,
-                    record_date=current_date,
-                    status=1,
-                    remain=remain,
-                    created_at=now,
-                    updated_at=now,
-                )
-
-                db.session.add(today_food)
-                inserted_count += 1
-
-            current_date += timedelta(days=1)
-
+        inserted_count = seed_rows(start_date, end_date)
         db.session.commit()
         return jsonify({
             "message": "today_foods 数据生成成功",
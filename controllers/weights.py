@@ -0,0 +1,33 @@
+from flask import jsonify, request
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db
+from services.ingest import MAX_BATCH, apply_batch
+
+
+def update_weights():
+    """
+    複数の秤の読み取り値を一括で反映する。
+    body: {"readings": [{"food_id": 1, "weight": 812.5, "ts": 1730000000.0}, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get("readings") if isinstance(data, dict) else data
+    if not items or not isinstance(items, list):
+        return jsonify({"code": 400, "msg": "无数据"}), 400
+    if len(items) > MAX_BATCH:
+        return jsonify({"code": 413, "msg": f"一次最多 {MAX_BATCH} 条"}), 413
+
+    # ✅ ボード上の食品はロック 1 回、ボードにない食品は 1 トランザクションで反映
+    try:
+        results = apply_batch(items)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"code": 500, "msg": f"数据库错误：{str(e)}"}), 500
+
+    ok = sum(1 for r in results if r["status"] == "ok")
+    return (
+        jsonify(
+            {"code": 200, "msg": f"更新成功 {ok}/{len(items)}", "data": results}
+        ),
+        200,
+    )
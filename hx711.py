@@ -1,8 +1,13 @@
 import RPi.GPIO as GPIO
 from hx711 import HX711
+import queue
+import threading
 import time
 import requests
 
+from scale_pipeline import ScalePipeline
+from telemetry_client import TelemetrySender
+
 GPIO.setmode(GPIO.BCM)
 GPIO.setwarnings(False)
 
@@ -13,21 +18,62 @@ hx.tare()  # ゼロ点調整
 
 CLOUD_URL = "http://34.27.88.95:9000/api/update_weight"
 FOOD_ID = 1  # 这台秤对应哪道菜
+# 设置后改用 UDP 二进制遥测（服务器端 TELEMETRY_UDP_PORT），例：("34.27.88.95", 9001)
+TELEMETRY_ADDR = None
+
+# 采样与发送参数（变化小于死区不发送，超过心跳时间一定发送一次）
+SAMPLE_HZ = 10
+pipeline = ScalePipeline(
+    median_window=5,
+    alpha=0.3,
+    step_grams=150.0,
+    deadband_grams=10.0,
+    min_interval=1.0,
+    heartbeat=60.0,
+)
+
+# 只保留最新一条待发送数据，网络慢时不阻塞采样
+outbox = queue.Queue(maxsize=1)
+session = requests.Session()
+
+
+def sender():
+    while True:
+        w = outbox.get()
+        try:
+            response = session.post(CLOUD_URL, json={"food_id": FOOD_ID, "weight": w}, timeout=5)
+            print(f"数据已同步: {w}g, 响应: {response.status_code}")
+        except Exception as e:
+            print(f"同步失败: {e}")
 
-while True:
-    w = hx.get_weight(5) / SCALE
 
+def send_latest(w):
+    if udp:
+        udp.send(w)  # UDP は待たないのでそのまま送る
+        return
     try:
-        # 构造要发送的数据
-        payload = {
-            "food_id": FOOD_ID,
-            "weight": max(0, w)
-        }
-        # 通过网络发送到云端
-        response = requests.post(CLOUD_URL, json=payload, timeout=5)
-        print(f"数据已同步: {w}g, 响应: {response.status_code}")
-    except Exception as e:
-        print(f"同步失败: {e}")
-    
-    print(w)
-    time.sleep(5)
+        outbox.get_nowait()  # 丢掉还没发出去的旧值
+    except queue.Empty:
+        pass
+    outbox.put_nowait(w)
+
+
+udp = TelemetrySender(*TELEMETRY_ADDR, device_id=FOOD_ID) if TELEMETRY_ADDR else None
+if not udp:
+    threading.Thread(target=sender, daemon=True).start()
+
+interval = 1.0 / SAMPLE_HZ
+next_at = time.monotonic()
+while True:
+    raw = hx.get_weight(1) / SCALE
+    w = pipeline.update(raw)
+    if w is not None:
+        send_latest(w)
+
+    # 按固定频率采样（扣除读数本身花费的时间）
+    next_at += interval
+    delay = next_at - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    else:
+        next_at = time.monotonic()
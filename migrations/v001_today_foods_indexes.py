@@ -0,0 +1,109 @@
+"""
+today_foods にホットクエリ用の複合インデックスと (food_id, record_date) の一意制約を追加
+
+- (record_date, status)                 : ボード読み込み・本日の食品一覧
+- (record_date, food_id, total_weight)  : 統計（30 日分の範囲検索 + foods 結合）、日別一覧の日付検索
+- UNIQUE (food_id, record_date)         : update_weight / add_today_food の検索
+
+同じ日の同じ食品が複数行あると一意制約を作れない。既定では重複を一覧表示して中止し、
+MIGRATE_MERGE_DUPLICATES=1 のときだけ merge_duplicates で統合してから適用する。
+"""
+import os
+
+from sqlalchemy import bindparam, inspect, text
+
+from services.board import calc_remain
+from services.migrations import MigrationError
+
+VERSION = 1
+
+INDEXES = [
+    ("ix_today_foods_date_status", "record_date, status", False),
+    ("ix_today_foods_date_food_weight", "record_date, food_id, total_weight", False),
+    ("uq_today_foods_food_date", "food_id, record_date", True),
+]
+
+# 中止時に表示する重複の件数
+REPORT_LIMIT = 10
+
+
+def find_duplicates(conn):
+    """(food_id, record_date, 行数) の一覧"""
+    return conn.execute(
+        text(
+            "SELECT food_id, record_date, COUNT(*) FROM today_foods "
+            "GROUP BY food_id, record_date HAVING COUNT(*) > 1 "
+            "ORDER BY record_date, food_id"
+        )
+    ).all()
+
+
+def merge_duplicates(conn, groups):
+    """
+    同じ日の同じ食品を 1 行にまとめる。
+    残すのは削除されていない行のうち最新のもの（掲載中を優先）。累計重量・残り重量は
+    削除されていない行だけを合算し、remain は合算後の重量と食品の閾値から計算し直す。
+    論理削除済みの行は合算せずに削除する（全部削除済みなら最新の行だけ残す）。
+    """
+    for food_id, record_date, _ in groups:
+        rows = conn.execute(
+            text(
+                "SELECT id, total_weight, current_weight, status, deleted_at FROM today_foods "
+                "WHERE food_id = :food_id AND record_date = :record_date ORDER BY id"
+            ),
+            {"food_id": food_id, "record_date": record_date},
+        ).all()
+        active = [r for r in rows if r.deleted_at is None]
+        if active:
+            keep = max(active, key=lambda r: (r.status == 1, r.id))
+            current = sum(r.current_weight or 0 for r in active)
+            food = conn.execute(
+                text("SELECT warning_threshold, critical_threshold FROM foods WHERE id = :id"),
+                {"id": food_id},
+            ).first()
+            conn.execute(
+                text(
+                    "UPDATE today_foods SET total_weight = :total, current_weight = :current, "
+                    "remain = :remain WHERE id = :id"
+                ),
+                {
+                    "id": keep.id,
+                    "total": sum(r.total_weight or 0 for r in active),
+                    "current": current,
+                    "remain": calc_remain(current, *(food or (0, 0))),
+                },
+            )
+        else:
+            keep = rows[-1]
+        conn.execute(
+            text("DELETE FROM today_foods WHERE id IN :ids").bindparams(
+                bindparam("ids", expanding=True)
+            ),
+            {"ids": [r.id for r in rows if r.id != keep.id]},
+        )
+    return len(groups)
+
+
+def upgrade(conn):
+    existing = {ix["name"] for ix in inspect(conn).get_indexes("today_foods")}
+
+    groups = [] if "uq_today_foods_food_date" in existing else find_duplicates(conn)
+    if groups and os.getenv("MIGRATE_MERGE_DUPLICATES") != "1":
+        lines = [f"    food_id={f} record_date={d}：{n} 行" for f, d, n in groups[:REPORT_LIMIT]]
+        if len(groups) > REPORT_LIMIT:
+            lines.append(f"    ……ほか {len(groups) - REPORT_LIMIT} 組")
+        raise MigrationError(
+            f"today_foods に同じ日の同じ食品が {len(groups)} 組あり、一意制約を作れません：\n"
+            + "\n".join(lines)
+            + "\n  手動で整理するか、MIGRATE_MERGE_DUPLICATES=1 で統合してから再実行してください"
+            "（削除されていない行を合算して最新の行に残します）"
+        )
+    if groups:
+        merge_duplicates(conn, groups)
+        print(f"  重複していた {len(groups)} 組の (food_id, record_date) を統合しました")
+
+    for name, columns, unique in INDEXES:
+        if name in existing:
+            continue
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        conn.execute(text(f"CREATE {kind} {name} ON today_foods ({columns})"))
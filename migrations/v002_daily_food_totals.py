@@ -0,0 +1,11 @@
+"""
+/totals 用のロールアップテーブル daily_food_totals を作成
+既存の履歴は `flask --app app rollup-backfill` で集計する
+"""
+from models import DailyFoodTotals
+
+VERSION = 2
+
+
+def upgrade(conn):
+    DailyFoodTotals.__table__.create(conn, checkfirst=True)
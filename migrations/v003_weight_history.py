@@ -0,0 +1,11 @@
+"""
+重量履歴テーブル weight_readings（生データ）と weight_buckets（分・15 分集約）を作成
+"""
+from models import WeightBuckets, WeightReadings
+
+VERSION = 3
+
+
+def upgrade(conn):
+    WeightReadings.__table__.create(conn, checkfirst=True)
+    WeightBuckets.__table__.create(conn, checkfirst=True)
@@ -0,0 +1,10 @@
+"""
+remain の変化イベント remain_events を作成
+"""
+from models import RemainEvents
+
+VERSION = 4
+
+
+def upgrade(conn):
+    RemainEvents.__table__.create(conn, checkfirst=True)
@@ -1,19 +1,30 @@
+import os
 import requests
 import time
 import random
 
+from telemetry_client import TelemetrySender
+
 # 配置信息
 # 如果你本地运行 Flask，通常是 http://127.0.0.1:5000
 # 如果要发给云服务器，就写云服务器的公网 IP
 API_URL = "http://34.27.88.95:9000/api/update_weight" 
 TARGET_FOOD_ID = 40  # 假设我们要更新 ID 为 1 的菜品
+# 设置 TELEMETRY_ADDR=host:port 时改用 UDP 二进制遥测（服务器端 TELEMETRY_UDP_PORT）
+TELEMETRY_ADDR = os.getenv("TELEMETRY_ADDR")
 
 def simulate_weighing():
     # 模拟一个初始重量
     current_weight = 2000.0 
     
     print("🚀 模拟树莓派称重客户端启动...")
-    print(f"目标 URL: {API_URL}")
+    udp = None
+    if TELEMETRY_ADDR:
+        host, port = TELEMETRY_ADDR.rsplit(":", 1)
+        udp = TelemetrySender(host, int(port), TARGET_FOOD_ID)
+        print(f"目标 UDP: {TELEMETRY_ADDR}")
+    else:
+        print(f"目标 URL: {API_URL}")
 
     while True:
         try:
@@ -27,13 +38,18 @@ def simulate_weighing():
                 "weight": round(current_weight, 2)
             }
             
-            # 发送请求
-            response = requests.post(API_URL, json=payload, timeout=5)
-            
-            if response.status_code == 200:
-                print(f"✅ 发送成功: {payload['weight']}g | 服务器响应: {response.json()['msg']}")
+            if udp:
+                udp.send(payload["weight"])
+                print(f"✅ 已发送(UDP #{udp.seq}): {payload['weight']}g")
             else:
-                print(f"❌ 发送失败: 状态码 {response.status_code}")
+                # 发送请求
+                response = requests.post(API_URL, json=payload, timeout=5)
+
+                # 服务器开启合并写入队列时返回 202（已受理）
+                if response.ok:
+                    print(f"✅ 发送成功: {payload['weight']}g | 服务器响应: {response.json()['msg']}")
+                else:
+                    print(f"❌ 发送失败: 状态码 {response.status_code}")
                 
         except Exception as e:
             print(f"⚠️ 连接错误: {e}")
@@ -6,6 +6,17 @@ from zoneinfo import ZoneInfo
 # 创建数据库对象（但不绑定 app）
 db = SQLAlchemy()
 
+# TodayFoods 的状态文字（ライブボードと共用）
+TODAY_STATUS_TEXT = {
+    1: "上架",
+}
+REMAIN_TEXT = {
+    0: "正常",
+    1: "警告",
+    2: "危险",
+    3: "卖完",
+}
+
 
 class Chefs(db.Model):
     __tablename__ = "chefs"
@@ -136,6 +147,12 @@ class Foods(db.Model):
 
 class TodayFoods(db.Model):
     __tablename__ = "today_foods"
+    # 既存 DB には migrations/v001_today_foods_indexes.py で追加
+    __table_args__ = (
+        db.Index("ix_today_foods_date_status", "record_date", "status"),
+        db.Index("ix_today_foods_date_food_weight", "record_date", "food_id", "total_weight"),
+        db.Index("uq_today_foods_food_date", "food_id", "record_date", unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     food_id = db.Column(db.Integer, db.ForeignKey("foods.id"))
     total_weight = db.Column(db.Integer)
@@ -165,20 +182,11 @@ class TodayFoods(db.Model):
 
     def status_text(self):
         """返回状态对应的文字"""
-        mapping = {
-            1: "上架",
-        }
-        return mapping.get(self.status, "未知")
+        return TODAY_STATUS_TEXT.get(self.status, "未知")
 
     def remain_text(self):
         """返回状态对应的文字"""
-        mapping = {
-            0: "正常",
-            1: "警告",
-            2: "危险",
-            3: "卖完",
-        }
-        return mapping.get(self.remain, "未知")
+        return REMAIN_TEXT.get(self.remain, "未知")
 
     def to_dict(self):
         return {
@@ -186,7 +194,6 @@ class TodayFoods(db.Model):
             "food_id": self.food_id,
             "total_weight": self.total_weight,
             "current_weight": self.current_weight,
-            "record_date": self.record_date,
             "status": self.status,
             "remain": self.remain,
             "status_text": self.status_text(),  # ✅ 新增文字版
@@ -223,3 +230,94 @@ class TodayFoods(db.Model):
 
     def __repr__(self):
         return f"<TodayFoods {self.id}>"
+
+
+class DailyFoodTotals(db.Model):
+    """日別・食品別の集計（/totals 用のロールアップ）"""
+
+    __tablename__ = "daily_food_totals"
+    __table_args__ = (
+        db.Index("uq_daily_food_totals_date_food", "record_date", "food_id", unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    record_date = db.Column(db.Date, nullable=False)
+    food_id = db.Column(db.Integer, nullable=False)
+    total_weight = db.Column(db.Integer, nullable=False, default=0)  # 累计重量
+    consumed_weight = db.Column(db.Integer, nullable=False, default=0)  # 消耗量（累计 - 剩余）
+    refills = db.Column(db.Integer, nullable=False, default=0)  # 补充次数
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(ZoneInfo("Asia/Tokyo")),
+        onupdate=lambda: datetime.now(ZoneInfo("Asia/Tokyo")),
+        nullable=False,
+    )
+
+    def __repr__(self):
+        return f"<DailyFoodTotals {self.record_date} {self.food_id}>"
+
+
+class WeightReadings(db.Model):
+    """重量の生データ（追記のみ）。保持期間を過ぎたら weight_buckets に集約して削除"""
+
+    __tablename__ = "weight_readings"
+    __table_args__ = (
+        db.Index("ix_weight_readings_today_ts", "today_food_id", "ts"),
+        db.Index("ix_weight_readings_ts", "ts"),
+    )
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    today_food_id = db.Column(db.Integer, nullable=False)
+    ts = db.Column(db.Double, nullable=False)  # epoch 秒
+    weight = db.Column(db.Integer, nullable=False)
+    source = db.Column(db.String(10), nullable=False)  # scale / refill / decay
+
+    def __repr__(self):
+        return f"<WeightReadings {self.today_food_id} {self.ts}>"
+
+
+class WeightBuckets(db.Model):
+    """重量履歴の集約（resolution 秒ごとの min / max / avg）"""
+
+    __tablename__ = "weight_buckets"
+    __table_args__ = (
+        db.Index(
+            "uq_weight_buckets_today_res_start",
+            "today_food_id",
+            "resolution",
+            "bucket_start",
+            unique=True,
+        ),
+        db.Index("ix_weight_buckets_res_start", "resolution", "bucket_start"),
+    )
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    today_food_id = db.Column(db.Integer, nullable=False)
+    resolution = db.Column(db.Integer, nullable=False)  # 60 / 900
+    bucket_start = db.Column(db.BigInteger, nullable=False)  # epoch 秒
+    min_weight = db.Column(db.Integer, nullable=False)
+    max_weight = db.Column(db.Integer, nullable=False)
+    avg_weight = db.Column(db.Float, nullable=False)
+    samples = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<WeightBuckets {self.today_food_id} {self.resolution} {self.bucket_start}>"
+
+
+class RemainEvents(db.Model):
+    """remain の変化（0→1、1→2、→3、補充による回復）。seq はプロセス内で単調増加する通し番号"""
+
+    __tablename__ = "remain_events"
+    __table_args__ = (
+        db.Index("ix_remain_events_seq", "seq"),
+        db.Index("ix_remain_events_date", "record_date"),
+    )
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    seq = db.Column(db.BigInteger, nullable=False)
+    today_food_id = db.Column(db.Integer, nullable=False)
+    food_id = db.Column(db.Integer, nullable=False)
+    record_date = db.Column(db.Date, nullable=False)
+    from_remain = db.Column(db.Integer, nullable=False)
+    to_remain = db.Column(db.Integer, nullable=False)
+    cause = db.Column(db.String(10), nullable=False)  # decay / scale / refill / sync
+    ts = db.Column(db.Double, nullable=False)  # epoch 秒
+
+    def __repr__(self):
+        return f"<RemainEvents {self.seq} {self.today_food_id} {self.from_remain}->{self.to_remain}>"
@@ -0,0 +1,242 @@
+"""
+网关模式：一个进程驱动多路 HX711，按间隔批量上传到 /api/update_weights。
+
+- 配置文件（JSON）列出各路秤的引脚、校正值和对应菜品，见 pi_gateway.example.json
+- 复用 keep-alive 连接（requests.Session）
+- 服务器不可达时写入有上限的本地 spool（jsonl），恢复后按顺序补发，失败时指数退避
+
+用法：
+  python pi_gateway.py --config pi_gateway.json
+  python pi_gateway.py --config pi_gateway.example.json --fake --server http://127.0.0.1:5000
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import deque
+
+import requests
+
+from scale_pipeline import ScalePipeline
+
+# サーバー側 services/ingest.py の MAX_BATCH と同じ
+MAX_BATCH = 500
+
+
+class FakeHX711:
+    """测试用：模拟慢慢被取走、偶尔加满的一盘菜（带噪声和舀菜冲击）"""
+
+    def __init__(self, dout=None, pd_sck=None, full=2000.0, scale=1.0):
+        self.full = full
+        self.scale = scale
+        self.weight = full
+
+    def tare(self):
+        pass
+
+    def get_weight(self, times=1):
+        if random.random() < 0.01:
+            self.weight -= random.uniform(20, 120)  # 取菜
+        if self.weight <= 0:
+            self.weight = self.full  # 加满
+        noise = random.gauss(0, 2) + (300 if random.random() < 0.02 else 0)
+        return (self.weight + noise) * self.scale
+
+
+class Channel:
+    """一路秤：传感器 + 滤波"""
+
+    def __init__(self, food_id, hx, scale, pipeline):
+        self.food_id = food_id
+        self.hx = hx
+        self.scale = scale
+        self.pipeline = pipeline
+
+    def sample(self):
+        """采样一次；需要发送时返回读数字典"""
+        w = self.pipeline.update(self.hx.get_weight(1) / self.scale)
+        if w is None:
+            return None
+        return {"food_id": self.food_id, "weight": w, "ts": time.time()}
+
+
+class Spool:
+    """
+    上传失败的读数暂存在本地文件（每行一条 JSON），按写入顺序补发。
+    超过 max_items 时丢弃最旧的数据。
+    """
+
+    def __init__(self, path, max_items=10000):
+        self.path = path
+        self.items = deque(maxlen=max_items)
+        self.dropped = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self.items.append(json.loads(line))
+
+    def __len__(self):
+        return len(self.items)
+
+    def extend(self, readings):
+        overflow = max(0, len(self.items) + len(readings) - self.items.maxlen)
+        self.dropped += overflow
+        self.items.extend(readings)
+        if overflow:
+            self._rewrite()
+        else:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for r in readings:
+                    f.write(json.dumps(r) + "\n")
+
+    def peek(self, n):
+        return [self.items[i] for i in range(min(n, len(self.items)))]
+
+    def pop(self, n):
+        for _ in range(min(n, len(self.items))):
+            self.items.popleft()
+        self._rewrite()
+
+    def _rewrite(self):
+        # 先写临时文件再替换，断电时不会留下半个文件
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for r in self.items:
+                f.write(json.dumps(r) + "\n")
+        os.replace(tmp, self.path)
+
+
+class Uploader:
+    """批量上传 + spool 补发 + 指数退避"""
+
+    def __init__(self, server, spool, timeout=5, max_backoff=60.0):
+        self.url = server.rstrip("/") + "/api/update_weights"
+        self.session = requests.Session()
+        self.spool = spool
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.backoff = 0.0
+        self.retry_at = 0.0
+
+    def post(self, readings):
+        """True：服务器已受理（或数据本身有误，重发也没用）；False：稍后重试"""
+        try:
+            response = self.session.post(
+                self.url, json={"readings": readings}, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            print(f"⚠️ 上传失败: {e}")
+            return False
+        if response.status_code >= 500:
+            print(f"⚠️ 服务器错误: {response.status_code}")
+            return False
+        if not response.ok:
+            print(f"❌ 数据被拒绝（丢弃 {len(readings)} 条）: {response.status_code}")
+        return True
+
+    def send(self, readings, now=None):
+        """先按顺序补发 spool，再发送本次数据；失败的部分写入 spool"""
+        now = time.monotonic() if now is None else now
+        if now < self.retry_at:
+            self.spool.extend(readings)
+            return False
+
+        while len(self.spool):
+            chunk = self.spool.peek(MAX_BATCH)
+            if not self.post(chunk):
+                self.spool.extend(readings)
+                self._fail(now)
+                return False
+            self.spool.pop(len(chunk))
+            print(f"♻️ 已补发 {len(chunk)} 条（剩余 {len(self.spool)}）")
+
+        for i in range(0, len(readings), MAX_BATCH):
+            if not self.post(readings[i:i + MAX_BATCH]):
+                self.spool.extend(readings[i:])
+                self._fail(now)
+                return False
+        self.backoff = 0.0
+        return True
+
+    def _fail(self, now):
+        self.backoff = min(self.max_backoff, self.backoff * 2 or 1.0)
+        self.retry_at = now + self.backoff
+
+
+def load_channels(config, fake=False):
+    if fake:
+        hx_class = FakeHX711
+    else:
+        import RPi.GPIO as GPIO
+        from hx711 import HX711 as hx_class
+
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
+
+    channels = []
+    for c in config["channels"]:
+        hx = hx_class(c["dout"], c["pd_sck"])
+        hx.tare()  # ゼロ点調整
+        channels.append(
+            Channel(
+                food_id=c["food_id"],
+                hx=hx,
+                scale=1.0 if fake else c.get("scale", 300.0),
+                pipeline=ScalePipeline(**c.get("pipeline", config.get("pipeline", {}))),
+            )
+        )
+    return channels
+
+
+def run(config, fake=False):
+    channels = load_channels(config, fake)
+    spool = Spool(config.get("spool_path", "pi_gateway_spool.jsonl"), config.get("spool_max", 10000))
+    uploader = Uploader(config["server"], spool)
+    sample_interval = 1.0 / config.get("sample_hz", 10)
+    upload_interval = config.get("upload_interval", 2.0)
+
+    print(f"🚀 网关启动：{len(channels)} 路秤 -> {uploader.url}（spool {len(spool)} 条）")
+    pending = {}  # food_id -> 最新读数（同一间隔内只发最新值）
+    next_sample = next_upload = time.monotonic()
+    while True:
+        for ch in channels:
+            reading = ch.sample()
+            if reading:
+                pending[ch.food_id] = reading
+
+        now = time.monotonic()
+        if now >= next_upload:
+            next_upload = now + upload_interval
+            if pending or len(spool):
+                readings = sorted(pending.values(), key=lambda r: r["ts"])
+                pending = {}
+                if uploader.send(readings, now) and readings:
+                    print(f"数据已同步: {len(readings)} 条")
+
+        next_sample += sample_interval
+        delay = next_sample - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_sample = time.monotonic()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多路秤网关")
+    parser.add_argument("--config", default="pi_gateway.json")
+    parser.add_argument("--server", help="覆盖配置文件中的 server")
+    parser.add_argument("--fake", action="store_true", help="使用 FakeHX711（不需要树莓派）")
+    args = parser.parse_args()
+
+    with open(args.config, encoding="utf-8") as f:
+        config = json.load(f)
+    if args.server:
+        config["server"] = args.server
+    run(config, fake=args.fake)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+秤端（树莓派）的信号处理：中值滤波 + EMA 平滑 + 死区 + 最小发送间隔 + 心跳。
+只依赖标准库，hx711.py / mock_pi_sender.py 共用。
+"""
+import statistics
+import time
+from collections import deque
+
+
+class ScalePipeline:
+    """
+    每次采样调用 update(raw)；需要发送时返回滤波后的重量，否则返回 None。
+
+    - median_window：中值滤波窗口（采样数），去掉舀菜时的瞬间冲击
+    - alpha：EMA 系数，越小越平稳
+    - step_grams：中值与 EMA 相差超过此值时直接跳到中值（加菜、取走整盘时快速跟上）
+    - deadband_grams：与上次发送值相差不到此值就不发送
+    - min_interval：两次发送的最短间隔（秒）
+    - heartbeat：超过此时间没有发送则无论变化与否都发送一次（秒）
+    """
+
+    def __init__(
+        self,
+        median_window=5,
+        alpha=0.3,
+        step_grams=150.0,
+        deadband_grams=10.0,
+        min_interval=1.0,
+        heartbeat=60.0,
+    ):
+        self.samples = deque(maxlen=median_window)
+        self.alpha = alpha
+        self.step_grams = step_grams
+        self.deadband_grams = deadband_grams
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self.value = None  # 当前滤波值
+        self.last_sent = None
+        self.last_sent_at = None
+        # 统计
+        self.sampled = 0
+        self.sent = 0
+
+    def filter(self, raw):
+        """加入一个原始读数，返回滤波后的重量"""
+        self.sampled += 1
+        self.samples.append(max(0.0, raw))
+        median = statistics.median(self.samples)
+        if self.value is None or abs(median - self.value) >= self.step_grams:
+            self.value = median
+        else:
+            self.value += self.alpha * (median - self.value)
+        return self.value
+
+    def should_send(self, now):
+        if self.value is None:
+            return False
+        if self.last_sent_at is None:
+            return True
+        elapsed = now - self.last_sent_at
+        if elapsed >= self.heartbeat:
+            return True
+        if elapsed < self.min_interval:
+            return False
+        return abs(self.value - self.last_sent) >= self.deadband_grams
+
+    def update(self, raw, now=None):
+        now = time.monotonic() if now is None else now
+        self.filter(raw)
+        if not self.should_send(now):
+            return None
+        return self.mark_sent(now)
+
+    def mark_sent(self, now):
+        self.last_sent = round(self.value, 1)
+        self.last_sent_at = now
+        self.sent += 1
+        return self.last_sent
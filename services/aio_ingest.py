@@ -0,0 +1,248 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db
+from services.ingest import MAX_BATCH, apply_batch, ingest_queue, parse_readings
+from services.serializer import dumps
+
+try:
+    from aiohttp import WSMsgType, web  # 可选：pip install aiohttp
+except ImportError:  # pragma: no cover
+    web = None
+
+
+class AsyncIngestServer:
+    """
+    称重数据的异步接收服务（aiohttp，与 Flask 界面并行运行在同一进程）。
+    所有连接由一个线程里的事件循环处理，秤保持长连接也不会各占一个线程：
+      POST /api/update_weight   单条（与 Flask 端相同的 JSON）
+      POST /api/update_weights  批量 {"readings": [...]}
+      GET  /ws                  WebSocket；每条消息为单条或批量（可带 "id"），逐条回复 ack
+    有合并窗口（INGEST_WINDOW_SECONDS > 0）时只放入 ingest_queue，不碰数据库；
+    否则在有界线程池中执行与 /api/update_weights 相同的处理（看板 → 数据库）。
+    背压：线程池中处理中的批次达到 max_inflight 时 HTTP 返回 503，
+    WebSocket 则暂停读取该连接（TCP 窗口填满后秤端发送自然变慢）；队列已满时返回 503。
+    """
+
+    def __init__(self, app, host="0.0.0.0", port=9100, window=0, workers=4,
+                 max_inflight=None, max_connections=2000, queue=ingest_queue):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.window = window
+        self.workers = workers
+        self.max_inflight = max_inflight or workers * 2
+        self.max_connections = max_connections
+        self.queue = queue
+        self._executor = None
+        self._inflight = None  # asyncio.Semaphore（在事件循环里创建）
+        self._loop = None
+        self._thread = None
+        self._error = None
+        # 统计（只在事件循环线程里更新）
+        self.connections = 0  # 当前的 WebSocket 连接数
+        self.peak_connections = 0
+        self.requests = 0  # HTTP 请求数
+        self.messages = 0  # WebSocket 消息数
+        self.readings = 0
+        self.rejected = 0  # 503
+        self.errors = 0  # 数据库错误
+
+    # ---------- 处理 ----------
+    def _apply(self, items):
+        """线程池中执行：与 /api/update_weights 相同"""
+        with self.app.app_context():
+            try:
+                return apply_batch(items)
+            except SQLAlchemyError:
+                db.session.rollback()
+                raise
+
+    def _enqueue(self, items):
+        """合并窗口模式：只放入队列（不等待数据库）"""
+        valid, invalid = parse_readings(items)
+        results = [None] * len(items)
+        for i in invalid:
+            results[i] = {"index": i, "status": "invalid"}
+        for i, food_id, weight, ts in valid:
+            accepted = self.queue.put(food_id, weight, ts)
+            results[i] = {"index": i, "food_id": food_id, "status": "accepted" if accepted else "busy"}
+        return results
+
+    async def submit(self, items, wait=False):
+        """
+        一批读数 → (code, msg, results)。
+        wait=False（HTTP）时线程池已满立即返回 503；wait=True（WebSocket）时等待空位。
+        """
+        if not items or not isinstance(items, list):
+            return 400, "无数据", []
+        if len(items) > MAX_BATCH:
+            return 413, f"一次最多 {MAX_BATCH} 条", []
+        self.readings += len(items)
+
+        if self.window > 0:
+            results = self._enqueue(items)
+            busy = sum(1 for r in results if r["status"] == "busy")
+            if busy:
+                self.rejected += 1
+                return 503, f"队列已满 {busy}/{len(items)}", results
+            return 202, "已受理", results
+
+        if not wait and self._inflight.locked():
+            self.rejected += 1
+            return 503, "处理中的请求过多", []
+        async with self._inflight:
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._apply, items
+                )
+            except SQLAlchemyError as e:
+                self.errors += 1
+                return 500, f"数据库错误：{str(e)}", []
+        ok = sum(1 for r in results if r["status"] == "ok")
+        return 200, f"更新成功 {ok}/{len(items)}", results
+
+    # ---------- HTTP / WebSocket ----------
+    def response(self, code, msg, data=None, status=None):
+        payload = {"code": code, "msg": msg}
+        if data is not None:
+            payload["data"] = data
+        response = web.json_response(payload, status=status or code, dumps=dumps)
+        if code == 503:
+            response.headers["Retry-After"] = "1"
+        return response
+
+    async def read_json(self, request):
+        try:
+            return await request.json(loads=json.loads)
+        except ValueError:
+            return None
+
+    async def handle_one(self, request):
+        """与 Flask 端的 /api/update_weight 相同：单条读数"""
+        self.requests += 1
+        data = await self.read_json(request)
+        if not isinstance(data, dict) or not data:
+            return self.response(400, "无数据")
+        code, msg, results = await self.submit([data])
+        if code >= 300:
+            return self.response(code, msg)
+        status = results[0]["status"]
+        if status == "invalid":
+            return self.response(400, "数据格式错误")
+        if status == "not_found":
+            return self.response(404, "未找到对应的今日菜品")
+        return self.response(code, "已受理" if code == 202 else "更新成功", results[0])
+
+    async def handle_batch(self, request):
+        self.requests += 1
+        data = await self.read_json(request)
+        items = data.get("readings") if isinstance(data, dict) else data
+        code, msg, results = await self.submit(items)
+        return self.response(code, msg, results)
+
+    async def handle_ws(self, request):
+        if self.connections >= self.max_connections:
+            self.rejected += 1
+            return self.response(503, "连接数已达上限")
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self.connections += 1
+        self.peak_connections = max(self.peak_connections, self.connections)
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                self.messages += 1
+                try:
+                    data = json.loads(message.data)
+                except ValueError:
+                    data = None
+                message_id = data.get("id") if isinstance(data, dict) else None
+                if isinstance(data, dict) and "readings" in data:
+                    items = data["readings"]
+                else:
+                    items = [data] if isinstance(data, dict) else data
+                # 处理完（或放入队列）之后才读下一条消息
+                code, msg, results = await self.submit(items, wait=True)
+                await ws.send_str(
+                    dumps({"id": message_id, "code": code, "msg": msg, "data": results})
+                )
+        finally:
+            self.connections -= 1
+        return ws
+
+    async def handle_stats(self, request):
+        return self.response(200, "success", self.stats())
+
+    def build_app(self):
+        aio_app = web.Application(client_max_size=1024 ** 2)
+        aio_app.router.add_post("/api/update_weight", self.handle_one)
+        aio_app.router.add_post("/api/update_weights", self.handle_batch)
+        aio_app.router.add_get("/ws", self.handle_ws)
+        aio_app.router.add_get("/api/ingest_stats", self.handle_stats)
+        return aio_app
+
+    # ---------- 启动・停止 ----------
+    def _run(self, loop, ready):
+        asyncio.set_event_loop(loop)
+        self._inflight = asyncio.Semaphore(self.max_inflight)
+        runner = web.AppRunner(self.build_app(), access_log=None)
+        try:
+            loop.run_until_complete(runner.setup())
+            # 秤一齐重连时 backlog 128 不够；停止时不等待长连接
+            site = web.TCPSite(runner, self.host, self.port, backlog=1024, shutdown_timeout=1)
+            loop.run_until_complete(site.start())
+        except OSError as e:
+            self._error = e
+            loop.run_until_complete(runner.cleanup())
+            loop.close()
+            ready.set()
+            return
+        self.port = runner.addresses[0][1]
+        ready.set()
+        loop.run_forever()
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
+
+    def start(self):
+        """后台线程中启动；aiohttp 未安装时 RuntimeError，端口被占用时 OSError"""
+        if web is None:
+            raise RuntimeError("异步接收服务需要 aiohttp（pip install aiohttp）")
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="aio-ingest")
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._loop, ready), name="aio-ingest", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if self._error:
+            self._executor.shutdown()
+            raise self._error
+        return self
+
+    def stop(self):
+        loop, self._loop = self._loop, None
+        if loop is None or self._error:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        return {
+            "port": self.port,
+            "mode": "queue" if self.window > 0 else "executor",
+            "workers": self.workers,
+            "max_inflight": self.max_inflight,
+            "connections": self.connections,
+            "peak_connections": self.peak_connections,
+            "requests": self.requests,
+            "messages": self.messages,
+            "readings": self.readings,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
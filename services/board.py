@@ -0,0 +1,917 @@
+import math
+import queue
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+from sqlalchemy import case, literal, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import REMAIN_TEXT, TODAY_STATUS_TEXT, Foods, TodayFoods, db
+from services.catalog import catalog
+from services.events import remain_events
+from services.history import history
+from services.rollup import close_day, save_totals
+from services.serializer import dumps, row_serializer, seconds_until
+
+try:
+    import numpy as np  # 可选：行数多时用数组一次算完
+except ImportError:  # pragma: no cover
+    np = None
+
+# 行数少于这个值时 NumPy 的数组转换开销反而更大
+NUMPY_MIN_ROWS = 256
+
+# 消耗速度（EWMA）的时间常数：约等于参考最近多少秒的读数
+RATE_TAU_SECONDS = 300
+# 两次读数间隔短于此值时先累积，避免噪声放大
+RATE_MIN_INTERVAL = 5
+
+
+def calc_remain(weight, warning_threshold, critical_threshold):
+    """根据重量和阈值计算剩余状态"""
+    if weight <= 0:
+        return 3  # 卖完
+    elif weight <= (critical_threshold or 0):
+        return 2  # 危险
+    elif weight <= (warning_threshold or 0):
+        return 1  # 警告
+    return 0  # 正常
+
+
+def decay_weights(weights, rates, warnings, criticals):
+    """
+    一次性计算所有菜品衰减后的重量和剩余状态。
+    返回 (new_weights, remains) 两个列表，顺序与输入一致。
+    """
+    if np is not None and len(weights) >= NUMPY_MIN_ROWS:
+        w = np.maximum(np.asarray(weights) - np.asarray(rates), 0)
+        remain = np.select(
+            [w <= 0, w <= np.asarray(criticals), w <= np.asarray(warnings)],
+            [3, 2, 1],
+            default=0,
+        )
+        return w.tolist(), remain.tolist()
+
+    new_weights = [max(w - r, 0) for w, r in zip(weights, rates)]
+    remains = [
+        calc_remain(w, warn, crit)
+        for w, warn, crit in zip(new_weights, warnings, criticals)
+    ]
+    return new_weights, remains
+
+
+def _food_column(col):
+    """相关子查询：当前 TodayFoods 行对应 Foods 的某一列"""
+    return select(col).where(Foods.id == TodayFoods.food_id).scalar_subquery()
+
+
+def _remain_case(new_weight):
+    """与 calc_remain 相同的判定（SQL 版），阈值取自对应的 Foods"""
+    return case(
+        (new_weight <= 0, 3),
+        (new_weight <= _food_column(Foods.critical_threshold), 2),
+        (new_weight <= _food_column(Foods.warning_threshold), 1),
+        else_=0,
+    )
+
+
+def decay_in_db(record_date, now):
+    """
+    服务器端一条 UPDATE 完成当天全部衰减（DECAY_MODE=sql 时使用）。
+    current_weight 为 UNSIGNED，不能用 GREATEST(cw - rate, 0)，先比较再减。
+    """
+    rate = _food_column(Foods.decay_rate)
+    new_weight = case(
+        (TodayFoods.current_weight > rate, TodayFoods.current_weight - rate),
+        else_=0,
+    )
+    remain = _remain_case(new_weight)
+    stmt = (
+        update(TodayFoods)
+        .where(
+            TodayFoods.record_date == record_date,
+            TodayFoods.status == 1,
+            rate > 0,
+        )
+        # remain 必须先于 current_weight 赋值（MySQL 按从左到右求值）
+        .ordered_values(
+            (TodayFoods.remain, remain),
+            (TodayFoods.current_weight, new_weight),
+            (TodayFoods.updated_at, now),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    result = db.session.execute(stmt)
+    db.session.commit()
+    return result.rowcount
+
+
+def refill_in_db(today_id, now, add_weight=None):
+    """
+    补充：一条 UPDATE 在数据库端累加（不先 SELECT，并发补充不会丢失）。
+    add_weight 省略时用 Foods.weight；补充量为 0 或记录不存在时返回 0。commit 由调用方负责。
+    """
+    if add_weight is None:
+        weight = _food_column(Foods.weight)
+        conditions = [weight > 0]
+    else:
+        weight, conditions = add_weight, []
+    new_weight = TodayFoods.current_weight + weight
+    stmt = (
+        update(TodayFoods)
+        .where(TodayFoods.id == today_id, TodayFoods.deleted_at.is_(None), *conditions)
+        # remain 必须先于 current_weight 赋值（MySQL 按从左到右求值）
+        .ordered_values(
+            (TodayFoods.remain, _remain_case(new_weight)),
+            (TodayFoods.current_weight, new_weight),
+            (TodayFoods.total_weight, TodayFoods.total_weight + weight),
+            (TodayFoods.updated_at, now),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return db.session.execute(stmt).rowcount
+
+
+def set_weight_in_db(food_id, record_date, weight, now):
+    """称重值覆盖当前重量：一条 UPDATE，remain 在数据库端按阈值计算。commit 由调用方负责"""
+    weight = max(round(float(weight)), 0)
+    stmt = (
+        update(TodayFoods)
+        .where(TodayFoods.food_id == food_id, TodayFoods.record_date == record_date)
+        .ordered_values(
+            (TodayFoods.remain, _remain_case(literal(weight))),
+            (TodayFoods.current_weight, weight),
+            (TodayFoods.updated_at, now),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return db.session.execute(stmt).rowcount
+
+
+def apply_readings_db(readings, record_date, now=None):
+    """
+    看板上没有的（下架中等）菜品：每条读数一条 UPDATE（不先 SELECT），一个事务写入。
+    readings: [(food_id, weight, ts)]；返回与输入同顺序的 [(status, TodayFoods)]
+    """
+    now = now or datetime.now(ZoneInfo("Asia/Tokyo"))
+    results = [None] * len(readings)
+    # 同一菜品有多条时按时间顺序应用（最后的值保留）
+    order = sorted(range(len(readings)), key=lambda i: readings[i][2])
+    updated = set()
+    for i in order:
+        food_id, weight, _ = readings[i]
+        if set_weight_in_db(food_id, record_date, weight, now):
+            updated.add(food_id)
+
+    # 写入后读回结果（履历・日集计・响应用）
+    rows = {}
+    if updated:
+        rows = {
+            tf.food_id: tf
+            for tf in TodayFoods.query.filter(
+                TodayFoods.food_id.in_(updated),
+                TodayFoods.record_date == record_date,
+            ).populate_existing()
+        }
+    for i in order:
+        food_id, weight, ts = readings[i]
+        tf = rows.get(food_id)
+        if not tf:
+            results[i] = ("not_found", None)
+            continue
+        history.record(tf.id, ts, max(round(float(weight)), 0), "scale")
+        results[i] = ("ok", tf)
+    db.session.commit()
+    # 日集计在重量提交之后单独写入，失败也不影响重量
+    save_totals(
+        record_date,
+        [(tf.food_id, tf.total_weight, tf.current_weight, 0) for tf in rows.values()],
+    )
+    return results
+
+
+def _fmt(value, pattern="%Y-%m-%d %H:%M:%S"):
+    return value.strftime(pattern) if value else None
+
+
+class BoardEntry:
+    """看板上的一条记录（对应 TodayFoods 的一行）"""
+
+    __slots__ = (
+        "id",
+        "food_id",
+        "total_weight",
+        "current_weight",
+        "record_date",
+        "status",
+        "remain",
+        "created_at",
+        "updated_at",
+        "version",
+        "reading_ts",
+        "refills_pending",
+        "decayed",
+        "rate",
+        "rate_ts",
+        "rate_weight",
+    )
+
+    def __init__(self, tf):
+        self.id = tf.id
+        self.food_id = tf.food_id
+        self.total_weight = tf.total_weight or 0
+        self.current_weight = tf.current_weight or 0
+        self.record_date = tf.record_date
+        self.status = tf.status
+        self.remain = tf.remain
+        self.created_at = tf.created_at
+        self.updated_at = tf.updated_at
+        self.version = 0  # 最后一次变化时的看板版本
+        self.reading_ts = None  # 最后采用的称重时间戳（epoch 秒）
+        self.refills_pending = 0  # 尚未计入日集计的补充次数
+        self.decayed = False  # 上次写回后是否因衰减而变化（写回时记入履历）
+        self.rate = None  # 称重得到的消耗速度（g/秒，EWMA）；没有读数前用 decay_rate
+        self.rate_ts = None  # 速度计算的基准点（epoch 秒, 重量）
+        self.rate_weight = None
+
+    @property
+    def food(self):
+        """菜品信息从 catalog 缓存读取（不再关联查询 Foods）"""
+        return catalog.get(self.food_id)
+
+    @property
+    def decay_rate(self):
+        return (self.food or {}).get("decay_rate") or 0
+
+    @property
+    def warning_threshold(self):
+        return (self.food or {}).get("warning_threshold") or 0
+
+    @property
+    def critical_threshold(self):
+        return (self.food or {}).get("critical_threshold") or 0
+
+    def set_weight(self, weight, now):
+        self.current_weight = max(weight, 0)
+        self.remain = calc_remain(
+            self.current_weight, self.warning_threshold, self.critical_threshold
+        )
+        self.updated_at = now
+
+    def observe(self, weight, ts):
+        """
+        用称重读数更新消耗速度（O(1)）。
+        间隔不均匀，所以 EWMA 系数按间隔计算：alpha = 1 - exp(-dt / tau)。
+        """
+        if self.rate_ts is None or weight > self.rate_weight:
+            # 第一条读数，或重量增加（补充、放回）：只更新基准点
+            self.rebase(weight, ts)
+            return
+        dt = ts - self.rate_ts
+        if dt < RATE_MIN_INTERVAL:
+            return
+        instant = (self.rate_weight - weight) / dt
+        if self.rate is None:
+            self.rate = instant
+        else:
+            self.rate += (1 - math.exp(-dt / RATE_TAU_SECONDS)) * (instant - self.rate)
+        self.rebase(weight, ts)
+
+    def rebase(self, weight, ts):
+        self.rate_ts = ts
+        self.rate_weight = weight
+
+    @property
+    def consumption_rate(self):
+        """g/秒；还没有称重数据时按衰减速度（每秒 decay_rate）估算"""
+        return self.rate if self.rate is not None else float(self.decay_rate)
+
+    def seconds_until(self, threshold):
+        """按当前速度降到 threshold 还需多少秒；已低于返回 0，不再减少返回 None"""
+        return seconds_until(self.current_weight, threshold, self.consumption_rate)
+
+    def urgency(self):
+        """看板排序键：卖完 → 危险 → 警告 → 正常，同一状态内按卖完前的时间"""
+        eta = self.seconds_until(0)
+        return (-(self.remain or 0), math.inf if eta is None else eta, -self.id)
+
+    def to_row(self):
+        """bulk UPDATE 用的字典"""
+        return {
+            "id": self.id,
+            "total_weight": self.total_weight,
+            "current_weight": self.current_weight,
+            "status": self.status,
+            "remain": self.remain,
+            "updated_at": self.updated_at,
+        }
+
+    def to_totals(self):
+        """日集计（daily_food_totals）用"""
+        return (self.food_id, self.total_weight, self.current_weight, self.refills_pending)
+
+    def apply_to(self, tf):
+        """把内存中的最新值写回模型"""
+        tf.total_weight = self.total_weight
+        tf.current_weight = self.current_weight
+        tf.remain = self.remain
+        tf.updated_at = self.updated_at
+
+    def to_tuple(self):
+        """序列化用的列元组（按 RowSerializer.COLUMNS 的顺序）"""
+        return (
+            self.id,
+            self.food_id,
+            self.total_weight,
+            self.current_weight,
+            self.status,
+            self.remain,
+            self.record_date,
+            self.created_at,
+            self.updated_at,
+            self.rate,
+        )
+
+    def to_dict(self):
+        # 与 TodayFoods.to_dict() 相同的格式 + 消耗预测（列表由 row_serializer 一次性转换）
+        food = self.food
+        return {
+            "id": self.id,
+            "food_id": self.food_id,
+            "total_weight": self.total_weight,
+            "current_weight": self.current_weight,
+            "status": self.status,
+            "remain": self.remain,
+            "status_text": TODAY_STATUS_TEXT.get(self.status, "未知"),
+            "remain_text": REMAIN_TEXT.get(self.remain, "未知"),
+            "record_date": _fmt(self.record_date, "%Y-%m-%d"),
+            "created_at": _fmt(self.created_at),
+            "updated_at": _fmt(self.updated_at),
+            "food_info": dict(food) if food else None,
+            "consumption_rate": round(self.consumption_rate * 60, 1),  # g/分
+            "time_to_warning": self.seconds_until(self.warning_threshold),
+            "time_to_empty": self.seconds_until(0),
+        }
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Subscriber:
+    """SSE 等的推送队列；处理不过来时标记 overflow，由客户端重新取快照"""
+
+    def __init__(self, maxsize=256):
+        self.queue = queue.Queue(maxsize)
+        self.overflow = False
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.overflow = True
+
+    def get(self, timeout=None):
+        """取一条消息；超时返回 None"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def reset(self):
+        """清空积压，准备重新发送快照"""
+        self.overflow = False
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+
+class LiveBoard:
+    """
+    当天上架中的 TodayFoods 常驻内存。
+    衰减、称重、补充、上下架都只改内存，按 flush 间隔批量写回数据库。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.record_date = None
+        self.entries = {}  # today_food id -> BoardEntry
+        self._by_food = {}  # food_id -> today_food id
+        self._dirty = set()
+        self._stale = False  # reload() 后下次访问时重新加载
+        self._subscribers = set()
+        # 看板版本：单调递增；以毫秒时间起步，重启后也不会倒退
+        self.version = int(time.time() * 1000)
+        # 版本只在本进程内有意义：多 worker 时游标・ETag 带上进程标识，不一致就返回全部
+        self.instance = uuid.uuid4().hex[:8]
+        self._base_version = self.version  # 加载当天数据时的版本
+        self._tombstones = {}  # 已下架的 today_food id -> 版本
+        self._events = []  # 下次推送时一起发送的 remain 变化事件
+        self.decay_status = None  # 最后推送的衰减开关状态（running / paused）
+        # 直写模式（DECAY_MODE=sql）：称重・补充立即用原子 UPDATE 写入数据库，
+        # 写回时不再用内存里的绝对值覆盖（否则会抹掉数据库端的衰减和其他进程的补充）
+        self.write_through = False
+        self._totals_pending = set()  # 直写后只剩日集计要写的记录
+        self._detached_totals = []  # 已下架、下次写回时记入日集计的 (record_date, 行)
+
+    # ---------- 加载 ----------
+    def ensure_loaded(self, today=None):
+        """日期变了（或首次）就先写回旧数据，再从数据库加载当天数据"""
+        today = today or date.today()
+        with self._lock:
+            if self.record_date == today and not self._stale:
+                return
+            if self.record_date is not None:
+                self.flush()
+                if self.record_date != today:
+                    close_day(self.record_date)  # 确定前一天的集计
+
+            rows = TodayFoods.query.filter_by(record_date=today).filter_by(status=1).all()
+            self.entries = {}
+            self._by_food = {}
+            self._dirty.clear()
+            self._totals_pending.clear()
+            self.version += 1
+            self._base_version = self.version
+            self._tombstones = {}
+            for tf in rows:
+                entry = BoardEntry(tf)
+                entry.version = self.version
+                self._put(entry)
+            self.record_date = today
+            self._stale = False
+            self._publish_snapshot()
+
+    def reload(self):
+        """强制下次访问时重新加载"""
+        with self._lock:
+            self.flush()
+            self._stale = True
+
+    def refresh(self, track_decay=False):
+        """
+        从数据库同步当天数据，只推送有变化的记录（数据库端衰减、其他进程写入之后调用）。
+        本进程尚未写回的记录保持内存中的值。返回变化件数。
+        track_decay：重量减少的记录标记为衰减，写回时记入履历（只由执行 decay_in_db 的 leader 指定）
+        """
+        today = date.today()
+        with self._lock:
+            if self.record_date != today or self._stale:
+                self.ensure_loaded(today)
+                return len(self.entries)
+            # 查询期间本进程写入的记录（版本比这个新）以内存为准，不用查询结果覆盖
+            start = self.version
+        # 只取列，不经过 session 的对象缓存，每次都是数据库的最新值
+        rows = db.session.execute(
+            select(
+                TodayFoods.id,
+                TodayFoods.food_id,
+                TodayFoods.total_weight,
+                TodayFoods.current_weight,
+                TodayFoods.record_date,
+                TodayFoods.status,
+                TodayFoods.remain,
+                TodayFoods.created_at,
+                TodayFoods.updated_at,
+            ).where(TodayFoods.record_date == today, TodayFoods.status == 1)
+        ).all()
+
+        with self._lock:
+            if self.record_date != today:
+                return 0
+            changed, seen = [], set()
+            for row in rows:
+                seen.add(row.id)
+                entry = self.entries.get(row.id)
+                if entry is None:
+                    if self._tombstones.get(row.id, 0) > start:
+                        continue  # 查询之后刚下架
+                    self._put(BoardEntry(row))
+                    changed.append(row.id)
+                    continue
+                if row.id in self._dirty or entry.version > start:
+                    continue
+                values = (row.total_weight or 0, row.current_weight or 0, row.remain)
+                if values != (entry.total_weight, entry.current_weight, entry.remain):
+                    before = entry.remain
+                    cause = "refill" if values[0] > entry.total_weight else "sync"
+                    if track_decay and cause == "sync" and values[1] < entry.current_weight:
+                        entry.decayed = True
+                    if track_decay:
+                        # 数据库端衰减不经过 _mark：由 leader 把消耗量记入日集计
+                        self._totals_pending.add(row.id)
+                    entry.total_weight, entry.current_weight, entry.remain = values
+                    entry.updated_at = row.updated_at
+                    self._transition(entry, before, cause)
+                    changed.append(row.id)
+            removed = [
+                i
+                for i, e in self.entries.items()
+                if i not in seen and i not in self._dirty and e.version <= start
+            ]
+            for i in removed:
+                entry = self.entries.pop(i)
+                if self._by_food.get(entry.food_id) == i:
+                    del self._by_food[entry.food_id]
+            self._publish(changed, removed)
+            return len(changed) + len(removed)
+
+    def _put(self, entry):
+        self.entries[entry.id] = entry
+        self._by_food[entry.food_id] = entry.id
+
+    # ---------- 读取 ----------
+    def get(self, today_id):
+        with self._lock:
+            return self.entries.get(_to_int(today_id))
+
+    def find_by_food(self, food_id):
+        food_id = _to_int(food_id)
+        with self._lock:
+            today_id = self._by_food.get(food_id)
+            return self.entries.get(today_id) if today_id else None
+
+    def snapshot(self):
+        """按紧急程度返回当天菜品列表（与 to_dict 同格式）"""
+        return self.snapshot_with_stats()[0]
+
+    def snapshot_with_stats(self):
+        """(列表, stats)；锁内只取列元组，转换在锁外一次完成"""
+        with self._lock:
+            rows = [
+                e.to_tuple()
+                for e in sorted(self.entries.values(), key=BoardEntry.urgency)
+            ]
+        return row_serializer.serialize(rows)
+
+    def changes_since(self, since, instance=None):
+        """
+        返回 (rows, removed, full)。
+        since 来自其他进程（instance 不同）、早于当天加载时的版本或来自未来时无法求差分，返回全部。
+        """
+        with self._lock:
+            if (
+                instance != self.instance
+                or since < self._base_version
+                or since > self.version
+            ):
+                return self.snapshot(), [], True
+            rows = [
+                self.entries[i].to_tuple()
+                for i in sorted(self.entries, reverse=True)
+                if self.entries[i].version > since
+            ]
+            removed = [i for i, v in self._tombstones.items() if v > since]
+        return row_serializer.serialize(rows)[0], removed, False
+
+    def stats(self):
+        """件数集計"""
+        counts = [0, 0, 0, 0]
+        with self._lock:
+            for e in self.entries.values():
+                if e.remain in (1, 2, 3):
+                    counts[e.remain] += 1
+            total = len(self.entries)
+        return {
+            "total": total,
+            "warning": counts[1],
+            "critical": counts[2],
+            "empty": counts[3],
+        }
+
+    # ---------- 推送 ----------
+    def subscribe(self):
+        sub = Subscriber()
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def _broadcast(self, payload):
+        # 只序列化一次，所有订阅者共用
+        message = dumps(payload)
+        for sub in list(self._subscribers):
+            sub.put(message)
+
+    def _transition(self, entry, before, cause, ts=None):
+        """remain 变了就记录事件，随下一次推送发送（调用方持有锁）"""
+        if (entry.remain or 0) == (before or 0):
+            return
+        event = remain_events.record(
+            entry.id, entry.food_id, entry.record_date, before or 0, entry.remain or 0, cause, ts
+        )
+        if event is not None:  # 多进程的 follower 不编号，事件从 leader 同步
+            self._events.append(event)
+
+    def _publish(self, ids=(), removed=()):
+        """提升看板版本并只推送有变化的记录（调用方持有锁）"""
+        if not (ids or removed):
+            return
+        events, self._events = self._events, []
+        self.version += 1
+        for i in ids:
+            if i in self.entries:
+                self.entries[i].version = self.version
+                self._tombstones.pop(i, None)
+        for i in removed:
+            self._tombstones[i] = self.version
+
+        if not self._subscribers:
+            return
+        self._broadcast(
+            {
+                "type": "patch",
+                "version": self.version,
+                "instance": self.instance,
+                "data": row_serializer.serialize(
+                    [self.entries[i].to_tuple() for i in ids if i in self.entries]
+                )[0],
+                "removed": list(removed),
+                "stats": self.stats(),
+                "events": events,
+            }
+        )
+
+    def _publish_snapshot(self):
+        if not self._subscribers:
+            return
+        data, stats = self.snapshot_with_stats()
+        self._broadcast(
+            {
+                "type": "snapshot",
+                "version": self.version,
+                "instance": self.instance,
+                "data": data,
+                "stats": stats,
+                "event_seq": remain_events.seq,
+            }
+        )
+
+    def publish_events(self, events):
+        """从 leader 同步来的 remain 事件推送给 SSE 客户端（看板内容不变）"""
+        if not events:
+            return
+        with self._lock:
+            if not self._subscribers:
+                return
+            self._broadcast(
+                {
+                    "type": "patch",
+                    "version": self.version,
+                    "instance": self.instance,
+                    "data": [],
+                    "removed": [],
+                    "stats": self.stats(),
+                    "events": events,
+                }
+            )
+
+    def publish_status(self, enabled):
+        """衰减开关（暂停・恢复）变了就推送给 SSE 客户端；其他进程的修改由每秒的衰减任务检测"""
+        status = "running" if enabled else "paused"
+        with self._lock:
+            if status == self.decay_status:
+                return
+            self.decay_status = status
+            if self._subscribers:
+                self._broadcast({"type": "status", "decay_status": status})
+
+    # ---------- 修改 ----------
+    def decay(self, now=None):
+        """所有菜品减去 decay_rate，返回变化件数"""
+        now = now or datetime.now(ZoneInfo("Asia/Tokyo"))
+        with self._lock:
+            targets = [
+                e for e in self.entries.values() if e.food and e.decay_rate > 0
+            ]
+            if not targets:
+                return 0
+
+            weights, remains = decay_weights(
+                [e.current_weight for e in targets],
+                [e.decay_rate for e in targets],
+                [e.warning_threshold for e in targets],
+                [e.critical_threshold for e in targets],
+            )
+            changed = []
+            for entry, weight, remain in zip(targets, weights, remains):
+                if weight == entry.current_weight and remain == entry.remain:
+                    continue  # 已经卖完，不再变化
+                before = entry.remain
+                entry.current_weight = weight
+                entry.remain = remain
+                entry.updated_at = now
+                entry.decayed = True
+                self._transition(entry, before, "decay")
+                self._dirty.add(entry.id)
+                changed.append(entry.id)
+            self._publish(changed)
+        return len(changed)
+
+    def set_weight(self, food_id, weight, now=None):
+        """称重数据覆盖当前重量；当天不在板上则返回 None"""
+        now = now or datetime.now(ZoneInfo("Asia/Tokyo"))
+        with self._lock:
+            entry = self.find_by_food(food_id)
+            if not entry:
+                return None
+            if self.write_through:
+                set_weight_in_db(food_id, self.record_date, weight, now)
+                db.session.commit()
+            # 数据库字段为整数
+            before = entry.remain
+            entry.set_weight(round(float(weight)), now)
+            entry.reading_ts = time.time()
+            self._transition(entry, before, "scale", entry.reading_ts)
+            entry.observe(entry.current_weight, entry.reading_ts)
+            entry.decayed = False
+            history.record(entry.id, entry.reading_ts, entry.current_weight, "scale")
+            self._mark(entry)
+            self._publish([entry.id])
+            return entry
+
+    def apply_readings(self, readings, now=None):
+        """
+        批量应用称重数据。readings: [(food_id, weight, ts)]，ts 为 epoch 秒。
+        按时间顺序应用，比已采用的数据旧的读数忽略。
+        返回与输入同顺序的 [(status, entry)]，status 为 ok / stale / not_found。
+        """
+        now = now or datetime.now(ZoneInfo("Asia/Tokyo"))
+        results = [None] * len(readings)
+        changed = []
+        with self._lock:
+            order = sorted(range(len(readings)), key=lambda i: readings[i][2])
+            accepted = []
+            for i in order:
+                food_id, weight, ts = readings[i]
+                entry = self.find_by_food(food_id)
+                if not entry:
+                    results[i] = ("not_found", None)
+                    continue
+                if entry.reading_ts is not None and ts < entry.reading_ts:
+                    results[i] = ("stale", entry)
+                    continue
+                accepted.append((i, entry))
+            if self.write_through and accepted:
+                for i, _ in accepted:
+                    set_weight_in_db(readings[i][0], self.record_date, readings[i][1], now)
+                db.session.commit()
+
+            for i, entry in accepted:
+                _, weight, ts = readings[i]
+                before = entry.remain
+                entry.set_weight(round(float(weight)), now)
+                entry.reading_ts = ts
+                self._transition(entry, before, "scale", ts)
+                entry.observe(entry.current_weight, ts)
+                entry.decayed = False
+                history.record(entry.id, ts, entry.current_weight, "scale")
+                self._mark(entry)
+                if entry.id not in changed:
+                    changed.append(entry.id)
+                results[i] = ("ok", entry)
+            self._publish(changed)
+        return results
+
+    def refill(self, today_id, add_weight, now=None):
+        """补充：累计重量和当前重量同时增加"""
+        now = now or datetime.now(ZoneInfo("Asia/Tokyo"))
+        with self._lock:
+            entry = self.entries.get(_to_int(today_id))
+            if not entry:
+                return None
+            if self.write_through:
+                refill_in_db(entry.id, now, add_weight)
+                db.session.commit()
+            before = entry.remain
+            entry.total_weight += add_weight
+            entry.refills_pending += 1
+            entry.set_weight(entry.current_weight + add_weight, now)
+            self._transition(entry, before, "refill")
+            entry.decayed = False
+            entry.rebase(entry.current_weight, time.time())
+            history.record(entry.id, entry.rate_ts, entry.current_weight, "refill")
+            self._mark(entry)
+            self._publish([entry.id])
+            return entry
+
+    def _mark(self, entry):
+        """写回对象：直写模式下重量已在数据库，只记日集计（调用方持有锁）"""
+        if self.write_through:
+            self._totals_pending.add(entry.id)
+        else:
+            self._dirty.add(entry.id)
+
+    def attach(self, tf):
+        """上架（新增或再有效化）后把记录放到板上"""
+        with self._lock:
+            if self.record_date != tf.record_date or tf.status != 1:
+                return
+            self._put(BoardEntry(tf))
+            self._dirty.discard(tf.id)
+            self._totals_pending.add(tf.id)  # 新上架的菜品也要有日集计行
+            self._publish([tf.id])
+
+    def detach(self, tf):
+        """下架前把内存里的最新值写回模型，并从板上移除"""
+        with self._lock:
+            entry = self.entries.pop(tf.id, None)
+            self._dirty.discard(tf.id)
+            self._totals_pending.discard(tf.id)
+            if not entry:
+                return
+            if self._by_food.get(entry.food_id) == entry.id:
+                del self._by_food[entry.food_id]
+            self._publish(removed=[entry.id])
+        if self.write_through:
+            # 重量已在数据库：用读出的值集计，不用内存值覆盖
+            entry.total_weight = tf.total_weight or 0
+            entry.current_weight = tf.current_weight or 0
+        else:
+            entry.apply_to(tf)
+        # 日集计在下次写回时单独写入（不放进调用方的事务，集计出错也不影响下架）
+        with self._lock:
+            self._detached_totals.append((entry.record_date, entry.to_totals()))
+
+    def food_changed(self, food_id, info):
+        """菜品信息（名称、阈值等）修改后推送受影响的记录"""
+        with self._lock:
+            today_id = self._by_food.get(food_id)
+            if today_id in self.entries:
+                self._publish([today_id])
+
+    # ---------- 写回 ----------
+    def flush(self, record_decay=True):
+        """
+        把有变化的记录一次性写回数据库，返回写回件数。
+        record_decay=False 时不记衰减履历（每秒同步前的写回用，履历按写回间隔记一个点）
+        """
+        with self._lock:
+            entries = [self.entries[i] for i in self._dirty if i in self.entries]
+            rows = [e.to_row() for e in entries]
+            # 直写的记录重量已在数据库，只写日集计
+            entries += [
+                self.entries[i]
+                for i in self._totals_pending - self._dirty
+                if i in self.entries
+            ]
+            totals = [e.to_totals() for e in entries]
+            for e in entries:
+                e.refills_pending = 0
+            # 衰减每秒都在变，履历只在写回时记一个点（数据库端衰减时由 refresh 标记）
+            ts = time.time()
+            for e in self.entries.values() if record_decay else ():
+                if e.decayed:
+                    history.record(e.id, ts, e.current_weight, "decay")
+                    e.decayed = False
+            record_date = self.record_date
+            dirty = set(self._dirty)
+            self._dirty.clear()
+            self._totals_pending.clear()
+            detached, self._detached_totals = self._detached_totals, []
+        if not (entries or detached):
+            return 0
+
+        if rows:
+            try:
+                db.session.execute(update(TodayFoods), rows)
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+                # 写回失败：下次再试
+                self._requeue(entries, totals, dirty, detached)
+                raise
+
+        # 日集计在重量提交之后单独写入：daily_food_totals 出错（未迁移等）也不会回滚重量
+        failed = [] if save_totals(record_date, totals) else entries
+        failed_detached = [(day, row) for day, row in detached if not save_totals(day, [row])]
+        if failed or failed_detached:
+            self._requeue(failed, totals, set(), failed_detached)
+        return len(rows)
+
+    def _requeue(self, entries, totals, dirty, detached):
+        """写回失败的记录放回队列，下次写回时再试"""
+        with self._lock:
+            for e, (_, _, _, refills) in zip(entries, totals):
+                if e.id in self.entries:
+                    e.refills_pending += refills
+                    if e.id in dirty:
+                        self._dirty.add(e.id)
+                    else:
+                        self._totals_pending.add(e.id)
+            self._detached_totals[:0] = detached
+
+
+# 进程内唯一的看板
+board = LiveBoard()
+catalog.on_change(board.food_changed)
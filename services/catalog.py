@@ -0,0 +1,115 @@
+import threading
+
+from models import Foods
+
+
+def food_info(food):
+    """Foods から表示・判定に使う項目だけを取り出す"""
+    if not food:
+        return None
+    return {
+        "id": food.id,
+        "name": food.name,
+        "category": food.category,
+        "weight": food.weight,
+        "decay_rate": food.decay_rate,
+        "warning_threshold": food.warning_threshold,
+        "critical_threshold": food.critical_threshold,
+        "status": food.status,
+    }
+
+
+class FoodCatalog:
+    """
+    Foods 的只读缓存（id -> 基础信息）。
+    菜单只会通过 add_food / put_food / delete_food 修改，这些地方调用 invalidate；
+    多进程部署时各进程再定期 sync，跟上其他 worker 的修改。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = {}  # food id -> food_info 字典
+        self._deleted = set()  # 已删除（deleted_at 非空）的 food id
+        self._listeners = []
+        self.version = 0
+
+    def warm(self):
+        """启动时一次性加载全部菜品；需要 app context"""
+        foods = Foods.query.all()
+        with self._lock:
+            self._items = {f.id: food_info(f) for f in foods}
+            self._deleted = {f.id for f in foods if f.deleted_at is not None}
+            self.version += 1
+        return len(foods)
+
+    def sync(self):
+        """
+        重新读取全部菜品，只对有变化的菜品通知订阅者，返回变化件数；需要 app context。
+        invalidate 只在处理请求的进程内生效，多进程部署时其他 worker 的修改靠定期 sync 同步。
+        """
+        foods = Foods.query.all()
+        items = {f.id: food_info(f) for f in foods}
+        deleted = {f.id for f in foods if f.deleted_at is not None}
+        with self._lock:
+            changed = [
+                food_id
+                for food_id, info in items.items()
+                if self._items.get(food_id) != info
+                or (food_id in deleted) != (food_id in self._deleted)
+            ]
+            removed = [food_id for food_id in self._items if food_id not in items]
+            self._items = items
+            self._deleted = deleted
+            if changed or removed:
+                self.version += 1
+        for food_id in changed + removed:
+            for callback in self._listeners:
+                callback(food_id, items.get(food_id))
+        return len(changed) + len(removed)
+
+    def get(self, food_id):
+        """读取菜品信息；缓存没有时查数据库（read-through）"""
+        info = self._items.get(food_id)
+        if info is not None or food_id is None:
+            return info
+        return self._load(food_id)
+
+    def _load(self, food_id):
+        food = Foods.query.get(food_id)
+        if not food:
+            return None
+        info = food_info(food)
+        with self._lock:
+            self._items[food_id] = info
+            if food.deleted_at is not None:
+                self._deleted.add(food_id)
+        return info
+
+    def is_active(self, food_id):
+        return food_id in self._items and food_id not in self._deleted
+
+    def items(self):
+        """[(food_id, info, is_active)] のスナップショット"""
+        with self._lock:
+            return [
+                (food_id, info, food_id not in self._deleted)
+                for food_id, info in self._items.items()
+            ]
+
+    def on_change(self, callback):
+        """菜品更新时的回调：callback(food_id, info)；info 为 None 表示已不可用"""
+        self._listeners.append(callback)
+
+    def invalidate(self, food_id):
+        """菜品新增 / 修改 / 删除后调用：重新读取该菜品并通知订阅者"""
+        with self._lock:
+            self._items.pop(food_id, None)
+            self._deleted.discard(food_id)
+            self.version += 1
+        info = self._load(food_id)
+        for callback in self._listeners:
+            callback(food_id, info)
+
+
+# 进程内唯一的菜品缓存
+catalog = FoodCatalog()
@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Response, request, send_from_directory
+
+try:
+    import brotli  # 可选：有则优先 br（比 gzip 小 15〜20%）
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# 压缩对象（JSON / HTML / 静态 CSS・JS 等文本）
+COMPRESSIBLE_TYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+}
+
+# 带 ?v=<hash> 的静态文件缓存一年，内容变了 URL 就会变
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def accepted_encodings():
+    """客户端接受的压缩方式（优先顺序：br → gzip）"""
+    accept = request.accept_encodings
+    encodings = []
+    if brotli is not None and accept["br"]:
+        encodings.append("br")
+    if accept["gzip"]:
+        encodings.append("gzip")
+    return encodings
+
+
+def compress(data, encoding, static=False):
+    """静态文件用最高压缩率（启动时只做一次）；动态响应用较快的等级"""
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if static else 4)
+    return gzip.compress(data, compresslevel=9 if static else 6, mtime=0)
+
+
+def compress_response(response, min_size=1024):
+    """
+    after_request：JSON / HTML 响应超过 min_size 字节时按 Accept-Encoding 压缩。
+    流式响应（SSE）、send_file、已压缩的响应不处理。
+    """
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encodings = accepted_encodings()
+    if not encodings:
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    response.set_data(compress(data, encodings[0]))
+    response.headers["Content-Encoding"] = encodings[0]
+    # 同一内容的不同编码共用弱 ETag（If-None-Match 按弱比较）
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+class StaticAsset:
+    __slots__ = ("path", "mimetype", "digest", "encoded")
+
+    def __init__(self, path, mimetype, digest, encoded):
+        self.path = path
+        self.mimetype = mimetype
+        self.digest = digest
+        self.encoded = encoded  # {"br": bytes, "gzip": bytes}
+
+
+class StaticAssets:
+    """
+    静态文件的内容哈希和预压缩版本（启动时构建一次）。
+    url_for('static', filename=...) 自动附加 ?v=<hash>；带正确 v 的请求返回 immutable 长缓存，
+    否则 no-cache（按 ETag 确认）。
+    """
+
+    def __init__(self, app=None, min_size=1024):
+        self.min_size = min_size
+        self.assets = {}  # filename -> StaticAsset
+        self.static_folder = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.build()
+        app.url_defaults(self.url_defaults)
+        app.view_functions["static"] = self.send_static
+
+    def build(self):
+        assets = {}
+        for root, _, files in os.walk(self.static_folder):
+            for name in files:
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, self.static_folder).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    data = f.read()
+                mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                encoded = {}
+                if mimetype in COMPRESSIBLE_TYPES and len(data) >= self.min_size:
+                    encoded["gzip"] = compress(data, "gzip", static=True)
+                    if brotli is not None:
+                        encoded["br"] = compress(data, "br", static=True)
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                assets[filename] = StaticAsset(path, mimetype, digest, encoded)
+        self.assets = assets
+        return len(assets)
+
+    def url_defaults(self, endpoint, values):
+        if endpoint != "static" or "v" in values:
+            return
+        asset = self.assets.get(values.get("filename"))
+        if asset is not None:
+            values["v"] = asset.digest
+
+    def send_static(self, filename):
+        asset = self.assets.get(filename)
+        if asset is None:
+            # 启动后新增的文件等：交给 Flask 默认处理
+            return send_from_directory(self.static_folder, filename)
+
+        encoding = next((e for e in accepted_encodings() if e in asset.encoded), None)
+        if encoding is None:
+            response = send_from_directory(self.static_folder, filename, etag=False)
+        else:
+            response = Response(asset.encoded[encoding], mimetype=asset.mimetype)
+            response.headers["Content-Encoding"] = encoding
+        if asset.encoded:
+            response.vary.add("Accept-Encoding")
+        response.set_etag(asset.digest, weak=True)
+
+        if request.args.get("v") == asset.digest:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import deque
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import RemainEvents, db
+
+# remain 变化的种类：升高时按新状态，降低时为恢复（补充等）
+EVENT_KINDS = {1: "warning", 2: "critical", 3: "empty"}
+
+
+def event_kind(from_remain, to_remain):
+    if (to_remain or 0) > (from_remain or 0):
+        return EVENT_KINDS.get(to_remain, "warning")
+    return "recovered"
+
+
+class RemainEventLog:
+    """
+    remain 变化事件（看板上状态跨越阈值的时刻）。
+    seq 与看板版本一样以毫秒时间起步、单调递增，重启后也不会倒退；
+    最近 capacity 条留在内存（?after= 游标直接从这里返回），更早的从 remain_events 表读取。
+
+    多进程部署时只有 leader 编号并写入 remain_events，follower 从表中同步（mirror），
+    所以不论请求落到哪个 worker，seq 都属于同一个序列。
+    """
+
+    def __init__(self, capacity=1000):
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=capacity)
+        self._pending = []  # 尚未写入数据库的事件
+        self.seq = int(time.time() * 1000)
+        self._floor = self.seq  # 内存中保证完整的起点：seq > _floor 的事件都在缓冲里
+        self.mirror = None  # None = 单进程；False = leader；True = follower（只同步，不编号）
+
+    def record(self, today_food_id, food_id, record_date, from_remain, to_remain, cause, ts=None):
+        """记录一条事件并返回（JSON 用字典）；follower 不记录，返回 None"""
+        if self.mirror:
+            return None
+        with self._lock:
+            self.seq += 1
+            event = {
+                "seq": self.seq,
+                "today_id": today_food_id,
+                "food_id": food_id,
+                "record_date": record_date.strftime("%Y-%m-%d"),
+                "from": from_remain,
+                "to": to_remain,
+                "kind": event_kind(from_remain, to_remain),
+                "cause": cause,
+                "ts": round(ts or time.time(), 3),
+            }
+            self._append(event)
+            self._pending.append((event, record_date))
+            return event
+
+    def _append(self, event):
+        """放入内存缓冲（调用方持有锁）"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self._floor = self._buffer[0]["seq"]
+        self._buffer.append(event)
+
+    def since(self, after, limit=200):
+        """seq > after 的事件（升序，最多 limit 条）；内存中不完整时查数据库"""
+        with self._lock:
+            if after >= self._floor:
+                return [e for e in self._buffer if e["seq"] > after][:limit]
+        rows = db.session.execute(
+            select(RemainEvents)
+            .where(RemainEvents.seq > after)
+            .order_by(RemainEvents.seq)
+            .limit(limit)
+        ).scalars()
+        return [_from_row(r) for r in rows]
+
+    def set_role(self, is_leader):
+        """
+        多进程部署：leader 状态确定 / 改变时调用（需要 app context）。
+        leader 从表中最大的 seq 之后继续编号；follower 清空本进程的事件，从表的末尾开始同步。
+        """
+        if self.mirror is (not is_leader):
+            return
+        latest = db.session.execute(select(func.max(RemainEvents.seq))).scalar() or 0
+        with self._lock:
+            if is_leader:
+                self.seq = max(self.seq, latest)
+            else:
+                self._pending = []
+                self._buffer.clear()
+                self.seq = latest
+            self._floor = self.seq
+            self.mirror = not is_leader
+
+    def sync(self, limit=1000):
+        """follower：把 leader 写入 remain_events 的新事件取到内存，返回新事件（升序）"""
+        if not self.mirror:
+            return []
+        rows = db.session.execute(
+            select(RemainEvents)
+            .where(RemainEvents.seq > self.seq)
+            .order_by(RemainEvents.seq)
+            .limit(limit)
+        ).scalars()
+        events = [_from_row(r) for r in rows]
+        with self._lock:
+            for event in events:
+                if event["seq"] > self.seq:
+                    self._append(event)
+                    self.seq = event["seq"]
+        return events
+
+    def flush(self, persist=True):
+        """
+        把新事件写入 remain_events，返回件数；需要 app context。
+        多进程部署时各进程都会检测到同一变化，只由 leader 写入（persist=False 时丢弃）。
+        """
+        with self._lock:
+            events, self._pending = self._pending, []
+        if not events or not persist:
+            return 0
+        rows = [
+            {
+                "seq": e["seq"],
+                "today_food_id": e["today_id"],
+                "food_id": e["food_id"],
+                "record_date": record_date,
+                "from_remain": e["from"],
+                "to_remain": e["to"],
+                "cause": e["cause"],
+                "ts": e["ts"],
+            }
+            for e, record_date in events
+        ]
+        try:
+            db.session.execute(insert(RemainEvents), rows)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            with self._lock:
+                self._pending[:0] = events
+            raise
+        return len(rows)
+
+
+def _from_row(r):
+    return {
+        "seq": r.seq,
+        "today_id": r.today_food_id,
+        "food_id": r.food_id,
+        "record_date": r.record_date.strftime("%Y-%m-%d"),
+        "from": r.from_remain,
+        "to": r.to_remain,
+        "kind": event_kind(r.from_remain, r.to_remain),
+        "cause": r.cause,
+        "ts": r.ts,
+    }
+
+
+# 进程内唯一的事件记录
+remain_events = RemainEventLog()
@@ -0,0 +1,231 @@
+import threading
+import time
+from collections import deque
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import WeightBuckets, WeightReadings, db
+
+MINUTE = 60
+QUARTER = 900
+
+
+def _align(ts, resolution):
+    return int(ts // resolution) * resolution
+
+
+class HistoryBuffer:
+    """
+    重量历史的写入缓冲。
+    看板采用的读数先放在这里，flush 时用一条 INSERT（executemany）批量写入。
+    """
+
+    def __init__(self, max_pending=100_000):
+        self._lock = threading.Lock()
+        self._pending = deque(maxlen=max_pending)
+        self.dropped = 0  # 缓冲已满时丢弃的最旧数据
+        self.written = 0
+
+    def record(self, today_food_id, ts, weight, source):
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(
+                {"today_food_id": today_food_id, "ts": ts, "weight": weight, "source": source}
+            )
+
+    def flush(self):
+        """写入缓冲中的全部数据，返回件数；需要 app context"""
+        with self._lock:
+            rows = list(self._pending)
+            self._pending.clear()
+        if not rows:
+            return 0
+        try:
+            db.session.execute(insert(WeightReadings), rows)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            # 写入失败：放回缓冲，下次再试
+            with self._lock:
+                self._pending.extendleft(reversed(rows))
+            raise
+        self.written += len(rows)
+        return len(rows)
+
+
+def _aggregate(points, resolution):
+    """
+    points: [(today_food_id, ts, min, max, sum, count)]
+    → {(today_food_id, bucket_start): [min, max, sum, count]}
+    """
+    groups = {}
+    for today_id, ts, lo, hi, total, count in points:
+        key = (today_id, _align(ts, resolution))
+        g = groups.get(key)
+        if g is None:
+            groups[key] = [lo, hi, total, count]
+        else:
+            g[0] = min(g[0], lo)
+            g[1] = max(g[1], hi)
+            g[2] += total
+            g[3] += count
+    return groups
+
+
+def _merge_buckets(groups, resolution):
+    """把聚合结果写入 weight_buckets（已有的桶则合并）；commit 由调用方负责"""
+    if not groups:
+        return
+    today_ids = {today_id for today_id, _ in groups}
+    starts = [start for _, start in groups]
+    existing = {
+        (b.today_food_id, b.bucket_start): b
+        for b in WeightBuckets.query.filter(
+            WeightBuckets.resolution == resolution,
+            WeightBuckets.today_food_id.in_(today_ids),
+            WeightBuckets.bucket_start.between(min(starts), max(starts)),
+        )
+    }
+    for (today_id, start), (lo, hi, total, count) in groups.items():
+        b = existing.get((today_id, start))
+        if b is None:
+            db.session.add(
+                WeightBuckets(
+                    today_food_id=today_id,
+                    resolution=resolution,
+                    bucket_start=start,
+                    min_weight=round(lo),
+                    max_weight=round(hi),
+                    avg_weight=total / count,
+                    samples=count,
+                )
+            )
+            continue
+        b.avg_weight = (b.avg_weight * b.samples + total) / (b.samples + count)
+        b.min_weight = min(b.min_weight, round(lo))
+        b.max_weight = max(b.max_weight, round(hi))
+        b.samples += count
+
+
+def _compact_raw(cutoff, chunk=3600):
+    """把早于 cutoff 的原始数据聚合为 1 分钟桶并删除"""
+    moved = 0
+    while True:
+        oldest = db.session.scalar(
+            select(func.min(WeightReadings.ts)).where(WeightReadings.ts < cutoff)
+        )
+        if oldest is None:
+            return moved
+        end = min(cutoff, _align(oldest, chunk) + chunk)
+        rows = db.session.execute(
+            select(WeightReadings.today_food_id, WeightReadings.ts, WeightReadings.weight)
+            .where(WeightReadings.ts < end)
+        ).all()
+        _merge_buckets(_aggregate(((t, ts, w, w, w, 1) for t, ts, w in rows), MINUTE), MINUTE)
+        db.session.execute(delete(WeightReadings).where(WeightReadings.ts < end))
+        db.session.commit()
+        moved += len(rows)
+
+
+def _compact_minutes(cutoff, chunk=6 * 3600):
+    """把早于 cutoff 的 1 分钟桶聚合为 15 分钟桶并删除"""
+    moved = 0
+    minute = WeightBuckets.resolution == MINUTE
+    while True:
+        oldest = db.session.scalar(
+            select(func.min(WeightBuckets.bucket_start)).where(
+                minute, WeightBuckets.bucket_start < cutoff
+            )
+        )
+        if oldest is None:
+            return moved
+        end = min(cutoff, _align(oldest, chunk) + chunk)
+        rows = db.session.execute(
+            select(
+                WeightBuckets.today_food_id,
+                WeightBuckets.bucket_start,
+                WeightBuckets.min_weight,
+                WeightBuckets.max_weight,
+                WeightBuckets.avg_weight * WeightBuckets.samples,
+                WeightBuckets.samples,
+            ).where(minute, WeightBuckets.bucket_start < end)
+        ).all()
+        _merge_buckets(_aggregate(rows, QUARTER), QUARTER)
+        db.session.execute(
+            delete(WeightBuckets).where(minute, WeightBuckets.bucket_start < end)
+        )
+        db.session.commit()
+        moved += len(rows)
+
+
+def compact(raw_retention, minute_retention, now=None):
+    """
+    聚合超过保留期限的数据（定时任务）。
+    原始数据 raw_retention 秒后 → 1 分钟桶；1 分钟桶 minute_retention 秒后 → 15 分钟桶。
+    返回 (聚合的原始数据件数, 聚合的 1 分钟桶件数)
+    """
+    now = now or time.time()
+    raw = _compact_raw(_align(now - raw_retention, MINUTE))
+    minutes = _compact_minutes(_align(now - minute_retention, QUARTER))
+    return raw, minutes
+
+
+def curve(today_ids, start=None, end=None, step=MINUTE):
+    """
+    菜品（today_foods.id）的重量曲线，按 step 秒降采样。
+    原始数据、1 分钟桶、15 分钟桶各按 (today_food_id, 时间) 索引做一次范围读取；
+    比 step 粗的桶保持原粒度。
+    返回 {today_food_id: [{"t", "min", "max", "avg", "n"}]}（t 为 epoch 秒）
+    """
+    today_ids = list(today_ids)
+    if not today_ids:
+        return {}
+
+    raw = select(WeightReadings.today_food_id, WeightReadings.ts, WeightReadings.weight).where(
+        WeightReadings.today_food_id.in_(today_ids)
+    )
+    buckets = select(
+        WeightBuckets.today_food_id,
+        WeightBuckets.resolution,
+        WeightBuckets.bucket_start,
+        WeightBuckets.min_weight,
+        WeightBuckets.max_weight,
+        WeightBuckets.avg_weight,
+        WeightBuckets.samples,
+    ).where(
+        WeightBuckets.today_food_id.in_(today_ids),
+        # 明示すると (today_food_id, resolution, bucket_start) の範囲検索になる
+        WeightBuckets.resolution.in_((MINUTE, QUARTER)),
+    )
+    if start is not None:
+        raw = raw.where(WeightReadings.ts >= start)
+        buckets = buckets.where(WeightBuckets.bucket_start >= _align(start, QUARTER))
+    if end is not None:
+        raw = raw.where(WeightReadings.ts < end)
+        buckets = buckets.where(WeightBuckets.bucket_start < end)
+
+    groups = _aggregate(
+        ((t, ts, w, w, w, 1) for t, ts, w in db.session.execute(raw)), step
+    )
+    for today_id, resolution, bucket_start, lo, hi, avg, n in db.session.execute(buckets):
+        points = [(today_id, bucket_start, lo, hi, avg * n, n)]
+        for key, g in _aggregate(points, max(step, resolution)).items():
+            current = groups.get(key)
+            groups[key] = g if current is None else [
+                min(current[0], g[0]),
+                max(current[1], g[1]),
+                current[2] + g[2],
+                current[3] + g[3],
+            ]
+
+    result = {today_id: [] for today_id in today_ids}
+    for (today_id, t), (lo, hi, total, n) in sorted(groups.items()):
+        result[today_id].append(
+            {"t": t, "min": round(lo), "max": round(hi), "avg": round(total / n, 1), "n": n}
+        )
+    return result
+
+
+# 进程内唯一的历史缓冲
+history = HistoryBuffer()
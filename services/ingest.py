@@ -0,0 +1,183 @@
+import math
+import threading
+import time
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from services.board import apply_readings_db, board
+
+# 一次请求（或一条 WebSocket 消息）接受的最大读数条数
+MAX_BATCH = 500
+
+
+def parse_ts(value):
+    """epoch 秒（数值）或 ISO 8601 字符串转为 epoch 秒；省略时为接收时刻"""
+    if value is None or value == "":
+        return time.time()
+    if isinstance(value, (int, float)):
+        if not math.isfinite(value):
+            raise ValueError(f"ts が有限の数値ではありません：{value}")
+        return float(value)
+    dt = datetime.fromisoformat(str(value))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=ZoneInfo("Asia/Tokyo"))
+    return dt.timestamp()
+
+
+def parse_weight(value):
+    """重量转为 float；NaN / inf 与格式错误一样抛出 ValueError（看板要取整，不能接受）"""
+    weight = float(value)
+    if not math.isfinite(weight):
+        raise ValueError(f"重量不是有限数值：{value}")
+    return weight
+
+
+def parse_readings(items):
+    """
+    接收数据分为 [(index, food_id, weight, ts)] 和格式错误的 index 列表
+    """
+    valid, invalid = [], []
+    for i, item in enumerate(items):
+        try:
+            food_id = int(item["food_id"])
+            weight = parse_weight(item["weight"])
+            ts = parse_ts(item.get("ts"))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            invalid.append(i)
+            continue
+        valid.append((i, food_id, weight, ts))
+    return valid, invalid
+
+
+def apply_batch(items):
+    """
+    同步应用一批读数（/api/update_weights 与异步接收服务共用），返回与输入同顺序的结果列表。
+    看板上的菜品一次加锁更新；看板上没有的（下架中等）一个事务写数据库。
+    需要 app context；数据库错误（SQLAlchemyError）由调用方 rollback。
+    """
+    valid, invalid = parse_readings(items)
+    results = [None] * len(items)
+    for i in invalid:
+        results[i] = {"index": i, "status": "invalid"}
+
+    board.ensure_loaded(date.today())
+    applied = board.apply_readings([(f, w, ts) for _, f, w, ts in valid])
+
+    missing = []
+    for (i, food_id, weight, ts), (status, entry) in zip(valid, applied):
+        if status == "not_found":
+            missing.append((i, food_id, weight, ts))
+            continue
+        results[i] = {
+            "index": i,
+            "food_id": food_id,
+            "today_id": entry.id,
+            "status": status,
+            "current_weight": entry.current_weight,
+            "remain": entry.remain,
+        }
+
+    if missing:
+        fallback = apply_readings_db([(f, w, ts) for _, f, w, ts in missing], date.today())
+        for (i, food_id, _, _), (status, tf) in zip(missing, fallback):
+            results[i] = {"index": i, "food_id": food_id, "status": status}
+            if tf:
+                results[i].update(
+                    today_id=tf.id, current_weight=tf.current_weight, remain=tf.remain
+                )
+    return results
+
+
+class IngestQueue:
+    """
+    称重数据的合并写入队列。
+    HTTP 请求只负责放入队列；同一窗口内每道菜只保留最新读数，
+    窗口结束时一次性应用到看板并批量写回数据库。
+    """
+
+    def __init__(self, max_pending=1000):
+        self._lock = threading.Lock()
+        self._pending = {}  # food_id -> (weight, ts)
+        self.max_pending = max_pending
+        # 计数（用于调整窗口大小）
+        self.received = 0
+        self.superseded = 0  # 被同一窗口内更新的读数覆盖
+        self.dropped = 0  # 队列已满而丢弃
+        self.applied = 0
+        self.stale = 0
+        self.not_found = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+
+    def put(self, food_id, weight, ts):
+        """放入一条读数；队列已满返回 False"""
+        with self._lock:
+            self.received += 1
+            current = self._pending.get(food_id)
+            if current is not None:
+                self.superseded += 1
+                if ts < current[1]:
+                    return True  # 比队列里的还旧，直接丢弃
+            elif len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending[food_id] = (weight, ts)
+            return True
+
+    def depth(self):
+        with self._lock:
+            return len(self._pending)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return [(food_id, w, ts) for food_id, (w, ts) in pending.items()]
+
+    def flush(self):
+        """应用窗口内的读数并写回数据库；需要 app context"""
+        readings = self.drain()
+        if not readings:
+            return 0
+
+        start = time.perf_counter()
+        today = date.today()
+        board.ensure_loaded(today)
+        results = board.apply_readings(readings)
+
+        # 看板上没有的菜品走数据库（一次查询、一个事务）
+        missing = [r for r, (status, _) in zip(readings, results) if status == "not_found"]
+        if missing:
+            results = [res for res in results if res[0] != "not_found"]
+            results += apply_readings_db(missing, today)
+        board.flush()
+
+        with self._lock:
+            for status, _ in results:
+                if status == "ok":
+                    self.applied += 1
+                elif status == "stale":
+                    self.stale += 1
+                else:
+                    self.not_found += 1
+            self.flushes += 1
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+        return len(readings)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "depth": len(self._pending),
+                "max_pending": self.max_pending,
+                "received": self.received,
+                "superseded": self.superseded,
+                "dropped": self.dropped,
+                "applied": self.applied,
+                "stale": self.stale,
+                "not_found": self.not_found,
+                "flushes": self.flushes,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+            }
+
+
+# 进程内唯一的接收队列
+ingest_queue = IngestQueue()
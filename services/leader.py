@@ -0,0 +1,124 @@
+import os
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover  Windows
+    fcntl = None
+
+
+class FileLock:
+    """
+    同一台服务器上的多进程（gunicorn worker）用：flock 排他锁。
+    持有锁的进程退出时由操作系统释放，其他进程下次尝试即可接管。
+    """
+
+    def __init__(self, path):
+        if fcntl is None:
+            raise RuntimeError("此平台不支持 fcntl，请使用 LEADER_LOCK=mysql")
+        self.path = path
+        self._fd = None
+
+    def acquire(self):
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # 方便排查：记录当前 leader 的 pid
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class MySQLLock:
+    """
+    多台服务器共用一个 MySQL 时用：GET_LOCK 咨询锁。
+    锁属于连接，进程退出或连接断开时 MySQL 自动释放。
+    """
+
+    def __init__(self, engine, name="hotel_kds_leader"):
+        self.engine = engine
+        self.name = name
+        self._conn = None
+
+    def acquire(self):
+        if self._conn is not None:
+            # 确认锁仍由这条连接持有（连接断开后会被别人拿走）
+            try:
+                held = self._conn.execute(
+                    text("SELECT IS_USED_LOCK(:name) = CONNECTION_ID()"), {"name": self.name}
+                ).scalar()
+            except SQLAlchemyError:
+                held = False
+            if held:
+                return True
+            self.release()
+
+        conn = self.engine.connect()
+        try:
+            got = conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": self.name}).scalar()
+        except SQLAlchemyError:
+            got = 0
+        if got == 1:
+            self._conn = conn
+            return True
+        conn.close()
+        return False
+
+    def release(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": self.name})
+        except SQLAlchemyError:
+            pass
+        finally:
+            self._conn.close()
+            self._conn = None
+
+
+class LeaderElection:
+    """
+    部署内只让一个进程执行衰减等定时任务。
+    各进程定期调用 check()；锁空出来时（leader 进程退出）由下一个调用者接管。
+    lock 为 None 表示单进程部署，自己总是 leader。
+    """
+
+    def __init__(self, lock=None):
+        self.lock = lock
+        self._lock = threading.Lock()
+        self.is_leader = lock is None
+
+    def check(self):
+        """尝试获取 / 确认锁；返回 leader 状态是否改变"""
+        if self.lock is None:
+            return False
+        with self._lock:
+            was = self.is_leader
+            try:
+                self.is_leader = self.lock.acquire()
+            except (OSError, SQLAlchemyError) as e:
+                print(f"leader 选举失败：{e}")
+                self.is_leader = False
+            return was != self.is_leader
+
+    def release(self):
+        if self.lock is None:
+            return
+        with self._lock:
+            self.lock.release()
+            self.is_leader = False
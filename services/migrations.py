@@ -0,0 +1,76 @@
+import importlib.util
+import os
+import re
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+
+from models import db
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"
+)
+
+class MigrationError(Exception):
+    """データの手動対応が必要でマイグレーションを適用できない（ロールバック済み）"""
+
+
+# 適用済みバージョンの記録
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def discover():
+    """migrations/vNNN_*.py をバージョン順に読み込む"""
+    found = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = re.match(r"v(\d+)_\w+\.py$", filename)
+        if not match:
+            continue
+        name = filename[:-3]
+        spec = importlib.util.spec_from_file_location(
+            f"migrations.{name}", os.path.join(MIGRATIONS_DIR, filename)
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        found.append((int(match.group(1)), name, module))
+    return sorted(found, key=lambda m: m[0])
+
+
+def pending():
+    """未適用のマイグレーション名の一覧（app context 必須）"""
+    with db.engine.connect() as conn:
+        applied = set()
+        if inspect(conn).has_table(schema_migrations.name):
+            applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    return [name for version, name, _ in discover() if version not in applied]
+
+
+def upgrade():
+    """未適用のマイグレーションを順に適用し、適用したバージョン一覧を返す（app context 必須）"""
+    applied_now = []
+    with db.engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    for version, name, module in discover():
+        if version in applied:
+            continue
+        print(f"マイグレーション適用：{name}")
+        # 1 本ずつトランザクション（MySQL の DDL は暗黙コミットされる点に注意）
+        with db.engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(
+                schema_migrations.insert().values(
+                    version=version,
+                    name=name,
+                    applied_at=datetime.now(ZoneInfo("Asia/Tokyo")),
+                )
+            )
+        applied_now.append(version)
+    return applied_now
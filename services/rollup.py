@@ -0,0 +1,107 @@
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import DailyFoodTotals, TodayFoods, db
+from services.catalog import catalog
+
+
+def record_totals(record_date, rows):
+    """
+    当天集计的增量更新（commit 由调用方负责）。
+    rows: [(food_id, total_weight, current_weight, refills_delta)]
+    """
+    if not rows:
+        return
+    food_ids = {food_id for food_id, _, _, _ in rows}
+    existing = {
+        r.food_id: r
+        for r in DailyFoodTotals.query.filter(
+            DailyFoodTotals.record_date == record_date,
+            DailyFoodTotals.food_id.in_(food_ids),
+        )
+    }
+    for food_id, total, current, refills in rows:
+        item = existing.get(food_id)
+        if item is None:
+            item = DailyFoodTotals(record_date=record_date, food_id=food_id, refills=0)
+            db.session.add(item)
+            existing[food_id] = item
+        item.total_weight = total or 0
+        item.consumed_weight = max((total or 0) - (current or 0), 0)
+        item.refills = (item.refills or 0) + refills
+
+
+def save_totals(record_date, rows):
+    """
+    日集计单独一个事务写入（在 today_foods 的重量提交之后调用）。
+    daily_food_totals 未迁移等出错时只回滚集计，重量数据不受影响；返回是否写入成功。
+    """
+    if not rows:
+        return True
+    try:
+        record_totals(record_date, rows)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"日集计写入失败（稍后重试）：{getattr(e, 'orig', None) or e}")
+        return False
+    return True
+
+
+def rebuild(start_date=None, end_date=None, estimate_refills=False):
+    """
+    根据 today_foods 重新计算指定期间的集计（日结、补录历史用），返回更新件数。
+    补充次数无法从 today_foods 得知：已有记录保留原值，
+    estimate_refills=True 时新记录按 累计重量 / 菜品初始重量 - 1 估算。
+    """
+    query = db.session.query(
+        TodayFoods.record_date,
+        TodayFoods.food_id,
+        func.sum(TodayFoods.total_weight),
+        func.sum(TodayFoods.current_weight),
+    )
+    if start_date:
+        query = query.filter(TodayFoods.record_date >= start_date)
+    if end_date:
+        query = query.filter(TodayFoods.record_date <= end_date)
+    groups = query.group_by(TodayFoods.record_date, TodayFoods.food_id).all()
+
+    by_date = {}
+    for record_date, food_id, total, current in groups:
+        by_date.setdefault(record_date, []).append((food_id, int(total or 0), int(current or 0)))
+
+    for record_date, items in by_date.items():
+        known = {
+            r.food_id
+            for r in DailyFoodTotals.query.filter_by(record_date=record_date)
+        }
+        rows = []
+        for food_id, total, current in items:
+            refills = 0
+            if estimate_refills and food_id not in known:
+                food = catalog.get(food_id)
+                weight = (food or {}).get("weight") or 0
+                refills = max(round(total / weight) - 1, 0) if weight else 0
+            rows.append((food_id, total, current, refills))
+        record_totals(record_date, rows)
+    db.session.commit()
+    return len(groups)
+
+
+def close_day(record_date):
+    """日期变化时根据 today_foods 确定前一天的集计（失败也不影响加载当天数据）"""
+    try:
+        return rebuild(record_date, record_date)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"前一天的集计确定失败：{getattr(e, 'orig', None) or e}")
+        return 0
+
+
+def totals_since(start_date):
+    """start_date 以后的集计行（按日期升序）"""
+    return (
+        DailyFoodTotals.query.filter(DailyFoodTotals.record_date >= start_date)
+        .order_by(DailyFoodTotals.record_date.asc())
+        .all()
+    )
@@ -0,0 +1,101 @@
+import threading
+import unicodedata
+
+from services.catalog import catalog
+
+
+def normalize(text):
+    """统一全角 / 半角、大小写（与 MySQL 的 LIKE 一样不区分大小写）"""
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def grams(text):
+    """单字 + 双字（bi-gram）；中文、日文名称不分词也能做部分一致"""
+    result = set(text)
+    result.update(text[i:i + 2] for i in range(len(text) - 1))
+    return result
+
+
+class FoodSearchIndex:
+    """
+    菜品名称・分类的 n-gram 倒排索引（gram -> food id 集合）。
+    关键词的所有 bi-gram 取交集得到候选，再用子串比较确认，结果与 LIKE '%kw%' 一致。
+    通过 catalog.on_change 跟随 add_food / put_food / delete_food 更新。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}  # gram -> {food_id}
+        self._texts = {}  # food_id -> (名称, 分类)（已规范化）
+        self._deleted = set()
+        self.ready = False
+
+    def build(self, items=None):
+        """从 catalog 全量构建；items: [(food_id, info, is_active)]"""
+        items = catalog.items() if items is None else items
+        with self._lock:
+            self._postings = {}
+            self._texts = {}
+            self._deleted = set()
+            for food_id, info, active in items:
+                self._add(food_id, info, active)
+            self.ready = True
+        return len(self._texts)
+
+    def _add(self, food_id, info, active):
+        name = normalize(info.get("name"))
+        category = normalize(info.get("category"))
+        self._texts[food_id] = (name, category)
+        for g in grams(name) | grams(category):
+            self._postings.setdefault(g, set()).add(food_id)
+        if not active:
+            self._deleted.add(food_id)
+
+    def _remove(self, food_id):
+        texts = self._texts.pop(food_id, None)
+        self._deleted.discard(food_id)
+        if texts is None:
+            return
+        for g in grams(texts[0]) | grams(texts[1]):
+            ids = self._postings.get(g)
+            if ids is not None:
+                ids.discard(food_id)
+                if not ids:
+                    del self._postings[g]
+
+    def update(self, food_id, info):
+        """catalog 变更通知；info 为 None 表示删除"""
+        with self._lock:
+            self._remove(food_id)
+            if info is not None:
+                self._add(food_id, info, catalog.is_active(food_id))
+
+    def search(self, keyword, fields=("name", "category"), include_deleted=False):
+        """
+        关键词部分一致的 food id 集合。
+        fields：对哪些字段做匹配（name / category）
+        """
+        kw = normalize(keyword.strip())
+        if not kw:
+            return set()
+        keys = [kw] if len(kw) == 1 else [kw[i:i + 2] for i in range(len(kw) - 1)]
+        with self._lock:
+            postings = sorted((self._postings.get(k, set()) for k in keys), key=len)
+            candidates = set(postings[0])
+            for ids in postings[1:]:
+                candidates &= ids
+                if not candidates:
+                    break
+            if not include_deleted:
+                candidates -= self._deleted
+            slots = [("name", "category").index(f) for f in fields]
+            return {
+                food_id
+                for food_id in candidates
+                if any(kw in self._texts[food_id][s] for s in slots)
+            }
+
+
+# 进程内唯一的菜品搜索索引
+food_index = FoodSearchIndex()
+catalog.on_change(food_index.update)
@@ -0,0 +1,132 @@
+import json
+
+from models import REMAIN_TEXT, TODAY_STATUS_TEXT
+from services.catalog import catalog
+
+try:
+    import orjson  # 可选：有则用更快的 JSON 编码
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def dumps(obj):
+    """JSON 文本（不转义中文・日文）；装了 orjson 时用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def seconds_until(weight, threshold, rate):
+    """按速度 rate（g/秒）降到 threshold 还需多少秒；已低于返回 0，不再减少返回 None"""
+    if weight <= threshold:
+        return 0
+    if rate <= 0:
+        return None
+    return round((weight - threshold) / rate)
+
+
+class RowSerializer:
+    """
+    看板行（列元组）→ JSON 用字典的批量转换，结果与 BoardEntry.to_dict() 相同。
+    - 菜品信息（food_info）按 catalog.version 缓存，各行共用同一个字典，不再逐行复制
+    - 时间格式化在一次转换内按值缓存（衰减时所有行的 updated_at 相同）
+    - 同时统计 remain 件数
+    """
+
+    # 输入元组的列顺序（BoardEntry.to_tuple）
+    COLUMNS = (
+        "id",
+        "food_id",
+        "total_weight",
+        "current_weight",
+        "status",
+        "remain",
+        "record_date",
+        "created_at",
+        "updated_at",
+        "rate",
+    )
+
+    def __init__(self):
+        self._foods = {}  # food_id -> (info, decay_rate, warning, critical)
+        self._version = None
+
+    def _food(self, food_id):
+        if self._version != catalog.version:
+            self._foods = {}
+            self._version = catalog.version
+        cached = self._foods.get(food_id)
+        if cached is None:
+            info = catalog.get(food_id)
+            info = dict(info) if info else None
+            food = info or {}
+            cached = (
+                info,
+                food.get("decay_rate") or 0,
+                food.get("warning_threshold") or 0,
+                food.get("critical_threshold") or 0,
+            )
+            self._foods[food_id] = cached
+        return cached
+
+    def serialize(self, rows):
+        """rows: 列元组列表 → (字典列表, stats)"""
+        formatted = {}
+
+        def fmt(value, pattern="%Y-%m-%d %H:%M:%S"):
+            if not value:
+                return None
+            text = formatted.get(value)
+            if text is None:
+                text = formatted[value] = value.strftime(pattern)
+            return text
+
+        counts = [0, 0, 0, 0]
+        data = []
+        for (
+            row_id,
+            food_id,
+            total_weight,
+            current_weight,
+            status,
+            remain,
+            record_date,
+            created_at,
+            updated_at,
+            rate,
+        ) in rows:
+            info, decay_rate, warning, _ = self._food(food_id)
+            if rate is None:
+                rate = float(decay_rate)
+            if remain in (1, 2, 3):
+                counts[remain] += 1
+            data.append(
+                {
+                    "id": row_id,
+                    "food_id": food_id,
+                    "total_weight": total_weight,
+                    "current_weight": current_weight,
+                    "status": status,
+                    "remain": remain,
+                    "status_text": TODAY_STATUS_TEXT.get(status, "未知"),
+                    "remain_text": REMAIN_TEXT.get(remain, "未知"),
+                    "record_date": fmt(record_date, "%Y-%m-%d"),
+                    "created_at": fmt(created_at),
+                    "updated_at": fmt(updated_at),
+                    "food_info": info,
+                    "consumption_rate": round(rate * 60, 1),  # g/分
+                    "time_to_warning": seconds_until(current_weight, warning, rate),
+                    "time_to_empty": seconds_until(current_weight, 0, rate),
+                }
+            )
+        stats = {
+            "total": len(data),
+            "warning": counts[1],
+            "critical": counts[2],
+            "empty": counts[3],
+        }
+        return data, stats
+
+
+# 进程内共用（food_info 缓存随 catalog.version 失效）
+row_serializer = RowSerializer()
@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+import time
+
+
+class RuntimeSettings:
+    """
+    运行时设置（衰减开关等）常驻内存。
+    写入时原子替换 JSON 文件并提升 version；读取时最多每 check_interval 秒 stat 一次文件，
+    mtime / 大小变了（其他进程写入）才重新读取。
+    """
+
+    def __init__(self, path, defaults=None, check_interval=1.0):
+        self.path = path
+        self.defaults = dict(defaults or {})
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._values = dict(self.defaults)
+        self._stamp = None  # 最后读取时文件的 (mtime_ns, size)
+        self._checked_at = 0.0
+        self.version = 0
+        self._load()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        stamp = self._file_stamp()
+        values = dict(self.defaults)
+        version = 0
+        if stamp is not None:
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return  # 写入途中等：保留当前值，下次再读
+            version = data.pop("version", 0)
+            values.update(data)
+        self._values = values
+        self.version = version
+        self._stamp = stamp
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            if self._file_stamp() != self._stamp:
+                self._load()
+
+    def get(self, key, default=None):
+        self._refresh()
+        return self._values.get(key, default)
+
+    def all(self):
+        self._refresh()
+        return dict(self._values)
+
+    def update(self, **values):
+        """修改设置并写入文件（先写临时文件再替换，其他进程不会读到半个文件）"""
+        with self._lock:
+            self._load()  # 以文件上的最新值为基础，避免覆盖其他进程的修改
+            self._values.update(values)
+            self.version += 1
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({**self._values, "version": self.version}, f)
+            os.replace(tmp, self.path)
+            self._stamp = self._file_stamp()
+            self._checked_at = time.monotonic()
+
+
+STATUS_FILE = "task_status.json"
+
+# 进程内唯一的运行时设置（文件格式与原来的 task_status.json 兼容）
+settings = RuntimeSettings(STATUS_FILE, {"is_decay_enabled": True})
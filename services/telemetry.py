@@ -0,0 +1,111 @@
+import math
+import socket
+import threading
+import time
+
+from services.ingest import ingest_queue
+from telemetry_client import decode
+
+# seq 比上次小这么多时视为秤重启（seq 从头开始），而不是重复帧
+SEQ_RESTART_GAP = 1000
+# seq 变小但距上一帧已超过这个秒数时也视为重启（重启后秤的时钟可能还没同步，ts 不可靠）；
+# 重复・乱序的 UDP 帧只会在几秒内到达
+SEQ_RESTART_IDLE = 30
+
+
+class TelemetryListener:
+    """
+    UDP 遥测接收：解码二进制帧，按 (device_id, seq) 去重后放入 ingest_queue，
+    和 /api/update_weight 走同一套合并写入逻辑。
+    """
+
+    def __init__(self, host="0.0.0.0", port=9001, queue=ingest_queue):
+        self.host = host
+        self.port = port
+        self.queue = queue
+        self._last = {}  # device_id -> 最后接受的 (seq, ts, 接收时刻)
+        self._sock = None
+        self._thread = None
+        # 统计
+        self.datagrams = 0
+        self.frames = 0
+        self.duplicates = 0
+        self.malformed = 0
+        self.dropped = 0
+        self.restarts = 0
+
+    def accept(self, device_id, seq, ts, now=None):
+        """
+        新帧返回 True；重复或乱序的旧帧返回 False。
+        seq 不比上次大时，满足以下任一条件视为秤重启（seq 从头开始）而接受：
+        帧的 ts 比上次新（重复帧 ts 相同，乱序的旧帧 ts 更早）、seq 倒退 SEQ_RESTART_GAP 以上、
+        距上一帧已超过 SEQ_RESTART_IDLE 秒。
+        """
+        now = time.monotonic() if now is None else now
+        last = self._last.get(device_id)
+        if last is not None and seq <= last[0]:
+            last_seq, last_ts, received_at = last
+            if not (
+                ts > last_ts
+                or last_seq - seq >= SEQ_RESTART_GAP
+                or now - received_at >= SEQ_RESTART_IDLE
+            ):
+                return False
+            self.restarts += 1
+        self._last[device_id] = (seq, ts, now)
+        return True
+
+    def handle(self, data):
+        self.datagrams += 1
+        frames = decode(data)
+        if frames is None:
+            self.malformed += 1
+            return 0
+        accepted = 0
+        for device_id, seq, ts, weight in frames:
+            self.frames += 1
+            if not (math.isfinite(weight) and math.isfinite(ts)):
+                # float32 / float64 可以装 NaN・inf；看板取整时会出错
+                self.malformed += 1
+                continue
+            if not self.accept(device_id, seq, ts):
+                self.duplicates += 1
+                continue
+            if not self.queue.put(device_id, round(weight, 1), ts):
+                self.dropped += 1
+                continue
+            accepted += 1
+        return accepted
+
+    def serve(self):
+        while self._sock:
+            try:
+                data, _ = self._sock.recvfrom(65535)
+            except OSError:
+                break  # stop() で閉じられた
+            self.handle(data)
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((self.host, self.port))
+        self.port = self._sock.getsockname()[1]
+        self._thread = threading.Thread(target=self.serve, name="telemetry", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        sock, self._sock = self._sock, None
+        if sock:
+            sock.close()
+
+    def stats(self):
+        return {
+            "port": self.port,
+            "datagrams": self.datagrams,
+            "frames": self.frames,
+            "duplicates": self.duplicates,
+            "malformed": self.malformed,
+            "dropped": self.dropped,
+            "restarts": self.restarts,
+            "devices": len(self._last),
+        }
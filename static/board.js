@@ -0,0 +1,89 @@
+// KDS ボードの表示ロジック（DOM に依存しない部分）
+// ブラウザではグローバル関数、Node では module.exports として使う（benchmarks/board_diff_check.js）
+
+const ICON = {
+    alert: "⚠️",
+    check: "✅",
+    clock: "⏰",
+    refresh: "🔄",
+    chef: "👨‍🍳",
+    bell: "🔔",
+    spark: "✨",
+    close: "❌",
+    load: "🔄"
+};
+
+function formatEta(seconds) {
+    if (seconds == null) return "";
+    if (seconds < 60) return "1分以内";
+    const minutes = Math.round(seconds / 60);
+    return minutes < 60 ? `${minutes}分` : `${Math.floor(minutes / 60)}時間${minutes % 60}分`;
+}
+
+function etaText(d) {
+    if (d.remain == 3) return "";
+    if (d.remain == 0 && d.time_to_warning != null) return `補充推奨まで ${formatEta(d.time_to_warning)}`;
+    if (d.time_to_empty != null) return `売り切れまで ${formatEta(d.time_to_empty)}`;
+    return "";
+}
+
+// 1 件分の表示内容（カードに書き込む値だけ）
+function cardView(d) {
+    const f = d.food_info || {};
+    const view = {
+        name: f.name || "",
+        width: Math.round(d.current_weight),
+        eta: etaText(d),
+        cardClass: "card-bg",
+        progressClass: "progress-normal",
+        statusText: "十分",
+        statusIcon: ICON.check
+    };
+    if (d.remain == 1) {
+        Object.assign(view, { cardClass: "warning-bg", progressClass: "progress-warning", statusText: "補充推奨", statusIcon: ICON.clock });
+    } else if (d.remain == 2) {
+        Object.assign(view, { cardClass: "critical-bg", progressClass: "progress-critical", statusText: "至急補充", statusIcon: ICON.alert });
+    } else if (d.remain == 3) {
+        Object.assign(view, { cardClass: "empty-bg", progressClass: "progress-empty", statusText: "売り切れ", statusIcon: ICON.close });
+    }
+    return view;
+}
+
+function viewKey(view) {
+    return [view.name, view.width, view.eta, view.cardClass, view.statusText].join("|");
+}
+
+// 前回の表示（id -> viewKey）と今回の行（表示順）を比べる
+// changed: 追加または表示内容が変わった id、removed: なくなった id、reordered: 並び順が変わったか
+function diffBoard(prevKeys, prevOrder, rows) {
+    const keys = new Map();
+    const views = new Map();
+    const order = [];
+    const changed = [];
+    rows.forEach(d => {
+        const view = cardView(d);
+        const key = viewKey(view);
+        keys.set(d.id, key);
+        views.set(d.id, view);
+        order.push(d.id);
+        if (prevKeys.get(d.id) !== key) changed.push(d.id);
+    });
+    const removed = [];
+    prevKeys.forEach((_, id) => {
+        if (!keys.has(id)) removed.push(id);
+    });
+    const reordered = order.length !== prevOrder.length || order.some((id, i) => id !== prevOrder[i]);
+    return {
+        keys: keys,
+        views: views,
+        order: order,
+        changed: changed,
+        removed: removed,
+        reordered: reordered,
+        empty: !changed.length && !removed.length && !reordered
+    };
+}
+
+if (typeof module !== "undefined") {
+    module.exports = { ICON, formatEta, etaText, cardView, viewKey, diffBoard };
+}
@@ -0,0 +1,43 @@
+"""
+秤 → 服务器的二进制遥测帧（UDP）。
+一帧 20 字节：device_id(uint32) seq(uint32) ts(float64, epoch 秒) weight(float32)，网络字节序。
+device_id 就是该秤对应的菜品 ID。一个数据报里可以连续放多帧。
+
+只依赖标准库，树莓派端（hx711.py / mock_pi_sender.py）直接 import。
+"""
+import socket
+import struct
+import time
+
+FRAME = struct.Struct("!IIdf")
+# 一个数据报最多放多少帧（保持在常见 MTU 以内）
+MAX_FRAMES_PER_DATAGRAM = 64
+
+
+def encode(device_id, seq, ts, weight):
+    return FRAME.pack(device_id, seq & 0xFFFFFFFF, ts, weight)
+
+
+def decode(data):
+    """把数据报拆成 [(device_id, seq, ts, weight)]；长度不是帧的整数倍时返回 None"""
+    if not data or len(data) % FRAME.size:
+        return None
+    return list(FRAME.iter_unpack(data))
+
+
+class TelemetrySender:
+    """UDP 发送端：自动编号 seq；不等待响应"""
+
+    def __init__(self, host, port, device_id):
+        self.addr = (host, port)
+        self.device_id = device_id
+        self.seq = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, weight, ts=None):
+        self.seq += 1
+        ts = time.time() if ts is None else ts
+        self.sock.sendto(encode(self.device_id, self.seq, ts, weight), self.addr)
+
+    def close(self):
+        self.sock.close()
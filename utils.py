@@ -1,8 +1,7 @@
 from functools import wraps
-import json, os
 from flask import session, redirect, url_for, request, jsonify
 
-STATUS_FILE = "task_status.json"
+from services.settings import settings
 
 
 def login_required(f):
@@ -24,14 +23,10 @@ def login_required(f):
 
 
 def save_status(enabled: bool):
-    """保存状态到 JSON 文件"""
-    with open(STATUS_FILE, "w") as f:
-        json.dump({"is_decay_enabled": enabled}, f)
+    """保存状态（原子写入 task_status.json，其他进程按版本检查获知）"""
+    settings.update(is_decay_enabled=enabled)
 
 
 def load_status() -> bool:
-    """读取状态，没有文件则默认 True"""
-    if not os.path.exists(STATUS_FILE):
-        return True
-    with open(STATUS_FILE, "r") as f:
-        return json.load(f).get("is_decay_enabled", True)
+    """读取状态（内存中的值，不再每次读文件），默认 True"""
+    return settings.get("is_decay_enabled", True)